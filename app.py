@@ -12,6 +12,7 @@ if sys.stderr.encoding != 'utf-8':
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import os
 from pathlib import Path
@@ -21,45 +22,37 @@ import base64
 from PIL import Image
 import io as io_module
 import time
+import threading
+import multiprocessing
+from collections import deque
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from dotenv import load_dotenv
 import db
+import excel_loader
+import excel_snapshot
+import excel_normalize
+import excel_monitor
+import excel_delta
+import excel_archive
+import excel_mirror
+import excel_quality
+import excel_stats
+import profile_parser
+import text_normalize
+import photo_index
 
 # Загружаем переменные из .env файла
 load_dotenv()
 
+# Copy-on-Write: кэшированный DataFrame отдается без копирования,
+# а любая запись в полученный срез копирует только изменяемую колонку
+pd.set_option('mode.copy_on_write', True)
+
 app = Flask(__name__, static_folder='does_not_exist')
 socketio = SocketIO(app)
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 
-# Маппинг для двухэтапного поиска профилей (Latin/Cyrillic → lowercase Cyrillic)
-CYRILLIC_LATIN_MAP_APP = {
-    # Cyrillic uppercase → lowercase
-    'А': 'а', 'В': 'в', 'Е': 'е', 'К': 'к', 'М': 'м', 'Н': 'н',
-    'О': 'о', 'П': 'п', 'Р': 'р', 'С': 'с', 'Т': 'т', 'У': 'у',
-    'Х': 'х', 'Д': 'д', 'З': 'з', 'Л': 'л',
-    # Cyrillic lowercase (identity)
-    'а': 'а', 'в': 'в', 'е': 'е', 'к': 'к', 'м': 'м', 'н': 'н',
-    'о': 'о', 'п': 'п', 'р': 'р', 'с': 'с', 'т': 'т', 'у': 'у',
-    'х': 'х', 'д': 'д', 'з': 'з', 'л': 'л',
-    # Latin uppercase → lowercase Cyrillic
-    'A': 'а', 'B': 'в', 'C': 'с', 'D': 'д', 'E': 'е', 'H': 'н',
-    'K': 'к', 'M': 'м', 'O': 'о', 'P': 'р', 'T': 'т', 'X': 'х',
-    'Y': 'у', 'Z': 'з', 'L': 'л',
-    # Latin lowercase → lowercase Cyrillic
-    'a': 'а', 'b': 'в', 'c': 'с', 'd': 'д', 'e': 'е', 'h': 'н',
-    'k': 'к', 'm': 'м', 'o': 'о', 'p': 'р', 't': 'т', 'x': 'х',
-    'y': 'у', 'z': 'з', 'l': 'л'
-}
-
-def normalize_text_app(text):
-    """Нормализует текст для поиска профилей (Latin/Cyrillic → lowercase Cyrillic)"""
-    if not text:
-        return ''
-    text = str(text)
-    return ''.join(CYRILLIC_LATIN_MAP_APP.get(c, c.lower()) for c in text)
-
 def transliterate_cyrillic(text):
     """Транслитерирует кириллицу в латиницу для безопасных имен файлов
     
@@ -121,71 +114,264 @@ print(f"[INFO] Excel директория: {EXCEL_DIR}")
 if EXCEL_FILENAME:
     print(f"[INFO] Excel файл: {EXCEL_FILENAME}")
 
+# Инкрементальное чтение: дочитываем только новые строки в конце листа
+EXCEL_INCREMENTAL = os.getenv('EXCEL_INCREMENTAL', 'True').lower() == 'true'
+# Сколько последних строк перечитывать (в них операторы дописывают время и т.п.)
+EXCEL_TAIL_WINDOW = int(os.getenv('EXCEL_TAIL_WINDOW', 500))
+
+# Движок полного чтения листа: openpyxl, openpyxl_stream, calamine
+# (см. excel_loader.READER_ENGINES и scripts/bench_reader_engines.py)
+EXCEL_READER_ENGINE = excel_loader.resolve_engine(os.getenv('EXCEL_READER_ENGINE', excel_loader.DEFAULT_ENGINE))
+
+# Разбор Excel в отдельном процессе (не блокирует GIL веб-сервера)
+EXCEL_PARSE_PROCESS = os.getenv('EXCEL_PARSE_PROCESS', 'False').lower() == 'true'
+
+# Папка для снимков данных Excel (быстрый холодный старт, работа без сети)
+cache_dir = os.getenv('CACHE_DIR', 'cache')
+CACHE_DIR = BASE_DIR / cache_dir if not Path(cache_dir).is_absolute() else Path(cache_dir)
+
+# Перед разбором копировать Excel файл в CACHE_DIR (сетевая папка читается
+# одним последовательным чтением, разбор идет с локального диска)
+EXCEL_LOCAL_COPY = os.getenv('EXCEL_LOCAL_COPY', 'True').lower() == 'true'
+
+# Читать CSV, который макрос автосохранения выгружает рядом с .xlsm
+# (если CSV новее книги), вместо разбора .xlsm
+EXCEL_CSV_SIDECAR = os.getenv('EXCEL_CSV_SIDECAR', 'True').lower() == 'true'
+# Сколько ждать CSV после сохранения .xlsm, прежде чем разбирать саму книгу (секунды)
+EXCEL_CSV_WAIT = float(os.getenv('EXCEL_CSV_WAIT', 3))
+# CSV пишется несколькими событиями подряд - перезагрузка после паузы в событиях
+CSV_SETTLE_DELAY = 0.5
+
+# Как часто фоновый поток проверяет Excel файл на сетевой папке (секунды)
+EXCEL_STATUS_INTERVAL = float(os.getenv('EXCEL_STATUS_INTERVAL', 2))
+
+# Как следить за изменениями: auto (сетевой диск - опрос, локальный - watchdog),
+# native (всегда события watchdog), polling (всегда опрос)
+EXCEL_WATCH_MODE = os.getenv('EXCEL_WATCH_MODE', 'auto').lower()
+# Интервал опроса: сразу после изменения файла и максимальный (файл не меняется)
+EXCEL_POLL_MIN_INTERVAL = float(os.getenv('EXCEL_POLL_MIN_INTERVAL', 0.5))
+EXCEL_POLL_MAX_INTERVAL = float(os.getenv('EXCEL_POLL_MAX_INTERVAL', 10))
+
+# Книги прошлых лет в той же папке (для анализа за все годы, ?all_years=true):
+# какие файлы брать и сколько книг держать в памяти одновременно
+EXCEL_ARCHIVE_PATTERN = os.getenv('EXCEL_ARCHIVE_PATTERN', '*.xlsm')
+EXCEL_ARCHIVE_MAX_RESIDENT = int(os.getenv('EXCEL_ARCHIVE_MAX_RESIDENT', 2))
+_archive = excel_archive.WorkbookArchive(CACHE_DIR, EXCEL_ARCHIVE_MAX_RESIDENT,
+                                         EXCEL_ARCHIVE_PATTERN, EXCEL_READER_ENGINE)
+
+# Зеркало листа в SQLite (отдельная база рядом с profiles.db): последние
+# записи, профили и поиск дубликатов - SQL запросами вместо фильтрации DataFrame
+EXCEL_SQL_MIRROR = os.getenv('EXCEL_SQL_MIRROR', 'True').lower() == 'true'
+_mirror_db = os.getenv('EXCEL_MIRROR_DB', '')
+_mirror = excel_mirror.ProductionMirror(Path(_mirror_db) if _mirror_db else db.DB_FILE.with_name('production.db'))
+
+# Сколько последних строк листа видят запросы без full_dataset (см. _slice_dataframe)
+RECENT_WINDOW = 100
+
 # Глобальный кэш для данных
-_cache = {'df': None, 'file_mtime': None, 'cache_time': None, 'force_reload': True}
+_cache = {'df': None, 'file_mtime': None, 'cache_time': None, 'force_reload': True, 'tail': None,
+          'snapshot_key': None, 'generation': 0, 'hanger_index': {}, 'row_hashes': None,
+          'memory': None, 'mirror_generation': None, 'profile_index': {}, 'quality': None}
+
+# Эпоха процесса: счетчик поколений после перезапуска снова начинается с 1,
+# поэтому поколение клиента (?since=) сравнивается только в той же эпохе
+GENERATION_EPOCH = os.urandom(4).hex()
+
+# Перечитывание Excel: одно одновременно (single-flight), в фоновом потоке
+_reload_lock = threading.Lock()
+_reload_event = threading.Event()
+# Согласованная замена индексов поколения (данные Excel + фото)
+_index_lock = threading.Lock()
+
+# Сколько предыдущих строк каждого подвеса хранить в индексе
+HANGER_HISTORY = 20
+
+# Дельты последних поколений (добавленные/измененные/удаленные строки)
+DELTA_HISTORY = 50
+_deltas = deque(maxlen=DELTA_HISTORY)
+# Больше строк в дельте - клиенту проще перезапросить данные целиком
+DELTA_MAX_ROWS = 500
 
 # Папка с фото профилей
 profiles_dir = os.getenv('PROFILES_DIR', 'static/images')
 PROFILES_DIR = BASE_DIR / profiles_dir if not Path(profiles_dir).is_absolute() else Path(profiles_dir)
 
-# Кэш для списка фото (сканируем один раз при старте)
-_photos_cache = {}
+# Дополнительные обработки профилей в ячейке ("юп-1625 окно + юп-3233 греб")
+# Слова через запятую, "слово:название" - если показывать иначе
+PROFILE_PROCESSING_KEYWORDS = os.getenv('PROFILE_PROCESSING_KEYWORDS', profile_parser.DEFAULT_KEYWORDS)
+_profile_tokenizer = profile_parser.ProfileTokenizer(profile_parser.parse_keywords(PROFILE_PROCESSING_KEYWORDS))
+
+# Фото профилей (photo_index.PhotoIndex): при старте - одно сканирование папки,
+# дальше - обновление по отдельным файлам (события watchdog, загрузка/удаление фото).
+# Индекс не изменяется - новый подменяет старый одним присваиванием
+_photo_index = photo_index.PhotoIndex()
+# Имена файлов из событий watchdog, еще не примененные к индексу, и таймер применения
+_photo_lock = threading.Lock()
+# Подмена индекса фото вместе с пересборкой зависящих от него данных
+# (таблица разбора, индекс подвесов) - по одной
+_photo_refresh_lock = threading.Lock()
+# События watchdog приходят пачками (копирование папки с фото) -
+# файлы копятся и применяются к индексу одним разом после паузы
+PHOTO_REFRESH_DELAY = 0.5
+_photo_refresh_timer = None
+_photo_pending = set()
+photo_observer = None
+
+# Разбор ячеек профиля: значение ячейки (_resolution_key) → запись resolve_profile_cell()
+# (профили, обработки, канонические имена, фото). Таблица живет одно поколение
+# данных и фото: при новом поколении Excel записи переносятся, при изменении
+# фото - считаются заново. Значения не из текущей книги (архив)
+# добавляются при первом обращении.
+_resolutions = {}
+# Подмена таблицы разбора (новое поколение, новое фото, добавленное значение)
+_resolutions_lock = threading.Lock()
 
 def scan_profile_photos():
-    """Сканирует папку с фото и создает словарь {профиль: (thumb_url, full_url)}"""
-    global _photos_cache
-    _photos_cache.clear()
+    """Полное сканирование папки с фото (при старте и по /api/cache/refresh)"""
+    global _photo_index
     
     if not PROFILES_DIR.exists():
         print(f"[INFO] Создаю папку для фото: {PROFILES_DIR}")
         PROFILES_DIR.mkdir(parents=True, exist_ok=True)
     
     print(f"[SCAN] Сканирование фото профилей...")
-    thumb_count = 0
-    full_count = 0
+    # Новый индекс собирается отдельно - запросы видят старый до конца скана
+    index = photo_index.PhotoIndex.scan(PROFILES_DIR)
+    with _photo_refresh_lock:
+        _photo_index = index
+        _rebuild_photo_dependent()
+    
+    profiles, thumb_count, full_count = index.counts()
+    print(f"[OK] Найдено профилей с фото: {profiles} ({thumb_count} превью, {full_count} полных)")
+
+def update_profile_photos(present=(), missing=()):
+    """
+    Применяет к индексу фото изменения отдельных файлов
     
-    # Проходим по всем файлам в папке
-    for file_path in PROFILES_DIR.glob('*'):
-        if not file_path.is_file():
-            continue
-        
-        # Проверяем расширение
-        ext = file_path.suffix.lower()
-        if ext not in ['.jpg', '.jpeg', '.png', '.webp', '.gif']:
-            continue
-        
-        filename = file_path.stem  # Имя без расширения
-        is_thumb = filename.endswith('-thumb')
-        
-        # Получаем имя профиля
-        profile_name = filename[:-6] if is_thumb else filename
-        
-        # Нормализуем имя (lowercase для проверки)
-        profile_key = profile_name.lower()
-        
-        # Инициализируем если еще нет
-        if profile_key not in _photos_cache:
-            _photos_cache[profile_key] = {'thumb': None, 'full': None, 'original_name': profile_name}
-        
-        # Сохраняем URL
-        url = f"/static/images/{file_path.name}"
-        if is_thumb:
-            _photos_cache[profile_key]['thumb'] = url
-            thumb_count += 1
-        else:
-            _photos_cache[profile_key]['full'] = url
-            full_count += 1
+    Новый индекс и зависящие от него данные подменяются под одной
+    блокировкой: запросы не видят новый индекс со старой таблицей разбора.
     
-    print(f"[OK] Найдено профилей с фото: {len(_photos_cache)} ({thumb_count} превью, {full_count} полных)")
+    Args:
+        present: имена файлов, которые появились или изменились
+        missing: имена удаленных файлов
+    
+    Returns:
+        bool: индекс изменился
+    """
+    global _photo_index
+    with _photo_refresh_lock:
+        index = _photo_index.with_files(present, missing)
+        changed = index is not _photo_index
+        if changed:
+            _photo_index = index
+            _rebuild_photo_dependent()
+    return changed
+
+def update_profile_photo_files(*paths):
+    """Обновляет индекс фото по файлам, которые только что записали/удалили/переименовали"""
+    update_profile_photos(present=[path.name for path in paths if path.exists()],
+                          missing=[path.name for path in paths if not path.exists()])
+
+def _refresh_photo_generation():
+    """Новое поколение фото: записи разбора профилей и готовые ответы индекса подвесов - заново"""
+    with _photo_refresh_lock:
+        _rebuild_photo_dependent()
+
+def _rebuild_photo_dependent():
+    """Таблица разбора и индекс подвесов по текущему индексу фото (под _photo_refresh_lock)"""
+    global _resolutions
+    table = build_resolution_table(_cache.get('df'))
+    with _resolutions_lock:
+        _resolutions = table
+    rebuild_hanger_index()
+
+def _queue_photo_files(names):
+    """Запоминает файлы из событий watchdog; применяются через PHOTO_REFRESH_DELAY одним разом"""
+    global _photo_refresh_timer
+    with _photo_lock:
+        _photo_pending.update(names)
+        if _photo_refresh_timer is not None:
+            return
+        _photo_refresh_timer = threading.Timer(PHOTO_REFRESH_DELAY, _apply_queued_photo_files)
+        _photo_refresh_timer.daemon = True
+        _photo_refresh_timer.start()
+
+def _apply_queued_photo_files():
+    """
+    Применяет накопленные файлы: один новый индекс на пачку событий
+    
+    Есть ли файл - смотрим сейчас, а не по событию: создание и удаление
+    одного файла внутри пачки дают его итоговое состояние.
+    """
+    global _photo_refresh_timer
+    with _photo_lock:
+        _photo_refresh_timer = None
+        names = list(_photo_pending)
+        _photo_pending.clear()
+    paths = [PROFILES_DIR / name for name in names]
+    try:
+        update_profile_photo_files(*paths)
+    except Exception as e:
+        print(f"[WARN] Не удалось обновить индекс фото: {e}")
+
+class PhotoDirHandler(FileSystemEventHandler):
+    """События папки с фото → изменения отдельных файлов в индексе"""
+    
+    def on_created(self, event):
+        self._apply(event, present=[event.src_path])
+    
+    def on_modified(self, event):
+        self._apply(event, present=[event.src_path])
+    
+    def on_deleted(self, event):
+        self._apply(event, missing=[event.src_path])
+    
+    def on_moved(self, event):
+        # Переместили за пределы папки - для индекса это удаление
+        inside = os.path.dirname(os.path.abspath(event.dest_path)) == os.path.abspath(PROFILES_DIR)
+        self._apply(event, present=[event.dest_path] if inside else [], missing=[event.src_path])
+    
+    def _apply(self, event, present=(), missing=()):
+        if event.is_directory:
+            return
+        _queue_photo_files([os.path.basename(path) for path in (*present, *missing)])
+
+def start_photo_watcher():
+    """Следит за папкой с фото: новые/удаленные файлы попадают в индекс без пересканирования"""
+    global photo_observer
+    if photo_observer is not None:
+        return
+    try:
+        watcher = Observer()
+        watcher.schedule(PhotoDirHandler(), str(PROFILES_DIR), recursive=False)
+        watcher.start()
+        photo_observer = watcher
+        print(f"[WATCH] Мониторинг фото запущен: {PROFILES_DIR}")
+    except Exception as e:
+        print(f"[WARN] Мониторинг фото не запущен (обновить вручную: /api/cache/refresh): {e}")
 
 # Watchdog для отслеживания изменений Excel файла
 class ExcelFileHandler(FileSystemEventHandler):
+    """
+    События папки с Excel → перезагрузка данных (schedule_excel_reload / schedule_csv_reload)
+    """
     def __init__(self):
         self.last_modified = {}
     
+    def on_created(self, event):
+        if not event.is_directory:
+            self._on_csv(event.src_path)
+    
+    def on_moved(self, event):
+        # Макрос может писать CSV во временный файл и переименовывать
+        if not event.is_directory:
+            self._on_csv(event.dest_path)
+    
     def on_modified(self, event):
         if event.is_directory:
             return
+        if self._on_csv(event.src_path):
+            return
         # Отслеживаем .xlsm и временные файлы ~$
         if event.src_path.endswith('.xlsm') or '~$' in event.src_path:
             # Дебаунсинг: игнорируем события чаще чем раз в 1 секунду
@@ -197,14 +383,43 @@ class ExcelFileHandler(FileSystemEventHandler):
             self.last_modified[event.src_path] = now
             timestamp = datetime.now().strftime('%H:%M:%S')
             print(f"[FILE] [{timestamp}] Файл изменен: {os.path.basename(event.src_path)}")
+            # Флаг для фронтенда ставится только после реальной перезагрузки:
+            # автосохранение без изменений лист не перечитывает
             _cache['force_reload'] = True
-            _cache['file_changed'] = True  # Флаг для фронтенда
+            schedule_excel_reload()
+            _freshness.refresh()
+    
+    def _on_csv(self, path):
+        """CSV рядом с книгой обновлен - перезагрузка без ожидания. True, если это CSV книги"""
+        if not EXCEL_CSV_SIDECAR or not path.lower().endswith('.csv'):
+            return False
+        if not Path(path).with_suffix('.xlsm').exists():
+            return False
+        schedule_csv_reload()
+        _freshness.refresh()
+        return True
+
+def _use_polling_watcher():
+    """Следить за файлом опросом (сетевой диск) вместо событий watchdog"""
+    if EXCEL_WATCH_MODE == 'polling':
+        return True
+    if EXCEL_WATCH_MODE == 'native':
+        return False
+    return excel_monitor.is_remote_path(EXCEL_DIR)
 
 # Запускаем watchdog в отдельном потоке
 observer = None
 def start_file_watcher():
     global observer
     if observer is None:
+        # Сетевой диск: события watchdog приходят с задержкой или теряются -
+        # изменения находит монитор опросом с адаптивным интервалом
+        if _use_polling_watcher():
+            _freshness.set_polling(EXCEL_POLL_MIN_INTERVAL, EXCEL_POLL_MAX_INTERVAL)
+            print(f"[WATCH] Сетевой диск - опрос файла каждые "
+                  f"{EXCEL_POLL_MIN_INTERVAL:g}-{EXCEL_POLL_MAX_INTERVAL:g} сек: {EXCEL_DIR}")
+            return
+        
         # Проверяем доступность директории
         if not EXCEL_DIR.exists():
             print(f"[WARN] Предупреждение: директория недоступна, мониторинг не запущен: {EXCEL_DIR}")
@@ -218,151 +433,397 @@ def start_file_watcher():
         if EXCEL_DIR != BASE_DIR:
             print(f"   (сетевой диск - возможна задержка до 5 сек)")
 
-def get_dataframe(full_dataset=False):
+def _get_offline_dataframe(excel_file=None):
     """
-    Читает Excel с кэшированием
-    
-    Args:
-        full_dataset: если True - читает ВСЕ строки (для поиска фото),
-                     если False - последние 100 строк (для таблицы, быстро)
+    Данные на случай недоступности сетевой папки:
+    кэш в памяти или последний удачный снимок с диска
     """
-    from datetime import datetime, timedelta
-    
-    # Проверяем доступность директории (для сетевых дисков)
-    if not EXCEL_DIR.exists():
-        print(f"[ERROR] Ошибка: директория недоступна: {EXCEL_DIR}")
-        print(f"   Проверьте сетевое подключение и путь в .env файле")
-        return None
-    
-    # Ищем Excel файл
-    if EXCEL_FILENAME:
-        # Конкретный файл указан
-        excel_file = EXCEL_DIR / EXCEL_FILENAME
-        if not excel_file.exists():
-            print(f"[ERROR] Ошибка: файл не найден: {excel_file}")
-            return None
+    df = _cache.get('df')
+    if df is not None:
+        return df
+    
+    # Ищем снимок конкретного файла, иначе - снимок текущей книги по отметке
+    # в папке кэша (рядом лежат снимки книг прошлых лет - их не берем)
+    if excel_file is None and os.getenv('EXCEL_FILE_PATH'):
+        excel_file = Path(os.getenv('EXCEL_FILE_PATH'))
+    if excel_file is not None:
+        path = excel_snapshot.snapshot_path(CACHE_DIR, excel_file)
     else:
-        # Ищем конкретный файл из EXCEL_FILE_PATH или первый .xlsm
-        excel_path = os.getenv('EXCEL_FILE_PATH', '')
-        if excel_path:
-            # Берем имя файла из полного пути
-            excel_filename = os.path.basename(excel_path)
-        else:
-            # Если не задана переменная - ищем первый .xlsm файл
-            files = [f for f in os.listdir(EXCEL_DIR) if f.endswith('.xlsm') and not f.startswith('~$')]
-            if not files:
-                print(f"[ERROR] Ошибка: .xlsm файлы не найдены в {EXCEL_DIR}")
+        path = excel_snapshot.current_snapshot_path(CACHE_DIR)
+        if path is None:
+            # Отметки еще нет (кэш старой версии) - снимок книги самого позднего года
+            snapshots = list(CACHE_DIR.glob('*.snapshot.npz')) if CACHE_DIR.exists() else []
+            if not snapshots:
                 return None
-            excel_filename = files[0]
+            path = max(snapshots, key=lambda p: (excel_archive.workbook_year(p.name), os.path.getmtime(p)))
+    
+    with _reload_lock:
+        if _cache.get('df') is not None:
+            return _cache['df']
         
-        excel_file = EXCEL_DIR / excel_filename
+        df, key = excel_snapshot.load_snapshot(path)
+        if df is None:
+            return None
+        
+        print(f"[SNAPSHOT] Сетевая папка недоступна - используем снимок {path.name} ({len(df)} строк)")
+        _cache['tail'] = excel_loader.make_tail_state(df, EXCEL_TAIL_WINDOW)
+        df = excel_normalize.normalize_frame(df)
+        # file_mtime=None: при появлении файла он будет перечитан
+        _publish_dataframe(df, file_mtime=None)
+    return df
+
+def _save_snapshot(df, excel_file, key):
+    """Сохраняет колоночный снимок данных на диск (ошибки не критичны)"""
+    try:
+        excel_snapshot.save_snapshot(excel_snapshot.snapshot_path(CACHE_DIR, excel_file), df, key)
+        excel_snapshot.save_current(CACHE_DIR, excel_file)
+    except Exception as e:
+        print(f"[WARN] Не удалось сохранить снимок: {e}")
+
+def _get_file_mtime(excel_file):
+    """Время изменения файла с учетом временного файла ~$ (если Excel открыт)"""
     current_mtime = os.path.getmtime(excel_file)
     
-    # Проверяем временный файл (если Excel открыт)
     temp_file = EXCEL_DIR / f"~${excel_file.name}"
     if temp_file.exists():
         temp_mtime = os.path.getmtime(temp_file)
         current_mtime = max(current_mtime, temp_mtime)
+    return current_mtime
+
+def _publish_dataframe(df, file_mtime):
+    """
+    Публикует новое поколение данных
     
-    # Принудительная перезагрузка от watchdog
-    force_reload = _cache.get('force_reload', False)
-    
-    # Проверяем кэш
-    cache_valid = (
-        _cache.get('df') is not None and 
-        _cache.get('file_mtime') == current_mtime and
-        not force_reload  # Сбрасываем кэш при изменении файла
-    )
+    Читатели берут только _cache['df'] (одно присваивание = атомарная замена),
+    поэтому до этого момента они продолжают получать предыдущее поколение.
+    """
+    global _resolutions
+    # Что изменилось относительно предыдущего поколения (по позиции и хешу строки)
+    hashes = excel_delta.row_hashes(df)
+    previous_hashes = _cache.get('row_hashes')
+    delta = excel_delta.diff_generations(previous_hashes, hashes) if previous_hashes is not None else None
+    
+    # Размер поколения в памяти (колонки уже ужаты в excel_normalize)
+    memory = excel_normalize.memory_usage(df)
+    
+    # Переносим изменившиеся строки в SQLite зеркало (до публикации - чтобы
+    # запросы нового поколения сразу видели его строки)
+    mirror_ok = False
+    if EXCEL_SQL_MIRROR:
+        try:
+            synced = _mirror.sync(df, hashes)
+            mirror_ok = True
+            print(f"[MIRROR] SQLite: +{synced['added']} ~{synced['changed']} -{synced['removed']} строк")
+        except Exception as e:
+            print(f"[WARN] Не удалось обновить SQLite зеркало (запросы пойдут по DataFrame): {e}")
+    
+    # Все, что зависит от фото, - под той же блокировкой, что и пересборка
+    # по изменению фото (_refresh_photo_generation): иначе она может пройти
+    # между сборкой таблицы и публикацией, и поколение уйдет со старыми фото
+    with _photo_refresh_lock:
+        # Таблица разбора ячеек профиля нового поколения (фото те же - записи
+        # уже встречавшихся значений переносятся). Ставим сразу: индексы ниже
+        # и запросы предыдущего поколения берут записи из нее.
+        table = build_resolution_table(df, _resolutions)
+        with _resolutions_lock:
+            _resolutions = table
+        
+        hanger_index = build_hanger_index(df)
+        profile_index = build_profile_index(df)
+        
+        # Проверка качества данных (маски по всему листу)
+        quality = excel_quality.check_frame(df, lambda value: resolve_profile(value)['profiles_info'])
+        
+        with _index_lock:
+            _cache['file_mtime'] = file_mtime
+            _cache['cache_time'] = datetime.now()
+            _cache['generation'] = _cache.get('generation', 0) + 1
+            _cache['hanger_index'] = hanger_index
+            _cache['profile_index'] = profile_index
+            _cache['quality'] = {'generation': _cache['generation'], 'checked_at': datetime.now(), **quality}
+            _cache['row_hashes'] = hashes
+            _cache['memory'] = memory
+            _cache['df'] = df
+            generation = _cache['generation']
+            _cache['mirror_generation'] = generation if mirror_ok else None
+            if delta is None:
+                # Первая загрузка: с более ранними поколениями сравнить нечего
+                _deltas.clear()
+            else:
+                _deltas.append({'generation': generation, **delta})
+    _cache['file_changed'] = True  # Флаг для фронтенда
+    print(f"[MEMORY] Поколение {generation}: {memory['total'] / 2**20:.1f} МБ ({len(df)} строк)")
+    print(f"[QUALITY] {excel_quality.summary(quality)} ({quality['duration_ms']} мс)")
+    
+    # Рассылаем дашбордам только изменившиеся строки
+    if delta is not None and not excel_delta.is_empty(delta):
+        socketio.emit('products_delta', build_delta_payload(df, delta, generation - 1, generation))
+
+def _reload_dataframe(excel_file):
+    """
+    Перечитывает Excel и публикует новое поколение данных
     
-    if cache_valid:
-        # Возвращаем либо полный датасет, либо последние 100 строк
-        df_cached = _cache['df'].copy()
-        if not full_dataset and len(df_cached) > 100:
-            return df_cached.tail(100)
-        return df_cached
+    Вызывается только под _reload_lock (одна перезагрузка одновременно).
+    """
+    force_reload = _cache.get('force_reload', False)
+    _cache['force_reload'] = False
+    current_mtime = _get_file_mtime(excel_file)
+    
+    # Ключ снимка считаем ДО чтения: если файл изменится во время чтения,
+    # снимок не совпадет с новым файлом и будет перечитан
+    snapshot_key = excel_snapshot.make_key(excel_file, excel_loader.sheet_fingerprint(excel_file))
+    parse_file = excel_file
+    
+    # Автосохранение без изменений или касание ~$ файла: XML листа тот же
+    # (проверка по центральному каталогу zip, без распаковки) - не перечитываем
+    cached_key = _cache.get('snapshot_key') or {}
+    if (_cache.get('df') is not None and snapshot_key['sheet_fp']
+            and snapshot_key['sheet_fp'] == cached_key.get('sheet_fp')):
+        _cache['file_mtime'] = current_mtime
+        timestamp = datetime.now().strftime('%H:%M:%S')
+        print(f"[SKIP] [{timestamp}] Лист '{excel_loader.SHEET_NAME}' не изменился - перечитывание не нужно")
+        return
     
-    # Сбрасываем флаг принудительной перезагрузки
     if force_reload:
         timestamp = datetime.now().strftime('%H:%M:%S')
         print(f"[RELOAD] [{timestamp}] Чтение Excel (файл изменен)...")
     
-    _cache['force_reload'] = False
+    df = None
+    # .xlsm, которому соответствуют данные (для отпечатка строк выше хвоста)
+    source_file = None
+    
+    # Холодный старт: пробуем снимок с диска вместо разбора .xlsm
+    if _cache.get('df') is None:
+        df, _ = excel_snapshot.load_snapshot(excel_snapshot.snapshot_path(CACHE_DIR, excel_file), snapshot_key)
+        if df is not None:
+            print(f"[SNAPSHOT] Загружен снимок с диска: {len(df)} строк")
+            source_file = excel_file
+    
+    # Макрос книги выгрузил CSV после сохранения - читаем его вместо .xlsm
+    if df is None and EXCEL_CSV_SIDECAR:
+        csv_file = excel_loader.csv_sidecar_is_fresh(excel_file)
+        if csv_file is not None:
+            try:
+                df = excel_loader.read_csv_sidecar(csv_file)
+                print(f"[CSV] Прочитан {csv_file.name}: {len(df)} строк")
+            except Exception as e:
+                print(f"[WARN] Не удалось прочитать {csv_file.name}, читаем .xlsm: {e}")
+                df = None
+    
+    # Разбираем локальную копию файла, а не файл на сетевой папке
+    if df is None and EXCEL_LOCAL_COPY:
+        try:
+            parse_file = excel_loader.stage_local_copy(excel_file, CACHE_DIR)
+        except excel_loader.UnstableFileError as e:
+            # Excel еще сохраняет файл - остаемся на текущем поколении,
+            # следующий запрос попробует снова
+            _cache['force_reload'] = True
+            print(f"[WARN] {e}")
+            raise
+        # Ключ - по тому, что будет разобрано на самом деле
+        snapshot_key = excel_snapshot.make_key(parse_file, excel_loader.sheet_fingerprint(parse_file))
+    
+    # Инкрементальный режим: перечитываем только хвост листа
+    if df is None and EXCEL_INCREMENTAL and _cache.get('df') is not None and _cache.get('tail'):
+        try:
+            if EXCEL_PARSE_PROCESS:
+                tail_df = excel_loader.read_tail_in_process(parse_file, _cache['tail'])
+            else:
+                tail_df = excel_loader.read_tail(parse_file, _cache['tail'])
+        except Exception as e:
+            print(f"[WARN] Ошибка инкрементального чтения: {e}")
+            tail_df = None
+        
+        if tail_df is not None:
+            df = excel_loader.merge_tail(_cache['df'], tail_df)
+            source_file = parse_file
+            print(f"[DEBUG] Инкрементально перечитано строк: {len(tail_df)} (всего {len(df)})")
+        else:
+            print("[RELOAD] Ранние строки изменились - полное чтение")
     
-    # Читаем все данные (пропускаем только инструкции)
-    # Строка 0-1: инструкции, Строка 2: заголовки, Строка 3+: данные
-    df = pd.read_excel(excel_file, sheet_name='Подвесы', skiprows=[0, 1], 
-                       usecols=[3, 4, 5, 7, 10, 11, 12, 16, 19], engine='openpyxl')
+    if df is None:
+        # Читаем все данные (пропускаем только инструкции)
+        # Строка 0-1: инструкции, Строка 2: заголовки, Строка 3+: данные
+        if EXCEL_PARSE_PROCESS:
+            df = excel_loader.read_full_in_process(parse_file, EXCEL_READER_ENGINE)
+        else:
+            df = excel_loader.read_full(parse_file, EXCEL_READER_ENGINE)
+        source_file = parse_file
+        print(f"[DEBUG] Прочитано строк (без пустых): {len(df)}")
     
-    print(f"[DEBUG] Прочитано всего строк: {len(df)}")
+    # Снимок и состояние хвоста - по сырым колонкам листа (склеенные
+    # данные merge_tail совпадают с полным чтением того же файла)
+    if snapshot_key != _cache.get('snapshot_key'):
+        _save_snapshot(df[excel_loader.COLUMNS], excel_file, snapshot_key)
     
-    # Переименовываем колонки для удобства
-    df.columns = ['date', 'number', 'time', 'material_type', 'kpz_number', 
-                  'client', 'profile', 'color', 'lamels_qty']
+    _cache['tail'] = excel_loader.make_tail_state(df, EXCEL_TAIL_WINDOW, source_file,
+                                                  in_process=EXCEL_PARSE_PROCESS)
+    _cache['snapshot_key'] = snapshot_key
     
-    # ВАЖНО: удаляем полностью пустые строки (где все ячейки пусты)
-    df = df.dropna(how='all')
+    # Производные колонки (даты, время, ламели, номер подвеса) - один раз на поколение
+    df = excel_normalize.normalize_frame(df)
+    _publish_dataframe(df, current_mtime)
     
-    print(f"[DEBUG] После удаления пустых: {len(df)} строк")
+    timestamp = datetime.now().strftime('%H:%M:%S')
+    print(f"[OK] [{timestamp}] Загружено {len(df)} строк в кэш (поколение {_cache['generation']})")
+
+def request_reload():
+    """Просит фоновый поток перечитать Excel (несколько запросов схлопываются в один)"""
+    _reload_event.set()
+
+# Отложенная перезагрузка после изменения файла (одна на все источники:
+# события watchdog, монитор файла, запросы к данным)
+_excel_reload_lock = threading.Lock()
+_excel_reload_timer = None
+
+def schedule_excel_reload():
+    """
+    .xlsm изменен - перезагрузка
     
-    # Сохраняем в кэш с временной меткой
-    from datetime import datetime
-    _cache['df'] = df
-    _cache['file_mtime'] = current_mtime
-    _cache['cache_time'] = datetime.now()
+    Макрос выгружает CSV уже после сохранения книги: при EXCEL_CSV_SIDECAR
+    перезагрузка ждет EXCEL_CSV_WAIT секунд (CSV запускает ее раньше -
+    schedule_csv_reload). Повторные вызовы, пока она ждет, ее не откладывают:
+    запросы к данным до перезагрузки вызывают ее постоянно.
+    """
+    if not EXCEL_CSV_SIDECAR or EXCEL_CSV_WAIT <= 0:
+        request_reload()
+        return
+    _start_reload_timer(EXCEL_CSV_WAIT, restart=False)
+
+def schedule_csv_reload():
+    """CSV рядом с книгой обновлен - перезагрузка через CSV_SETTLE_DELAY после последнего события"""
+    _start_reload_timer(CSV_SETTLE_DELAY, restart=True)
+
+def _start_reload_timer(delay, restart):
+    """Ставит таймер перезагрузки; restart=True - заменяет уже ждущий таймер"""
+    global _excel_reload_timer
+    with _excel_reload_lock:
+        if _excel_reload_timer is not None:
+            if not restart:
+                return
+            _excel_reload_timer.cancel()
+        _excel_reload_timer = threading.Timer(delay, _fire_reload_timer)
+        _excel_reload_timer.daemon = True
+        _excel_reload_timer.start()
+
+def _fire_reload_timer():
+    global _excel_reload_timer
+    with _excel_reload_lock:
+        _excel_reload_timer = None
+    request_reload()
+
+def _reload_worker():
+    """Фоновый поток: единственный, кто перечитывает Excel после изменений"""
+    while True:
+        _reload_event.wait()
+        _reload_event.clear()
+        try:
+            # Свежая проверка файла (фоновый поток - обращение к шаре допустимо)
+            status = _freshness.probe()
+            if status['status'] != 'ok':
+                continue
+            with _reload_lock:
+                # Файл мог уже быть перечитан (например, при холодном старте)
+                if (_cache.get('df') is not None and not _cache.get('force_reload')
+                        and _cache.get('file_mtime') == status['mtime']):
+                    continue
+                _reload_dataframe(status['excel_file'])
+        except Exception as e:
+            # Оставляем предыдущее поколение (файл мог быть сохранен не до конца)
+            print(f"[ERROR] Ошибка перезагрузки Excel: {e}")
+
+reload_thread = None
+def start_reload_worker():
+    global reload_thread
+    if reload_thread is None:
+        reload_thread = threading.Thread(target=_reload_worker, name='excel-reload', daemon=True)
+        reload_thread.start()
+
+def _on_excel_changed(status):
+    """Монитор заметил новый mtime файла, новый CSV рядом с ним (или файл снова доступен)"""
+    if _cache.get('df') is None:
+        return
+    # CSV новее книги - макрос уже выгрузил данные, ждать нечего
+    if status['sidecar_mtime'] is not None and status['sidecar_mtime'] >= status['file_mtime']:
+        schedule_csv_reload()
+    else:
+        schedule_excel_reload()
+
+# Имя файла: указанный файл, имя из EXCEL_FILE_PATH или первый .xlsm в папке
+_freshness = excel_monitor.FreshnessMonitor(
+    EXCEL_DIR,
+    EXCEL_FILENAME or (os.path.basename(os.getenv('EXCEL_FILE_PATH', '')) or None),
+    interval=EXCEL_STATUS_INTERVAL,
+    on_change=_on_excel_changed,
+    sidecar_suffix='.csv' if EXCEL_CSV_SIDECAR else None,
+)
+
+def _slice_dataframe(df, full_dataset):
+    """
+    Возвращает либо полный датасет, либо последние RECENT_WINDOW строк
     
-    if force_reload:
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        print(f"[OK] [{timestamp}] Загружено {len(df)} строк в кэш")
+    Без копирования: благодаря Copy-on-Write изменения в полученном
+    DataFrame не затрагивают кэш.
+    """
+    if not full_dataset and len(df) > RECENT_WINDOW:
+        return df.tail(RECENT_WINDOW)
+    return df
+
+def _mirror_ready():
+    """SQLite зеркало содержит текущее поколение данных"""
+    return EXCEL_SQL_MIRROR and _cache.get('mirror_generation') is not None \
+        and _cache.get('mirror_generation') == _cache.get('generation')
+
+def get_dataframe(full_dataset=False):
+    """
+    Читает Excel с кэшированием (stale-while-revalidate)
+    
+    Если файл изменился - сразу возвращает текущее поколение данных,
+    а перечитывание выполняет фоновый поток. Ждать разбора Excel приходится
+    только при самом первом чтении (нет ни кэша, ни снимка).
+    
+    Состояние файла берется из монитора (_freshness): на запрос - ни одного
+    обращения к сетевой папке.
+    
+    Args:
+        full_dataset: если True - читает ВСЕ строки (для поиска фото),
+                     если False - последние 100 строк (для таблицы, быстро)
+    """
+    status = _freshness.current()
+    if status['status'] != 'ok':
+        df = _get_offline_dataframe(EXCEL_DIR / EXCEL_FILENAME if EXCEL_FILENAME else None)
+        return _slice_dataframe(df, full_dataset) if df is not None else None
+    excel_file = status['excel_file']
+    
+    df = _cache.get('df')
+    if df is not None:
+        # Принудительная перезагрузка от watchdog или файл изменился
+        if _cache.get('force_reload') or _cache.get('file_mtime') != status['mtime']:
+            schedule_excel_reload()
+        # Возвращаем либо полный датасет, либо последние 100 строк
+        return _slice_dataframe(df, full_dataset)
     
-    # Возвращаем либо полный датасет, либо последние 100 строк
-    if not full_dataset and len(df) > 100:
-        return df.tail(100).copy()
-    return df.copy()
+    # Первое чтение: одно на всех, остальные запросы ждут его результат
+    with _reload_lock:
+        if _cache.get('df') is None:
+            _reload_dataframe(excel_file)
+    
+    return _slice_dataframe(_cache['df'], full_dataset)
 
 def parse_profile_with_processing(text):
     """
     Парсит строку профиля, извлекая название и доп. обработки
-    Обработки: окно, греб (гребенка), сверло
+    Обработки: окно, греб (гребенка), сверло (PROFILE_PROCESSING_KEYWORDS)
     
     Примеры:
     "ЮП-1625 окно" → {"name": "ЮП-1625", "processing": ["окно"]}
     "юп-3233 греб + сверло" → {"name": "юп-3233", "processing": ["греб", "сверло"]}
     "корпус" → {"name": "корпус", "processing": []}
     """
-    import re
-    
     if not text or pd.isna(text):
         return {"name": "", "processing": []}
     
-    text = str(text).strip()
-    
-    # Известные обработки (регистронезависимо)
-    processing_keywords = ['окно', 'греб', 'гребенка', 'сверло']
-    
-    found_processing = []
-    name = text
-    
-    # Ищем обработки в строке
-    for keyword in processing_keywords:
-        # Ищем слово целиком (с границами слов)
-        pattern = r'\b' + re.escape(keyword) + r'\b'
-        if re.search(pattern, text, re.IGNORECASE):
-            # Сокращаем "гребенка" до "греб"
-            if keyword == 'гребенка':
-                found_processing.append('греб')
-            else:
-                found_processing.append(keyword)
-            # Удаляем обработку из названия
-            name = re.sub(pattern, '', name, flags=re.IGNORECASE)
-    
-    # Очищаем название от лишних пробелов и разделителей
-    name = re.sub(r'\s+', ' ', name).strip()
-    name = name.rstrip('+,;').strip()
-    
-    return {
-        "name": name,
-        "processing": found_processing
-    }
+    return _profile_tokenizer.parse(text)
 
 def split_profiles(profile_string):
     """
@@ -378,32 +839,14 @@ def split_profiles(profile_string):
     if not profile_string or pd.isna(profile_string):
         return []
     
-    profile_str = str(profile_string).strip()
-    
-    # Разделители: +, запятая, точка с запятой, 2+ пробела
-    import re
-    # Заменяем разделители на |
-    profile_str = re.sub(r'\s*[+,;]\s*|\s{2,}', '|', profile_str)
-    
-    # Разбиваем по |
-    parts = [p.strip() for p in profile_str.split('|') if p.strip()]
-    
-    # Парсим каждую часть
-    profiles = []
-    for part in parts:
-        parsed = parse_profile_with_processing(part)
-        # Фильтруем слишком короткие названия (меньше 2 символов)
-        if len(parsed["name"]) >= 2:
-            profiles.append(parsed)
-    
-    return profiles
+    return _profile_tokenizer.split(profile_string)
 
 def get_profile_photo(profile_name):
     """Проверяет наличие фото профиля и возвращает (thumb_url, full_url, original_name) из кэша
     
     Трёхэтапный поиск:
     1. Точное совпадение (case-insensitive, но точные буквы)
-    2. Нормализованное совпадение (Latin→Cyrillic)
+    2. Нормализованное совпадение (Latin→Cyrillic, без дефисов и пробелов - как поиск по каталогу)
     3. Частичное совпадение по цифрам (только если одно совпадение)
     """
     if not profile_name or pd.isna(profile_name):
@@ -411,63 +854,135 @@ def get_profile_photo(profile_name):
     
     clean_name = str(profile_name).strip()
     
+    # Один индекс на весь поиск (может быть подменен событием из папки с фото)
+    index = _photo_index
+    
     # ЭТАП 1: Точное совпадение (case-insensitive, но точные буквы)
-    profile_key = clean_name.lower()
-    if profile_key in _photos_cache:
-        photo_info = _photos_cache[profile_key]
+    photo_info = index.get(clean_name.lower())
+    if photo_info is not None:
         return photo_info['thumb'], photo_info['full'], photo_info['original_name']
     
-    # ЭТАП 2: Нормализуем и ищем (Latin→Cyrillic)
-    normalized_name = normalize_text_app(clean_name)
-    for cached_profile, photo_info in _photos_cache.items():
-        normalized_cached = normalize_text_app(cached_profile)
-        if normalized_name == normalized_cached:
-            return photo_info['thumb'], photo_info['full'], photo_info['original_name']
-    
-    # ЭТАП 3: Частичное совпадение по цифрам
-    # Извлекаем ВСЕ цифры из профиля Excel
-    import re
-    digits_in_name = ''.join(re.findall(r'\d', clean_name))
+    # ЭТАП 2: Нормализуем и ищем (Latin→Cyrillic, ключ как у db.search_profiles) - по индексу
+    photo_info = index.find_normalized(text_normalize.search_key(clean_name))
+    if photo_info is not None:
+        return photo_info['thumb'], photo_info['full'], photo_info['original_name']
     
+    # ЭТАП 3: Частичное совпадение по цифрам (ВСЕ цифры из профиля Excel)
+    # Если ровно ОДНО совпадение - показываем его фото,
+    # если несколько или ноль - ничего не показываем
+    digits_in_name = text_normalize.digit_signature(clean_name)
     if digits_in_name:
-        # Ищем профили в БД содержащие эти цифры
-        matches = []
-        for cached_profile, photo_info in _photos_cache.items():
-            digits_in_cached = ''.join(re.findall(r'\d', cached_profile))
-            if digits_in_cached == digits_in_name:
-                matches.append(photo_info)
-        
-        # Если ровно ОДНО совпадение - показываем его фото
-        if len(matches) == 1:
-            photo_info = matches[0]
+        photo_info = index.find_digits(digits_in_name)
+        if photo_info is not None:
             return photo_info['thumb'], photo_info['full'], photo_info['original_name']
-        # Если несколько или ноль совпадений - ничего не показываем
     
     return None, None, None
 
-def check_profiles_have_photos(profile_string):
+def resolve_profile_cell(value):
     """
-    Проверяет есть ли фото хотя бы у ОДНОГО из профилей в строке
+    Разбор значения ячейки профиля со ссылками на фото (одна запись таблицы _resolutions)
     
-    Args:
-        profile_string: строка с одним или несколькими профилями
-        
     Returns:
-        bool: True если хотя бы у одного профиля есть фото
+        dict: photo_thumb, photo_full, canonical_name - фото всей ячейки (get_profile_photo),
+              profiles_info - по каждому профилю (split_profiles + get_profile_photo),
+              keys - ключи профилей для индекса (text_normalize.search_key, по порядку profiles_info),
+              has_photo - есть фото хотя бы у одного профиля,
+              first_thumb, first_full - фото первого профиля
     """
-    if not profile_string or pd.isna(profile_string):
-        return False
+    thumb_url, full_url, canonical_name = get_profile_photo(value)
+    
+    profiles_info = []
+    for p_dict in split_profiles(value):
+        p_thumb, p_full, p_canonical = get_profile_photo(p_dict["name"])
+        profiles_info.append({
+            'name': p_dict["name"],
+            'canonical_name': p_canonical or p_dict["name"],
+            'processing': p_dict["processing"],  # Список обработок
+            'has_photo': bool(p_thumb or p_full),
+            'photo_thumb': p_thumb,
+            'photo_full': p_full
+        })
+    
+    first = profiles_info[0] if profiles_info else {}
+    return {
+        'photo_thumb': thumb_url,
+        'photo_full': full_url,
+        'canonical_name': canonical_name,
+        'profiles_info': profiles_info,
+        'keys': [text_normalize.search_key(p['name']) for p in profiles_info],
+        'has_photo': any(p['has_photo'] for p in profiles_info),
+        'first_thumb': first.get('photo_thumb'),
+        'first_full': first.get('photo_full'),
+    }
+
+def _resolution_key(value):
+    """
+    Ключ таблицы разбора: пробелы по краям и тип ячейки на разбор не влияют,
+    поэтому ' юп-1625 ', 'юп-1625' (после str.strip()) и 345 / '345' - одна запись
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return value
+    return str(value).strip()
+
+def resolve_profiles(values):
+    """Записи разбора для нескольких ячеек профиля (по порядку values)
+    
+    Записи общие для всех запросов - не изменять. Таблица не изменяется на
+    месте: значения, которых в ней нет (например, из книг прошлых лет),
+    считаются и добавляются одной копией таблицы на весь вызов.
+    """
+    global _resolutions
+    table = _resolutions
+    records = []
+    missing = {}
+    for value in values:
+        key = _resolution_key(value)
+        record = table.get(key)
+        if record is None:
+            record = missing.get(key)
+            if record is None:
+                record = missing[key] = resolve_profile_cell(key)
+        records.append(record)
+    
+    if missing:
+        with _resolutions_lock:
+            # Таблицу уже заменили (новое поколение данных или фото) - записи
+            # могли быть посчитаны по старым фото, в новую таблицу их не кладем
+            if _resolutions is table:
+                _resolutions = {**table, **missing}
+    return records
+
+def resolve_profile(value):
+    """Запись разбора ячейки профиля (resolve_profiles для одного значения)
     
-    # Разбиваем на отдельные профили
-    profiles = split_profiles(profile_string)
+    Для многих значений подряд - resolve_profiles: каждое отсутствующее
+    значение здесь копирует таблицу.
+    """
+    return resolve_profiles([value])[0]
+
+def build_resolution_table(df, previous=None):
+    """
+    Таблица разбора для всех уникальных значений колонки profile
     
-    # Проверяем каждый профиль
-    for profile_dict in profiles:
-        thumb_url, full_url, _ = get_profile_photo(profile_dict["name"])
-        if thumb_url or full_url:
-            return True  # Хотя бы у одного есть фото
+    Args:
+        df: нормализованный DataFrame (None - пустая таблица)
+        previous: таблица прошлого поколения данных при том же поколении фото -
+                  записи для уже встречавшихся значений берутся из нее
     
-    return False  # Ни у одного нет фото
+    Returns:
+        dict {_resolution_key(значение ячейки): запись resolve_profile_cell()}
+    """
+    table = {}
+    if df is None or df.empty:
+        return table
+    previous = previous or {}
+    for value in df['profile'].dropna().unique():
+        key = _resolution_key(value)
+        if key in table:
+            continue
+        record = previous.get(key)
+        table[key] = record if record is not None else resolve_profile_cell(key)
+    return table
 
 def get_profiles_without_photos():
     """Возвращает список уникальных профилей без фото"""
@@ -475,76 +990,82 @@ def get_profiles_without_photos():
     if df is None:
         return []
     
-    # Получаем все уникальные профили
-    profiles = df['profile'].dropna().unique()
-    profiles = sorted([str(p).strip() for p in profiles if str(p).strip()])
+    # Уникальные профили (без пробелов по краям) и сколько раз используются
+    if _mirror_ready():
+        counts = {row['profile']: row['count'] for row in _mirror.profile_stats(RECENT_WINDOW)}
+    else:
+        names = df['profile'].dropna().astype(str).str.strip()
+        counts = names[names != ''].value_counts().to_dict()
     
     # Фильтруем те, у которых нет фото
     missing = []
-    for profile in profiles:
-        thumb_url, full_url, _ = get_profile_photo(profile)
-        if not thumb_url and not full_url:
-            # Считаем сколько раз используется
-            count = len(df[df['profile'] == profile])
-            missing.append({'profile': profile, 'count': count})
+    profiles = sorted(counts)
+    for profile, record in zip(profiles, resolve_profiles(profiles)):
+        if not record['photo_thumb'] and not record['photo_full']:
+            missing.append({'profile': profile, 'count': int(counts[profile])})
     
     return sorted(missing, key=lambda x: x['count'], reverse=True)
 
+def iter_workbooks(df, all_years=False):
+    """
+    Данные по книгам: (имя книги, DataFrame) - сначала текущая книга,
+    затем (если all_years) книги прошлых лет от новых к старым
+    
+    Книги прошлых лет загружаются лениво (excel_archive): если вызывающий
+    код остановился раньше - старые годы не читаются вообще.
+    """
+    status = _freshness.current()
+    current_name = status['excel_file'].name if status['excel_file'] else EXCEL_FILENAME
+    yield current_name, df
+    if all_years and status['workbooks']:
+        yield from _archive.partitions(EXCEL_DIR, status['workbooks'], current_name)
+
 def get_recent_profiles(limit=50):
     """Возвращает последние записи с заполненным полем 'Профиль'"""
     df = get_dataframe()
     if df is None:
         return []
     
-    # Фильтруем только строки с заполненным профилем
-    df_with_profiles = df[pd.notna(df['profile']) & (df['profile'].astype(str).str.strip() != '')]
-    
-    # Сохраняем оригинальный индекс для правильной сортировки
-    # Индекс = номер строки в Excel, поэтому последние строки = максимальный индекс
-    df_with_profiles = df_with_profiles.sort_index(ascending=False)
-    
-    # Берем последние N записей
-    recent = df_with_profiles.head(limit)
+    if _mirror_ready():
+        # Последние N строк с профилем - одним запросом к зеркалу
+        rows = _mirror.window_rows(RECENT_WINDOW, 'profile IS NOT NULL', order='DESC', limit=limit)
+        recent = [(row['row_idx'], row['profile'], row['date_full_str'], row['number_display']) for row in rows]
+    else:
+        # Фильтруем только строки с заполненным профилем
+        df_with_profiles = df[pd.notna(df['profile']) & (df['profile'].astype(str).str.strip() != '')]
+        
+        # Сохраняем оригинальный индекс для правильной сортировки
+        # Индекс = номер строки в Excel, поэтому последние строки = максимальный индекс
+        df_with_profiles = df_with_profiles.sort_index(ascending=False)
+        
+        # Берем последние N записей
+        recent = [(idx, str(row['profile']).strip(), row['date_full_str'], row['number_display'])
+                  for idx, row in df_with_profiles.head(limit).iterrows()]
     
     # Формируем результат с проверкой наличия фото
     result = []
-    for idx, row in recent.iterrows():
-        profile_name = str(row['profile']).strip()
-        # Проверяем есть ли фото хотя бы у одного из профилей в строке
-        has_photo = check_profiles_have_photos(profile_name)
-        
-        # Получаем URL фото (для первого профиля если их несколько)
-        profiles = split_profiles(profile_name)
-        thumb_url, full_url = None, None
-        if profiles:
-            thumb_url, full_url, _ = get_profile_photo(profiles[0]["name"])
-        
-        # Создаём детальную информацию по каждому профилю
-        profiles_info = []
-        for p_dict in profiles:
-            p_thumb, p_full, _ = get_profile_photo(p_dict["name"])
-            profiles_info.append({
-                'name': p_dict["name"],
-                'processing': p_dict["processing"],  # Список обработок
-                'has_photo': bool(p_thumb or p_full),
-                'photo_thumb': p_thumb,
-                'photo_full': p_full
-            })
+    for idx, profile_name, date_full_str, number_display in recent:
+        # Разбор ячейки и фото - из таблицы поколения
+        record = resolve_profile(profile_name)
+        
+        # Детальная информация по каждому профилю (без канонических имен)
+        profiles_info = [{key: p[key] for key in ('name', 'processing', 'has_photo', 'photo_thumb', 'photo_full')}
+                         for p in record['profiles_info']]
         
         result.append({
             'profile': profile_name,
             'profiles_info': profiles_info,  # Детальная инфа по каждому профилю
-            'date': row['date'].strftime('%d.%m.%Y') if pd.notna(row['date']) else '—',
-            'number': row['number'] if pd.notna(row['number']) else '—',
-            'has_photo': has_photo,
-            'photo_thumb': thumb_url,
-            'photo_full': full_url,
+            'date': date_full_str,
+            'number': number_display,
+            'has_photo': record['has_photo'],  # Фото хотя бы у одного из профилей
+            'photo_thumb': record['first_thumb'],  # Фото первого профиля
+            'photo_full': record['first_full'],
             'row_number': int(idx) + 2  # +2 потому что индекс с 0 + заголовок в Excel
         })
     
     return result
 
-def get_recent_missing_profiles(limit=20, offset=0):
+def get_recent_missing_profiles(limit=20, offset=0, all_years=False):
     """
     Возвращает топ N уникальных профилей БЕЗ фото (по последней строке) с пагинацией
     Просматривает ВСЕ строки файла без ограничений!
@@ -552,6 +1073,7 @@ def get_recent_missing_profiles(limit=20, offset=0):
     Args:
         limit: сколько профилей вернуть (по умолчанию 20)
         offset: сколько профилей пропустить (для пагинации, по умолчанию 0)
+        all_years: просматривать и книги прошлых лет (после текущей)
     
     Returns:
         dict: {'profiles': [...], 'total': N, 'has_more': bool}
@@ -561,38 +1083,42 @@ def get_recent_missing_profiles(limit=20, offset=0):
     if df is None:
         return {'profiles': [], 'total': 0, 'has_more': False}
     
-    # Фильтруем только строки с заполненным профилем
-    df_with_profiles = df[pd.notna(df['profile']) & (df['profile'].astype(str).str.strip() != '')]
-    
-    # Сортируем по индексу (последние строки сверху)
-    df_with_profiles = df_with_profiles.sort_index(ascending=False)
-    
-    # БЕЗ ОГРАНИЧЕНИЙ - просматриваем ВСЕ строки!
-    
     # Собираем ВСЕ уникальные профили без фото (для подсчета total и пагинации)
     all_missing = []
     seen_profiles = set()
     
-    for idx, row in df_with_profiles.iterrows():
-        profile_name = str(row['profile']).strip()
+    for workbook, part in iter_workbooks(df, all_years):
+        # Фильтруем только строки с заполненным профилем
+        df_with_profiles = part[pd.notna(part['profile']) & (part['profile'].astype(str).str.strip() != '')]
         
-        # Пропускаем, если этот профиль уже был добавлен
-        if profile_name in seen_profiles:
-            continue
+        # Сортируем по индексу (последние строки сверху)
+        df_with_profiles = df_with_profiles.sort_index(ascending=False)
         
-        # Проверяем наличие фото хотя бы у одного из профилей (быстрая проверка по кэшу)
-        has_photo = check_profiles_have_photos(profile_name)
+        # Фото хотя бы у одного из профилей - по таблице разбора, одним вызовом на книгу
+        names = df_with_profiles['profile'].astype(str).str.strip().unique().tolist()
+        has_photos = {name: record['has_photo'] for name, record in zip(names, resolve_profiles(names))}
         
-        # Только профили БЕЗ фото
-        if not has_photo:
-            all_missing.append({
-                'profile': profile_name,
-                'date': row['date'].strftime('%d.%m.%Y') if pd.notna(row['date']) else '—',
-                'number': row['number'] if pd.notna(row['number']) else '—',
-                'has_photo': False,
-                'row_number': int(idx) + 2  # +2 для Excel (индекс с 0 + заголовок)
-            })
-            seen_profiles.add(profile_name)
+        # БЕЗ ОГРАНИЧЕНИЙ - просматриваем ВСЕ строки!
+        for idx, row in df_with_profiles.iterrows():
+            profile_name = str(row['profile']).strip()
+            
+            # Пропускаем, если этот профиль уже был добавлен (в этой или более новой книге)
+            if profile_name in seen_profiles:
+                continue
+            
+            has_photo = has_photos[profile_name]
+            
+            # Только профили БЕЗ фото
+            if not has_photo:
+                all_missing.append({
+                    'profile': profile_name,
+                    'date': row['date_full_str'],
+                    'number': row['number_display'],
+                    'has_photo': False,
+                    'row_number': int(idx) + 2,  # +2 для Excel (индекс с 0 + заголовок)
+                    'workbook': workbook
+                })
+                seen_profiles.add(profile_name)
     
     # Применяем пагинацию
     total = len(all_missing)
@@ -614,6 +1140,10 @@ def get_products(limit=None, days=2, no_time_filter=False, unload_filter=False,
         if df is None:
             return {'error': 'Excel файл (.xlsm) не найден', 'products': []}
         
+        if _mirror_ready():
+            return get_products_from_mirror(limit, days, no_time_filter, unload_filter,
+                                            loading_limit, unloading_limit)
+        
         total_before = len(df)
         print(f"[DEBUG] Загружено строк из Excel: {total_before}")
         
@@ -624,9 +1154,8 @@ def get_products(limit=None, days=2, no_time_filter=False, unload_filter=False,
         # Фильтр по дате (последние N дней) - только если не отключен no_time_filter
         if days and not no_time_filter:
             cutoff_date = datetime.now() - timedelta(days=days)
-            df['date'] = pd.to_datetime(df['date'], errors='coerce')
             # Оставляем строки: (дата >= cutoff) ИЛИ (дата пустая, но есть номер)
-            df = df[(df['date'] >= cutoff_date) | (pd.isna(df['date']) & pd.notna(df['number']))]
+            df = df[(df['date_dt'] >= cutoff_date) | (pd.isna(df['date_dt']) & pd.notna(df['number']))]
             print(f"[DEBUG] После фильтра по дате ({days} дней): {len(df)} строк")
         else:
             print(f"[DEBUG] Фильтр по дате отключен - показываем ВСЕ {len(df)} строк")
@@ -637,16 +1166,16 @@ def get_products(limit=None, days=2, no_time_filter=False, unload_filter=False,
         # Если включены оба фильтра
         if no_time_filter and unload_filter:
             # Загрузка: БЕЗ времени, С профилем
-            df_loading = df[pd.isna(df['time']) & pd.notna(df['profile'])]
+            df_loading = df[~df['has_time'] & pd.notna(df['profile'])]
             load_limit = loading_limit if loading_limit else 10
             df_loading = df_loading.head(load_limit)
-            loading_products = process_dataframe(df_loading)
+            loading_products = with_row_numbers(process_dataframe(df_loading), df_loading.index)
             
             # Выгрузка: последние N строк С временем
-            df_unloading = df[pd.notna(df['time'])]
+            df_unloading = df[df['has_time']]
             unload_limit = unloading_limit if unloading_limit else 10
             df_unloading = df_unloading.tail(unload_limit)
-            unloading_products = process_dataframe(df_unloading)
+            unloading_products = with_row_numbers(process_dataframe(df_unloading), df_unloading.index)
             
             return {
                 'success': True,
@@ -655,18 +1184,20 @@ def get_products(limit=None, days=2, no_time_filter=False, unload_filter=False,
                 'total': len(loading_products) + len(unloading_products),
                 'total_all': total_before,
                 'days_filter': days,
-                'dual_mode': True
+                'dual_mode': True,
+                'generation': _cache.get('generation', 0),
+                'epoch': GENERATION_EPOCH
             }
         
         # Фильтр: только Загрузка
         elif no_time_filter:
-            df = df[pd.isna(df['time']) & pd.notna(df['profile'])]
+            df = df[~df['has_time'] & pd.notna(df['profile'])]
             load_limit = loading_limit if loading_limit else (limit if limit else 10)
             df = df.head(load_limit)
         
         # Фильтр: только Выгрузка
         elif unload_filter:
-            df = df[pd.notna(df['time'])]
+            df = df[df['has_time']]
             unload_limit = unloading_limit if unloading_limit else 10
             df = df.tail(unload_limit)
         
@@ -686,87 +1217,278 @@ def get_products(limit=None, days=2, no_time_filter=False, unload_filter=False,
             'products': products,
             'total': len(products),
             'total_all': total_before,
-            'days_filter': days
+            'days_filter': days,
+            'generation': _cache.get('generation', 0),
+            'epoch': GENERATION_EPOCH
         }
         
     except Exception as e:
         return {'error': str(e), 'products': []}
 
-def process_dataframe(df):
-    """Обрабатывает DataFrame и возвращает список продуктов"""
-    products = []
-    for _, row in df.iterrows():
-        # Обработка ламелей (может быть "30+30" или число)
-        lamels = row['lamels_qty']
-        if pd.notna(lamels):
-            try:
-                # Если число - конвертим в int
-                lamels_display = int(float(lamels))
-            except:
-                # Если строка типа "30+30" - оставляем как есть
-                lamels_display = str(lamels)
-        else:
-            lamels_display = 0
-        
-        # Форматирование времени (убираем секунды)
-        time_str = '—'
-        if pd.notna(row['time']):
-            time_obj = row['time']
-            # Если это объект time/datetime - конвертируем
-            if hasattr(time_obj, 'strftime'):
-                time_str = time_obj.strftime('%H:%M')
-            else:
-                # Если строка - парсим
-                time_val = str(time_obj)
-                if ':' in time_val:
-                    parts = time_val.split(':')
-                    time_str = f"{parts[0]}:{parts[1]}"
-                else:
-                    time_str = time_val
-        
-        profile_name = row['profile'] if pd.notna(row['profile']) else '—'
-        # Нормализуем дефисы (- и — оба считаем пустым значением)
-        is_empty_profile = not profile_name or profile_name in ('-', '—', '--')
-        profile_thumb, profile_full, canonical_name = get_profile_photo(profile_name) if not is_empty_profile else (None, None, None)
-        
-        # Создаём детальную информацию по каждому профилю в ячейке
-        profiles_info = []
-        if not is_empty_profile:
-            profiles = split_profiles(profile_name)
-            for p_dict in profiles:
-                p_thumb, p_full, p_canonical = get_profile_photo(p_dict["name"])
-                profiles_info.append({
-                    'name': p_dict["name"],
-                    'canonical_name': p_canonical or p_dict["name"],
-                    'processing': p_dict["processing"],  # Список обработок
-                    'has_photo': bool(p_thumb or p_full),
-                    'photo_thumb': p_thumb,
-                    'photo_full': p_full
-                })
+def get_products_from_mirror(limit=None, days=2, no_time_filter=False, unload_filter=False,
+                             loading_limit=None, unloading_limit=None):
+    """
+    То же, что get_products, но запросами к SQLite зеркалу
+    
+    Окно - последние RECENT_WINDOW строк листа (как get_dataframe()):
+    SQLite берет их по первичному ключу и фильтрует сам, без сборки
+    DataFrame; индексы колонок здесь не участвуют (окно - 100 строк).
+    """
+    total_before = _mirror.window_size(RECENT_WINDOW)
+    
+    # Фильтр валидных строк: должна быть дата ИЛИ номер подвеса
+    where = '(has_date OR has_number)'
+    params = ()
+    
+    # Фильтр по дате (последние N дней) - только если не отключен no_time_filter
+    if days and not no_time_filter:
+        cutoff_date = datetime.now() - timedelta(days=days)
+        # Оставляем строки: (дата >= cutoff) ИЛИ (дата пустая, но есть номер)
+        where += ' AND (date_ns >= ? OR (date_ns IS NULL AND has_number))'
+        params = (pd.Timestamp(cutoff_date).value,)
+    
+    loading_where = f'{where} AND has_time = 0 AND has_profile'
+    unloading_where = f'{where} AND has_time = 1'
+    
+    # Если включены оба фильтра
+    if no_time_filter and unload_filter:
+        # Загрузка: БЕЗ времени, С профилем (первые N строк окна)
+        loading = _mirror.window_rows(RECENT_WINDOW, loading_where, params, 'ASC', loading_limit or 10)
+        # Выгрузка: последние N строк С временем
+        unloading = _mirror.window_rows(RECENT_WINDOW, unloading_where, params, 'DESC', unloading_limit or 10)
+        unloading = unloading[::-1]
+        loading_products = with_row_numbers(process_rows(loading), [row['row_idx'] for row in loading])
+        unloading_products = with_row_numbers(process_rows(unloading), [row['row_idx'] for row in unloading])
         
-        products.append({
-            'number': row['number'] if pd.notna(row['number']) else '—',
-            'date': row['date'].strftime('%d.%m.%y') if pd.notna(row['date']) else '—',
-            'time': time_str,
-            'client': row['client'] if pd.notna(row['client']) else '—',
-            'profile': profile_name,
-            'canonical_name': canonical_name or profile_name,
-            'profiles_info': profiles_info,  # Детальная инфа по каждому профилю
-            'profile_photo_thumb': profile_thumb,
-            'profile_photo_full': profile_full,
-            'color': row['color'] if pd.notna(row['color']) else '—',
-            'lamels_qty': lamels_display,
-            'kpz_number': row['kpz_number'] if pd.notna(row['kpz_number']) else '—',
-            'material_type': row['material_type'] if pd.notna(row['material_type']) else '—',
-        })
+        return {
+            'success': True,
+            'products': loading_products,
+            'unloading_products': unloading_products,
+            'total': len(loading_products) + len(unloading_products),
+            'total_all': total_before,
+            'days_filter': days,
+            'dual_mode': True,
+            'generation': _cache.get('generation', 0),
+            'epoch': GENERATION_EPOCH
+        }
+    
+    # Фильтр: только Загрузка
+    if no_time_filter:
+        rows = _mirror.window_rows(RECENT_WINDOW, loading_where, params, 'ASC',
+                                   loading_limit or limit or 10)
+    # Фильтр: только Выгрузка
+    elif unload_filter:
+        rows = _mirror.window_rows(RECENT_WINDOW, unloading_where, params, 'DESC', unloading_limit or 10)[::-1]
+    # Обычный режим - все строки окна (или limit последних), новые первыми
+    else:
+        rows = _mirror.window_rows(RECENT_WINDOW, where, params, 'DESC', limit or None)
     
+    products = process_rows(rows)
+    
+    return {
+        'success': True,
+        'products': products,
+        'total': len(products),
+        'total_all': total_before,
+        'days_filter': days,
+        'generation': _cache.get('generation', 0),
+        'epoch': GENERATION_EPOCH
+    }
+
+# Колонки ответа (excel_normalize / excel_mirror) в порядке аргументов build_product
+PRODUCT_COLUMNS = ['number_display', 'date_str', 'time_str', 'client_display', 'profile_display',
+                   'color_display', 'lamels_display', 'kpz_number_display', 'material_type_display']
+
+def process_dataframe(df):
+    """Обрабатывает DataFrame и возвращает список продуктов
+    
+    Даты, время, ламели и пустые значения уже подготовлены при загрузке
+    (excel_normalize), здесь только сборка ответа.
+    """
+    return [build_product(*values) for values in df[PRODUCT_COLUMNS].itertuples(index=False)]
+
+def process_rows(rows):
+    """Как process_dataframe, но для строк SQLite зеркала (sqlite3.Row)"""
+    return [build_product(*(row[column] for column in PRODUCT_COLUMNS)) for row in rows]
+
+def build_product(number, date_str, time_str, client, profile_name,
+                  color, lamels_display, kpz_number, material_type):
+    """Один продукт (строка листа) в формате ответа API"""
+    # Нормализуем дефисы (- и — оба считаем пустым значением)
+    is_empty_profile = not profile_name or profile_name in ('-', '—', '--')
+    # Разбор ячейки и фото - из таблицы поколения
+    record = resolve_profile(profile_name) if not is_empty_profile else {}
+    
+    return {
+        'number': number,
+        'date': date_str,
+        'time': time_str,
+        'client': client,
+        'profile': profile_name,
+        'canonical_name': record.get('canonical_name') or profile_name,
+        'profiles_info': record.get('profiles_info', []),  # Детальная инфа по каждому профилю
+        'profile_photo_thumb': record.get('photo_thumb'),
+        'profile_photo_full': record.get('photo_full'),
+        'color': color,
+        'lamels_qty': lamels_display,
+        'kpz_number': kpz_number,
+        'material_type': material_type,
+    }
+
+def build_delta_payload(df, delta, since, generation):
+    """
+    Ответ с дельтой: добавленные и измененные строки в формате process_dataframe
+    (+ поле row - номер строки Excel, section - таблица дашборда) и номера
+    удаленных строк; first_row и total_all - окно дашборда после изменений
+    """
+    rows = delta['added'] + delta['changed']
+    if len(rows) > DELTA_MAX_ROWS:
+        return {'success': True, 'since': since, 'generation': generation,
+                'epoch': GENERATION_EPOCH, 'full_reload': True}
+    
+    products = with_row_numbers(process_dataframe(df.loc[rows]), rows) if rows else []
+    for product, section in zip(products, dashboard_sections(df.loc[rows])):
+        product['section'] = section
+    
+    # Окно дашборда (get_dataframe): клиент убирает строки, вышедшие из него
+    window = df.index[-RECENT_WINDOW:]
+    n_added = len(delta['added'])
+    return {
+        'success': True,
+        'since': since,
+        'generation': generation,
+        'epoch': GENERATION_EPOCH,
+        'full_reload': False,
+        'added': products[:n_added],
+        'changed': products[n_added:],
+        'removed': [excel_loader.excel_row_number(idx) for idx in delta['removed']],
+        'first_row': excel_loader.excel_row_number(window[0]) if len(window) else None,
+        'total_all': len(window),
+    }
+
+def with_row_numbers(products, indexes):
+    """Добавляет в продукты поле row - номер строки Excel (по нему клиент применяет дельты)"""
+    for idx, product in zip(indexes, products):
+        product['row'] = excel_loader.excel_row_number(idx)
     return products
 
+def dashboard_sections(df):
+    """
+    В какую таблицу дашборда попадает строка (как get_products в режиме двух таблиц):
+    'loading' - без времени, с профилем; 'unloading' - с временем; None - ни в какую
+    """
+    valid = (df['date'].notna() | df['number'].notna()).to_numpy()
+    has_time = df['has_time'].to_numpy(dtype=bool)
+    has_profile = df['profile'].notna().to_numpy()
+    sections = np.where(has_time, 'unloading', np.where(has_profile, 'loading', ''))
+    return [section if ok and section else None for section, ok in zip(sections.tolist(), valid)]
+
+def get_products_delta(since, epoch):
+    """
+    Изменения строк после поколения since (для ?since=<generation>&epoch=<epoch>)
+    
+    Если поколение since уже вышло из истории дельт, неизвестно или получено
+    от другого процесса (epoch не совпадает с GENERATION_EPOCH) -
+    full_reload=True: клиенту нужно перезапросить данные целиком.
+    """
+    # Проверяем свежесть кэша (при необходимости запускается фоновое обновление)
+    if get_dataframe() is None:
+        return {'error': 'Excel файл (.xlsm) не найден', 'success': False}
+    
+    with _index_lock:
+        df = _cache['df']
+        generation = _cache['generation']
+        deltas = [d for d in _deltas if d['generation'] > since]
+    
+    if since == generation and epoch == GENERATION_EPOCH:
+        return build_delta_payload(df, {'added': [], 'changed': [], 'removed': []}, since, generation)
+    if epoch != GENERATION_EPOCH or since > generation or not deltas or deltas[0]['generation'] != since + 1:
+        return {'success': True, 'since': since, 'generation': generation,
+                'epoch': GENERATION_EPOCH, 'full_reload': True}
+    return build_delta_payload(df, excel_delta.merge_deltas(deltas), since, generation)
+
+def build_hanger_index(df):
+    """
+    Строит индекс подвесов: номер подвеса → последняя строка + история
+    
+    Для последней строки сразу собирается готовый ответ (как process_dataframe,
+    с фото профилей), поэтому /api/signal делает только поиск в словаре.
+    
+    Returns:
+        dict {number_key: {'number_key': нормализованный номер,
+                           'position': индекс строки,
+                           'history': [предыдущие индексы, новые первыми],
+                           'product': dict}}
+        product['number'] - номер как в ячейке (number_display), не ключ
+    """
+    if df is None or df.empty:
+        return {}
+    
+    keys = df['number_key']
+    df_numbers = df[keys != '']
+    
+    positions = {}
+    for key, idx in zip(df_numbers['number_key'], df_numbers.index):
+        positions.setdefault(key, []).append(int(idx))
+    
+    last_positions = [rows[-1] for rows in positions.values()]
+    products = process_dataframe(df_numbers.loc[last_positions]) if last_positions else []
+    
+    index = {}
+    for (key, rows), product in zip(positions.items(), products):
+        index[key] = {
+            'number_key': key,
+            'position': rows[-1],
+            'history': rows[-HANGER_HISTORY - 1:-1][::-1],
+            'product': product,
+        }
+    return index
+
+def profile_key(name):
+    """Ключ профиля для индекса: без обработок, Latin→Cyrillic, без дефисов и пробелов"""
+    parsed = parse_profile_with_processing(name)
+    return text_normalize.search_key(parsed['name'] or name)
+
+def build_profile_index(df):
+    """
+    Обратный индекс профилей: ключ профиля → позиции строк, где он встречается
+    
+    Строка "юп-1625 окно + юп-3233" попадает в списки обоих профилей
+    (split_profiles). Ключи берутся из таблицы разбора (resolve_profile).
+    
+    Returns:
+        dict {profile_key: np.ndarray int32 позиций строк (iloc) по возрастанию}
+    """
+    if df is None or df.empty:
+        return {}
+    
+    codes, uniques = pd.factorize(df['profile'], use_na_sentinel=True)
+    # Строки, сгруппированные по значению ячейки: order[bounds[c]:bounds[c + 1]]
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    
+    parts = {}
+    for code, record in enumerate(resolve_profiles(uniques)):
+        keys = set(record['keys'])
+        positions = order[bounds[code]:bounds[code + 1]]
+        for key in keys:
+            if key:
+                parts.setdefault(key, []).append(positions)
+    
+    return {key: np.sort(np.concatenate(arrays)).astype(np.int32) for key, arrays in parts.items()}
+
+def rebuild_hanger_index():
+    """Пересобирает индекс подвесов текущего поколения (например, после изменения фото)"""
+    with _index_lock:
+        df = _cache.get('df')
+        if df is not None:
+            _cache['hanger_index'] = build_hanger_index(df)
+
 @app.route('/api/signal', methods=['POST'])
 def receive_signal():
     """
     Принимает сигнал о выходе подвеса и отправляет событие WebSocket
-    Ищет данные в последних 100 строках Excel (кэшированных)
+    Ищет подвес по индексу (последняя строка с этим номером во всем файле)
     """
     data = request.get_json()
     hanger_number = data.get('hanger_number')
@@ -775,20 +1497,15 @@ def receive_signal():
     if not hanger_number:
         return jsonify({'success': False, 'error': 'hanger_number не указан'}), 400
         
-    # Загружаем последние 100 строк из кэша (быстро)
+    # Проверяем свежесть кэша (при необходимости запускается фоновое обновление)
     df = get_dataframe(full_dataset=False)
     if df is None:
         return jsonify({'success': False, 'error': 'Не удалось прочитать Excel файл'}), 500
         
-    # Ищем строку с нужным номером подвеса в последних 100 строках
-    df['number'] = df['number'].astype(str)
-    hanger_data = df[df['number'] == str(hanger_number)]
-    
-    # Если найдено несколько - берем самую последнюю (максимальный индекс)
-    if not hanger_data.empty and len(hanger_data) > 1:
-        hanger_data = hanger_data.tail(1)
+    # Ищем подвес в индексе (самая последняя строка с этим номером)
+    hanger_entry = _cache.get('hanger_index', {}).get(excel_normalize.normalize_hanger_number(hanger_number))
     
-    if hanger_data.empty:
+    if hanger_entry is None:
         # Если не нашли, отправляем просто номер и время
         product_data = {
             'number': hanger_number,
@@ -803,12 +1520,8 @@ def receive_signal():
             'material_type': '—'
         }
     else:
-        # Обрабатываем найденную строку
-        processed_products = process_dataframe(hanger_data)
-        if not processed_products:
-            return jsonify({'success': False, 'error': 'Не удалось обработать данные подвеса'}), 500
-            
-        product_data = processed_products[0]
+        # Готовый ответ из индекса (копия - время ниже подменяется)
+        product_data = dict(hanger_entry['product'])
         # Если в сигнале есть время, используем его
         if exit_time:
             product_data['time'] = exit_time
@@ -837,6 +1550,11 @@ def api_products():
     loading_limit = request.args.get('loading_limit', type=int)
     unloading_limit = request.args.get('unloading_limit', type=int)
     
+    # ?since=<поколение>&epoch=<эпоха> - только изменения строк после этого поколения
+    since = request.args.get('since', type=int)
+    if since is not None:
+        return jsonify(get_products_delta(since, request.args.get('epoch', '')))
+    
     data = get_products(limit, days, no_time_filter, unload_filter, loading_limit, unloading_limit)
     return jsonify(data)
 
@@ -858,7 +1576,9 @@ def api_missing_profiles():
         })
     elif sort_by == 'recent_missing':
         # Для этого режима просматриваем ВЕСЬ файл, возвращаем с пагинацией
-        result = get_recent_missing_profiles(limit=limit, offset=offset)
+        # all_years=true - еще и книги прошлых лет в той же папке
+        all_years = request.args.get('all_years', default='false') == 'true'
+        result = get_recent_missing_profiles(limit=limit, offset=offset, all_years=all_years)
         return jsonify({
             'success': True,
             'total': result['total'],
@@ -882,10 +1602,7 @@ def api_missing_profiles():
 def api_catalog():
     """API для получения всех профилей из справочника с поиском и сортировкой (case-insensitive, с нормализацией символов)"""
     try:
-        # ВАЖНО: Обновляем кэш фото каждый раз когда запрашивают каталог
-        # Это гарантирует что новые фото будут видны сразу
-        scan_profile_photos()
-        
+        # Индекс фото актуален: его обновляют события папки с фото и загрузка/удаление
         search = request.args.get('search', '').strip()
         sort_by = request.args.get('sort', 'updated_at').strip()  # updated_at, name, usage_count, has_photos
         direction = request.args.get('direction', 'DESC').strip().upper()  # ASC или DESC
@@ -940,8 +1657,8 @@ def api_delete_profile(profile_name):
             if full_path.exists():
                 full_path.unlink()
             
-            # Обновляем кэш
-            scan_profile_photos()
+            # Обновляем кэш (только эти два файла)
+            update_profile_photo_files(thumb_path, full_path)
             
             return jsonify({'success': True, 'message': f'Профиль "{profile_name}" удалён'})
         else:
@@ -1002,8 +1719,8 @@ def api_update_profile(profile_name):
                 photo_thumb=photo_thumb
             )
             
-            # 5. Обновляем кэш фото
-            scan_profile_photos()
+            # 5. Обновляем кэш фото (только переименованные файлы)
+            update_profile_photo_files(old_full_path, old_thumb_path, new_full_path, new_thumb_path)
             
             if success:
                 return jsonify({'success': True, 'message': f'Профиль "{profile_name}" переименован на "{new_name}"'})
@@ -1049,6 +1766,8 @@ def api_sync_photos():
 def api_search_duplicates():
     """Поиск профилей похожих на запрос (fuzzy matching)"""
     query = request.args.get('query', '').strip().lower()
+    # all_years=true - искать и в книгах прошлых лет в той же папке
+    all_years = request.args.get('all_years', default='false') == 'true'
     
     if not query:
         return jsonify({
@@ -1064,44 +1783,66 @@ def api_search_duplicates():
             'error': 'Не удалось загрузить данные'
         })
     
-    # Фильтруем только строки с заполненным профилем
-    df_with_profiles = df[pd.notna(df['profile']) & (df['profile'].astype(str).str.strip() != '')]
-    
     # Ищем похожие профили
-    matches = []
-    seen_profiles = {}  # {profile_name: (row_idx, similarity)}
-    
-    for idx, row in df_with_profiles.iterrows():
-        profile_name = str(row['profile']).strip()
-        profile_lower = profile_name.lower()
-        
-        # Вычисляем процент совпадения
-        similarity = calculate_similarity(query, profile_lower)
-        
-        # Порог совпадения >= 30%
-        if similarity >= 30:
-            # Берем самую свежую строку для каждого профиля
-            if profile_name not in seen_profiles or idx > seen_profiles[profile_name][0]:
-                seen_profiles[profile_name] = (idx, similarity)
+    matches = {}  # {profile_name: результат по самой свежей строке}
+    similarities = {}  # {profile_lower: процент} - считаем один раз на уникальное название
+    
+    for workbook, part in iter_workbooks(df, all_years):
+        if part is df and _mirror_ready():
+            # Текущая книга: группировка по индексу profile в SQLite зеркале
+            stats = [(row['profile'], row['last_idx'], row['count']) for row in _mirror.profile_stats()]
+            # Строки всех совпадений - одним запросом WHERE row_idx IN (...)
+            rows_at = _mirror.rows
+        else:
+            # Фильтруем только строки с заполненным профилем
+            names = part['profile'][pd.notna(part['profile'])].astype(str).str.strip()
+            names = names[names != '']
+            if names.empty:
+                continue
+            
+            # Для каждого названия: сколько раз встречается и самая свежая строка
+            grouped = pd.Series(names.index, index=names.index).groupby(names.to_numpy(), sort=False)
+            stats = pd.DataFrame({'last_idx': grouped.max(), 'count': grouped.size()}).itertuples()
+            rows_at = lambda indexes, part=part: {idx: part.loc[idx] for idx in indexes}
+        
+        found = []  # (название, самая свежая строка, частота, процент) новых совпадений книги
+        for profile_name, last_idx, count in stats:
+            profile_lower = profile_name.lower()
+            
+            # Вычисляем процент совпадения
+            if profile_lower not in similarities:
+                similarities[profile_lower] = calculate_similarity(query, profile_lower)
+            similarity = similarities[profile_lower]
+            
+            # Порог совпадения >= 30%
+            if similarity < 30:
+                continue
+            
+            if profile_name in matches:
+                # Более новая книга уже дала самую свежую строку - добавляем только частоту
+                matches[profile_name]['count'] += int(count)
+                continue
+            
+            # Пока без строки: сама строка нужна только для даты и номера
+            matches[profile_name] = None
+            found.append((profile_name, last_idx, count, similarity))
+        
+        rows = rows_at([last_idx for _, last_idx, _, _ in found])
+        records = resolve_profiles([profile_name for profile_name, _, _, _ in found])
+        for (profile_name, last_idx, count, similarity), record in zip(found, records):
+            row = rows[last_idx]
+            matches[profile_name] = {
+                'profile': profile_name,
+                'date': row['date_full_str'],
+                'number': row['number_display'],
+                'has_photo': bool(record['photo_thumb'] or record['photo_full']),
+                'row_number': int(last_idx) + 2,
+                'similarity': int(similarity),
+                'count': int(count),  # Сколько раз этот профиль встречается
+                'workbook': workbook
+            }
     
-    # Формируем результаты
-    for profile_name, (idx, similarity) in seen_profiles.items():
-        row = df_with_profiles.loc[idx]
-        thumb_url, full_url, _ = get_profile_photo(profile_name)
-        has_photo = bool(thumb_url or full_url)
-        
-        # Подсчитываем сколько раз этот профиль встречается в файле
-        count = len(df_with_profiles[df_with_profiles['profile'].astype(str).str.strip() == profile_name])
-        
-        matches.append({
-            'profile': profile_name,
-            'date': row['date'].strftime('%d.%m.%Y') if pd.notna(row['date']) else '—',
-            'number': row['number'] if pd.notna(row['number']) else '—',
-            'has_photo': has_photo,
-            'row_number': int(idx) + 2,
-            'similarity': int(similarity),
-            'count': count
-        })
+    matches = list(matches.values())
     
     # Сортируем по совпадению (от большего к меньшему), при одинаковом совпадении - по частоте
     matches.sort(key=lambda x: (x['similarity'], x['count']), reverse=True)
@@ -1113,6 +1854,105 @@ def api_search_duplicates():
         'query': query
     })
 
+def _parse_date_arg(value):
+    """Дата из параметра запроса ('2025-06-01' или '01.06.2025'), None если не указана"""
+    if not value:
+        return None
+    return pd.Timestamp(pd.to_datetime(value, dayfirst='.' in value))
+
+def _history_positions(part, index, key, date_from, date_to):
+    """Позиции строк книги с профилем key (новые первыми), с фильтром по дате"""
+    positions = index.get(key)
+    if positions is None:
+        return np.empty(0, dtype=np.int32)
+    positions = positions[::-1]
+    if date_from is not None or date_to is not None:
+        dates = part['date_dt'].to_numpy()[positions]
+        mask = ~np.isnat(dates)
+        if date_from is not None:
+            mask &= dates >= date_from.to_datetime64()
+        if date_to is not None:
+            # date_to - включительно (весь день)
+            mask &= dates < (date_to + pd.Timedelta(days=1)).to_datetime64()
+        positions = positions[mask]
+    return positions
+
+@app.route('/api/profiles/<path:profile_name>/history')
+def api_profile_history(profile_name):
+    """
+    Когда и на каких подвесах проходил профиль (по обратному индексу профилей)
+    
+    Query params:
+        date_from, date_to: период (включительно), '2025-06-01' или '01.06.2025'
+        limit, offset: пагинация (новые строки первыми)
+        all_years: true - еще и книги прошлых лет
+    """
+    limit = request.args.get('limit', default=50, type=int)
+    offset = request.args.get('offset', default=0, type=int)
+    all_years = request.args.get('all_years', default='false') == 'true'
+    try:
+        date_from = _parse_date_arg(request.args.get('date_from', '').strip())
+        date_to = _parse_date_arg(request.args.get('date_to', '').strip())
+    except (ValueError, OverflowError):
+        return jsonify({'success': False, 'error': 'Неверный формат даты'}), 400
+    
+    key = profile_key(profile_name)
+    if not key:
+        return jsonify({'success': False, 'error': 'Не указан профиль'}), 400
+    
+    if get_dataframe(full_dataset=True) is None:
+        return jsonify({'success': False, 'error': 'Не удалось загрузить данные'})
+    
+    # Данные и индекс профилей - одного поколения
+    with _index_lock:
+        df = _cache['df']
+        profile_index = _cache.get('profile_index', {})
+    
+    history = []
+    total = 0
+    for workbook, part in iter_workbooks(df, all_years):
+        if part is df:
+            index = profile_index
+        else:
+            index = _archive.derived(workbook, 'profile_index', build_profile_index) or {}
+        positions = _history_positions(part, index, key, date_from, date_to)
+        
+        # Страница: строки с offset по offset + limit по всем книгам подряд
+        start = max(offset - total, 0)
+        stop = max(offset + limit - total, 0)
+        total += len(positions)
+        page = positions[start:stop]
+        if not len(page):
+            continue
+        
+        rows = part.iloc[page]
+        records = resolve_profiles(rows['profile'])
+        for idx, row, record in zip(rows.index, rows.itertuples(index=False), records):
+            processing = next((p['processing'] for p, name_key in zip(record['profiles_info'], record['keys'])
+                               if name_key == key), [])
+            history.append({
+                'date': row.date_full_str,
+                'time': row.time_str,
+                'number': row.number_display,
+                'client': row.client_display,
+                'profile': row.profile_display,
+                'processing': processing,
+                'color': row.color_display,
+                'lamels_qty': row.lamels_display,
+                'row_number': excel_loader.excel_row_number(idx),
+                'workbook': workbook
+            })
+    
+    return jsonify({
+        'success': True,
+        'profile': profile_name,
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'has_more': (offset + limit) < total,
+        'history': history
+    })
+
 def calculate_similarity(query, text):
     """Вычисляет процент совпадения между запросом и текстом"""
     from difflib import SequenceMatcher
@@ -1150,84 +1990,27 @@ def calculate_similarity(query, text):
 
 @app.route('/api/file/status')
 def api_file_status():
-    """Проверка статуса Excel файла + флаг изменения"""
+    """Проверка статуса Excel файла + флаг изменения (из монитора, без обращения к диску)"""
     try:
-        # Проверяем доступность директории
-        if not EXCEL_DIR.exists():
+        status = _freshness.current()
+        if status['status'] != 'ok':
             return jsonify({
                 'success': False,
-                'status': 'network_error',
-                'message': 'Сетевая директория недоступна'
+                'status': status['status'],
+                'message': status['message']
             })
         
-        # Находим файл
-        if EXCEL_FILENAME:
-            excel_file = EXCEL_DIR / EXCEL_FILENAME
-            if not excel_file.exists():
-                return jsonify({
-                    'success': False,
-                    'status': 'not_found',
-                    'message': f'Файл не найден: {EXCEL_FILENAME}'
-                })
-        else:
-            # Ищем конкретный файл из EXCEL_FILE_PATH
-            excel_path = os.getenv('EXCEL_FILE_PATH', '')
-            if excel_path:
-                excel_filename = os.path.basename(excel_path)
-            else:
-                files = [f for f in os.listdir(EXCEL_DIR) if f.endswith('.xlsm') and not f.startswith('~$')]
-                if not files:
-                    return jsonify({
-                        'success': False,
-                        'status': 'not_found',
-                        'message': 'Excel файл не найден'
-                    })
-                excel_filename = files[0]
-            
-            excel_file = EXCEL_DIR / excel_filename
-        
-        # Проверяем временный файл на ХОСТЕ (извлекаем папку из полного пути)
-        excel_path = os.getenv('EXCEL_FILE_PATH', '')
-        if excel_path:
-            # Извлекаем папку из полного пути (D:\path\to\folder\file.xlsm → D:\path\to\folder)
-            import pathlib
-            excel_host_dir = str(pathlib.Path(excel_path).parent)
-        else:
-            excel_host_dir = None
+        excel_file = status['excel_file']
+        is_open = status['is_open']
         
-        # Пытаемся найти временный файл в папке хоста
-        is_open = False
-        if excel_host_dir:
-            try:
-                import pathlib
-                # На Windows временный файл начинается с ~$
-                # Ищем ВСЕ файлы с префиксом ~$ (может быть разная кодировка имени)
-                temp_files = list(pathlib.Path(excel_host_dir).glob("~$*"))
-                is_open = len(temp_files) > 0
-            except Exception as e:
-                is_open = False
-        
-        # Получаем время последнего изменения
-        import datetime
-        # Используем ctime (время изменения) или mtime (время модификации)
-        # В Windows при сохранении в Excel обновляется mtime
-        mtime = os.path.getmtime(excel_file)
-        
-        # Если файл открыт, также проверяем временный файл
-        if is_open and excel_host_dir:
-            try:
-                temp_files = list(pathlib.Path(excel_host_dir).glob("~$*"))
-                if temp_files:
-                    temp_mtime = os.path.getmtime(temp_files[0])
-                    mtime = max(mtime, temp_mtime)
-            except:
-                pass
-        
-        last_modified = datetime.datetime.fromtimestamp(mtime)
+        # Время последнего изменения (если файл открыт - с учетом временного файла ~$)
+        mtime = status['file_mtime']
+        if is_open and status['temp_mtime'] is not None:
+            mtime = max(mtime, status['temp_mtime'])
+        last_modified = datetime.fromtimestamp(mtime)
         
         # Размер файла
-        file_size = os.path.getsize(excel_file)
-        size_mb = round(file_size / (1024 * 1024), 2)
+        size_mb = round(status['size'] / (1024 * 1024), 2)
         
         # Проверяем флаг изменения и сбрасываем его
         file_changed = _cache.get('file_changed', False)
@@ -1243,7 +2026,8 @@ def api_file_status():
             'last_modified': last_modified.strftime('%d.%m.%Y %H:%M:%S'),
             'last_modified_relative': get_relative_time(last_modified),
             'size_mb': size_mb,
-            'is_open': is_open
+            'is_open': is_open,
+            'detect_latency': status['detect_latency']  # Через сколько сек замечено последнее изменение
         })
         
     except Exception as e:
@@ -1280,6 +2064,82 @@ def catalog_page():
     """Страница справочника профилей с фото и параметрами"""
     return render_template('catalog.html')
 
+@app.route('/api/data-quality')
+def api_data_quality():
+    """
+    Ошибки ввода в текущем поколении данных (проверка при загрузке, excel_quality)
+    
+    Query params:
+        limit: сколько номеров строк Excel отдавать по каждой проверке (по умолчанию 100)
+    """
+    limit = request.args.get('limit', default=100, type=int)
+    
+    # Проверяем свежесть кэша (при необходимости запускается фоновое обновление)
+    if get_dataframe() is None:
+        return jsonify({'success': False, 'error': 'Не удалось загрузить данные'})
+    
+    report = _cache.get('quality')
+    if report is None:
+        return jsonify({'success': False, 'error': 'Проверка еще не выполнена'})
+    
+    return jsonify({
+        'success': True,
+        'generation': report['generation'],
+        'checked_at': report['checked_at'].strftime('%d.%m.%Y %H:%M:%S'),
+        **excel_quality.to_json(report, limit)
+    })
+
+@app.route('/api/stats/lamels')
+def api_stats_lamels():
+    """
+    Пропускная способность: подвесы и ламели по дням / клиентам / цветам (groupby)
+    
+    Query params:
+        by: day, client, color, material, profile (по умолчанию day)
+        date_from, date_to: период (включительно), '2025-06-01' или '01.06.2025'
+        all_years: true - еще и книги прошлых лет
+    """
+    by = request.args.get('by', default='day')
+    if by not in excel_stats.GROUPINGS:
+        return jsonify({'success': False, 'error': f"by: {', '.join(excel_stats.GROUPINGS)}"}), 400
+    all_years = request.args.get('all_years', default='false') == 'true'
+    try:
+        date_from = _parse_date_arg(request.args.get('date_from', '').strip())
+        date_to = _parse_date_arg(request.args.get('date_to', '').strip())
+    except (ValueError, OverflowError):
+        return jsonify({'success': False, 'error': 'Неверный формат даты'}), 400
+    
+    df = get_dataframe(full_dataset=True)
+    if df is None:
+        return jsonify({'success': False, 'error': 'Не удалось загрузить данные'})
+    
+    result = excel_stats.combine([excel_stats.throughput(part, by, date_from, date_to)
+                                  for _, part in iter_workbooks(df, all_years)], by)
+    rows = excel_stats.to_json(result, by)
+    return jsonify({
+        'success': True,
+        'by': by,
+        'total_hangers': sum(row['hangers'] for row in rows),
+        'total_lamels': sum(row['lamels'] for row in rows),
+        'total_invalid': sum(row['invalid'] for row in rows),
+        'stats': rows
+    })
+
+@app.route('/api/cache/memory')
+def api_cache_memory():
+    """Сколько памяти занимают данные Excel: текущее поколение (по колонкам) и книги архива"""
+    memory = _cache.get('memory')
+    archive = _archive.memory()
+    return jsonify({
+        'success': memory is not None,
+        'generation': _cache.get('generation', 0),
+        'rows': len(_cache['df']) if _cache.get('df') is not None else 0,
+        'total_bytes': memory['total'] if memory else 0,
+        'columns': memory['columns'] if memory else {},
+        'archive': archive,
+        'archive_bytes': sum(archive.values())
+    })
+
 @app.route('/api/cache/refresh', methods=['POST'])
 def refresh_cache():
     """Ручное обновление кэша фото профилей"""
@@ -1420,8 +2280,8 @@ def upload_profile_photo():
         )
         print(f"[UPLOAD] Профиль '{clean_name}' сохранён в БД (result={result})")
         
-        # Обновляем кэш фото
-        scan_profile_photos()
+        # Обновляем кэш фото (только загруженные файлы)
+        update_profile_photo_files(full_path, thumb_path)
         print(f"[UPLOAD] Кэш фото обновлён")
         
         return jsonify({
@@ -1435,9 +2295,14 @@ def upload_profile_photo():
         return jsonify({'success': False, 'error': str(e)})
 
 # Инициализируем при старте приложения (для gunicorn и локального запуска)
-db.init_database()
-scan_profile_photos()
-start_file_watcher()
+# В дочернем процессе разбора Excel (spawn повторно импортирует app.py) - не нужно
+if multiprocessing.current_process().name == 'MainProcess':
+    db.init_database()
+    scan_profile_photos()
+    start_photo_watcher()
+    start_reload_worker()
+    _freshness.start()
+    start_file_watcher()
 
 if __name__ == '__main__':
     # Загружаем настройки из .env
@@ -1459,3 +2324,4 @@ if __name__ == '__main__':
         if observer:
             observer.stop()
             observer.join()
+        excel_loader.shutdown_process_pool()
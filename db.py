@@ -11,6 +11,8 @@ from datetime import datetime
 from pathlib import Path
 import os
 
+import text_normalize
+
 # Установляем UTF-8 кодировку для работы с кириллицей
 if sys.stdout and sys.stdout.encoding != 'utf-8':
     try:
@@ -27,63 +29,6 @@ DB_FILE = Path(_db_path)
 if str(DB_FILE).startswith('/app/data') and not DB_FILE.exists():
     DB_FILE = Path('profiles.db')
 
-# Маппинг похожих символов на единую нормальную форму (lowercase Cyrillic)
-# Latin и Cyrillic версии одного символа нормализуются в одно значение (Cyrillic)
-CYRILLIC_LATIN_MAP = {
-    # Cyrillic UPPERCASE → lowercase (normalizing)
-    'А': 'а', 'В': 'в', 'Е': 'е', 'К': 'к', 'М': 'м', 'Н': 'н',
-    'О': 'о', 'П': 'п', 'Р': 'р', 'С': 'с', 'Т': 'т', 'У': 'у',
-    'Х': 'х', 'Д': 'д', 'З': 'з', 'Л': 'л',
-    # Cyrillic lowercase (identity)
-    'а': 'а', 'в': 'в', 'е': 'е', 'к': 'к', 'м': 'м', 'н': 'н',
-    'о': 'о', 'п': 'п', 'р': 'р', 'с': 'с', 'т': 'т', 'у': 'у',
-    'х': 'х', 'д': 'д', 'з': 'з', 'л': 'л',
-    # Latin UPPERCASE → lowercase Cyrillic
-    'A': 'а', 'B': 'в', 'C': 'с', 'D': 'д', 'E': 'е', 'H': 'н',
-    'K': 'к', 'M': 'м', 'O': 'о', 'P': 'р', 'T': 'т', 'X': 'х',
-    'Y': 'у', 'Z': 'з', 'L': 'л',
-    # Latin lowercase → lowercase Cyrillic
-    'a': 'а', 'b': 'в', 'c': 'с', 'd': 'д', 'e': 'е', 'h': 'н',
-    'k': 'к', 'm': 'м', 'o': 'о', 'p': 'р', 't': 'т', 'x': 'х',
-    'y': 'у', 'z': 'з', 'l': 'л',
-}
-
-def normalize_text(text):
-    """
-    Нормализует текст для поиска (Latin ↔ Cyrillic):
-    - Переводит в единую нормальную форму (lowercase Cyrillic)
-    - Похожие символы из обеих раскладок нормализуются в одно значение
-    - УБИРАЕТ дефисы, пробелы, точки для гибкого поиска
-    
-    Примеры:
-    'С' (Cyrillic) → 'с' (lowercase Cyrillic)
-    'C' (Latin) → 'с' (Cyrillic)
-    'СП' (Cyrillic) → 'сп'
-    'CP' (Latin) → 'сp' (обе буквы переходят в кириллицу)
-    'ALS-345' → 'алс345' (Latin→Cyrillic, без дефиса)
-    'als 345' → 'алс345' (без пробела)
-    
-    Args:
-        text: исходный текст (может содержать Cyrillic или Latin)
-    
-    Returns:
-        str: нормализованный текст (lowercase Cyrillic символы без спецсимволов)
-    """
-    if not text:
-        return ''
-    
-    text = str(text)
-    result = []
-    for char in text:
-        # Пропускаем дефисы, пробелы, точки, подчеркивания для гибкого поиска
-        if char in ('-', ' ', '.', '_', '/', '\\'):
-            continue
-        # Маппируем через таблицу (Latin→Cyrillic, Cyrillic→lowercase Cyrillic)
-        mapped = CYRILLIC_LATIN_MAP.get(char, char.lower())
-        result.append(mapped)
-    
-    return ''.join(result)
-
 def get_db_connection():
     """Создает подключение к базе с автокоммитом и timeout"""
     conn = sqlite3.connect(DB_FILE, timeout=10)
@@ -266,7 +211,7 @@ def search_profiles(query, order_by='usage_count DESC'):
     conn = get_db_connection()
     try:
         # Нормализуем поисковый запрос (убираем дефисы, Latin→Cyrillic)
-        normalized_query = normalize_text(query)
+        normalized_query = text_normalize.search_key(query)
         
         # Загружаем ВСЕ профили
         all_profiles = conn.execute(f'SELECT * FROM profiles ORDER BY {order_by}').fetchall()
@@ -277,10 +222,10 @@ def search_profiles(query, order_by='usage_count DESC'):
             profile = dict(row)
             
             # Нормализуем поля для сравнения
-            norm_name = normalize_text(profile.get('name', ''))
-            norm_notes = normalize_text(profile.get('notes', ''))
-            norm_qty = normalize_text(str(profile.get('quantity_per_hanger', '')))
-            norm_length = normalize_text(str(profile.get('length', '')))
+            norm_name = text_normalize.search_key(profile.get('name', ''))
+            norm_notes = text_normalize.search_key(profile.get('notes', ''))
+            norm_qty = text_normalize.search_key(str(profile.get('quantity_per_hanger', '')))
+            norm_length = text_normalize.search_key(str(profile.get('length', '')))
             
             # Проверяем совпадение с приоритетом
             match_priority = None
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Архив прошлых лет: все книги учета в папке Excel как один набор данных
+
+Текущая книга ("горячая") живет в app._cache и перечитывается при
+изменениях. Книги прошлых лет ("Учет КПЗ 2024.xlsm", ...) не меняются -
+они читаются лениво, только когда запрос просит историю за все годы:
+сначала из снимка (excel_snapshot), иначе разбором .xlsm с сохранением
+снимка. В памяти одновременно держится не больше max_resident книг
+(LRU), остальные вытесняются и при следующем обращении берутся из снимка.
+"""
+
+import fnmatch
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import excel_loader
+import excel_normalize
+import excel_snapshot
+
+_YEAR_RE = re.compile(r'(?:19|20)\d{2}')
+
+
+def workbook_year(name):
+    """Год из имени книги ('Учет КПЗ 2024.xlsm' → 2024), 0 если года в имени нет"""
+    match = _YEAR_RE.search(name)
+    return int(match.group()) if match else 0
+
+
+class WorkbookArchive:
+    """Ленивая загрузка книг прошлых лет с ограничением по памяти (LRU)"""
+
+    def __init__(self, cache_dir, max_resident=2, pattern='*.xlsm', engine=None):
+        """
+        Args:
+            cache_dir: папка снимков (та же, что у текущей книги)
+            max_resident: сколько книг держать в памяти одновременно
+            pattern: какие файлы папки считать книгами учета (fnmatch)
+            engine: движок чтения .xlsm (excel_loader.READER_ENGINES)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_resident = max(1, max_resident)
+        self.pattern = pattern
+        self.engine = engine
+        # name → (mtime, size, DataFrame, байты в памяти, производные структуры);
+        # порядок = давность использования
+        self._resident = OrderedDict()
+        # name → (mtime, size) книг, которые не удалось прочитать
+        self._failed = {}
+        # name → блокировка чтения книги (одна книга не читается дважды одновременно)
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def names(self, workbooks, current_name):
+        """
+        Книги архива, новые годы первыми
+
+        Args:
+            workbooks: {имя: (mtime, size)} - .xlsm файлы папки (из монитора)
+            current_name: имя текущей книги (в архив не входит)
+        """
+        names = [name for name in workbooks
+                 if name != current_name and fnmatch.fnmatch(name, self.pattern)]
+        return sorted(names, key=lambda name: (workbook_year(name), name), reverse=True)
+
+    def partitions(self, excel_dir, workbooks, current_name):
+        """
+        Лениво отдает (имя книги, DataFrame) от новых лет к старым
+
+        Генератор: следующая книга загружается только если вызывающий код
+        до нее дошел, так что в памяти не больше max_resident книг.
+        """
+        for name in self.names(workbooks, current_name):
+            mtime, size = workbooks[name]
+            df = self.get(Path(excel_dir) / name, mtime, size)
+            if df is not None:
+                yield name, df
+
+    def get(self, excel_file, mtime, size):
+        """
+        DataFrame книги (нормализованный) или None, если ее не удалось прочитать
+
+        Книга читается под своей блокировкой, а не общей: пока разбирается
+        одна книга, остальные запросы к архиву не ждут.
+        """
+        name = Path(excel_file).name
+        with self._lock:
+            df = self._cached(name, mtime, size)
+            if df is not None or self._failed.get(name) == (mtime, size):
+                return df
+            load_lock = self._loading.setdefault(name, threading.Lock())
+
+        with load_lock:
+            # Книгу мог уже прочитать другой поток, пока мы ждали
+            with self._lock:
+                df = self._cached(name, mtime, size)
+                if df is not None or self._failed.get(name) == (mtime, size):
+                    return df
+
+            try:
+                df = self._load(excel_file, mtime, size)
+            except Exception as e:
+                print(f"[WARN] Архив: не удалось прочитать {name}: {e}")
+                with self._lock:
+                    self._failed[name] = (mtime, size)
+                return None
+
+            memory = excel_normalize.memory_usage(df)['total']
+            print(f"[MEMORY] Архив {name}: {memory / 2**20:.1f} МБ")
+            with self._lock:
+                self._resident[name] = (mtime, size, df, memory, {})
+                self._resident.move_to_end(name)
+                while len(self._resident) > self.max_resident:
+                    evicted, _ = self._resident.popitem(last=False)
+                    print(f"[ARCHIVE] Выгружена из памяти: {evicted}")
+            return df
+
+    def _cached(self, name, mtime, size):
+        """Книга из памяти, если она не изменилась (вызывается под self._lock)"""
+        entry = self._resident.get(name)
+        if entry is not None and entry[:2] == (mtime, size):
+            self._resident.move_to_end(name)
+            return entry[2]
+        return None
+
+    def _load(self, excel_file, mtime, size):
+        path = excel_snapshot.snapshot_path(self.cache_dir, excel_file)
+        df, key = excel_snapshot.load_snapshot(path)
+        if df is not None and key.get('mtime') == mtime and key.get('size') == size:
+            print(f"[ARCHIVE] {Path(excel_file).name}: снимок с диска ({len(df)} строк)")
+        else:
+            # Закрытый год не меняется - читаем один раз и сохраняем снимок
+            key = excel_snapshot.make_key(excel_file, excel_loader.sheet_fingerprint(excel_file))
+            df = excel_loader.read_full(excel_file, self.engine)
+            excel_snapshot.save_snapshot(path, df, key)
+            print(f"[ARCHIVE] {Path(excel_file).name}: прочитано {len(df)} строк, снимок сохранен")
+        return excel_normalize.normalize_frame(df)
+
+    def derived(self, name, kind, build):
+        """
+        Производная структура книги (например, индекс профилей), построенная
+        один раз и выгружаемая из памяти вместе с книгой
+
+        Args:
+            name: имя книги (уже загруженной через get/partitions)
+            kind: имя структуры
+            build: функция build(df), вызывается при первом обращении
+
+        Returns:
+            результат build(df) или None, если книги нет в памяти
+        """
+        with self._lock:
+            entry = self._resident.get(name)
+            if entry is None:
+                return None
+            cache = entry[4]
+            if kind not in cache:
+                cache[kind] = build(entry[2])
+            return cache[kind]
+
+    def resident(self):
+        """Имена книг, которые сейчас в памяти (от давно использованных к недавним)"""
+        with self._lock:
+            return list(self._resident)
+
+    def memory(self):
+        """Сколько памяти занимают книги архива: {имя: байты}"""
+        with self._lock:
+            return {name: entry[3] for name, entry in self._resident.items()}
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Разница между поколениями данных листа 'Подвесы'
+
+Строка листа определяется своей позицией (индекс DataFrame = номер строки
+Excel), содержимое - хешем ячеек. Сравнение двух поколений дает добавленные,
+измененные и удаленные строки - их и рассылаем дашбордам вместо полного
+списка.
+"""
+
+import pandas as pd
+
+from excel_loader import COLUMNS, column_keys
+
+
+def row_hashes(df):
+    """
+    Хеш содержимого каждой строки (векторно, pandas.util.hash_pandas_object)
+
+    Хешируются канонические ключи ячеек (excel_loader.column_keys), а не
+    сами значения: у hash_pandas_object хеш числа зависит от типа колонки,
+    и одна текстовая ячейка в колонке чисел меняла бы хеши всех строк.
+
+    Returns:
+        pd.Series uint64 с тем же индексом, что и df
+    """
+    if df is None or df.empty:
+        return pd.Series([], dtype='uint64')
+    keys = pd.DataFrame({column: column_keys(df[column]) for column in COLUMNS}, index=df.index)
+    return pd.util.hash_pandas_object(keys, index=False)
+
+
+def diff_generations(old_hashes, new_hashes):
+    """
+    Сравнивает два поколения по позиции строки и хешу содержимого
+
+    Returns:
+        dict {'added': [...], 'changed': [...], 'removed': [...]} - индексы строк
+    """
+    if old_hashes is None:
+        old_hashes = pd.Series([], dtype='uint64')
+
+    common = old_hashes.index.intersection(new_hashes.index)
+    differs = old_hashes.loc[common].to_numpy() != new_hashes.loc[common].to_numpy()
+    return {
+        'added': [int(i) for i in new_hashes.index.difference(old_hashes.index)],
+        'changed': [int(i) for i in common[differs]],
+        'removed': [int(i) for i in old_hashes.index.difference(new_hashes.index)],
+    }
+
+
+def merge_deltas(deltas):
+    """
+    Склеивает последовательные дельты в одну (для клиента, пропустившего
+    несколько поколений)
+
+    Строка, добавленная и затем удаленная, пропадает из результата;
+    удаленная и снова добавленная считается измененной.
+
+    Args:
+        deltas: список дельт diff_generations() в порядке поколений
+
+    Returns:
+        dict той же формы, что diff_generations()
+    """
+    state = {}
+    for delta in deltas:
+        for row in delta['added']:
+            state[row] = 'changed' if state.get(row) == 'removed' else 'added'
+        for row in delta['changed']:
+            if state.get(row) != 'added':
+                state[row] = 'changed'
+        for row in delta['removed']:
+            if state.get(row) == 'added':
+                del state[row]
+            else:
+                state[row] = 'removed'
+
+    merged = {'added': [], 'changed': [], 'removed': []}
+    for row in sorted(state):
+        merged[state[row]].append(row)
+    return merged
+
+
+def is_empty(delta):
+    """Нет ни одной измененной строки"""
+    return not (delta['added'] or delta['changed'] or delta['removed'])
@@ -0,0 +1,709 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Чтение листа 'Подвесы' из Excel файла учета КПЗ
+
+Два режима:
+- read_full: полное чтение листа одним из движков READER_ENGINES
+- read_tail: инкрементальное чтение только "хвоста" листа (операторы
+  дописывают строки только вниз); строки выше хвоста не разбираются,
+  а сверяются по байтам XML листа
+
+Файл с сетевой папки перед разбором копируется на локальный диск
+(stage_local_copy), читаются уже локальные копии.
+
+Если макрос книги выгрузил CSV новее .xlsm - читается CSV (read_csv_sidecar).
+"""
+
+import hashlib
+import importlib.util
+import io
+import multiprocessing
+import os
+import posixpath
+import re
+import shutil
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.cell.cell import ERROR_CODES, TYPE_ERROR, TYPE_NUMERIC
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._reader import WorkSheetParser
+from pandas.io.parsers import TextParser
+from pandas.io.parsers.readers import STR_NA_VALUES
+
+import excel_snapshot
+
+SHEET_NAME = 'Подвесы'
+
+# Нумерация строк как в Excel (с 1):
+# строки 1-2: инструкции, строка 3: заголовки, строка 4+: данные
+HEADER_ROW = 3
+FIRST_DATA_ROW = 4
+
+# Используемые колонки листа (индексы с 0) и их имена в DataFrame
+USE_COLS = [3, 4, 5, 7, 10, 11, 12, 16, 19]
+COLUMNS = ['date', 'number', 'time', 'material_type', 'kpz_number',
+           'client', 'profile', 'color', 'lamels_qty']
+
+_NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+# Движки полного чтения листа:
+# - openpyxl: pd.read_excel(engine='openpyxl') - эталон, как было всегда
+# - openpyxl_stream: openpyxl read-only values_only, только колонки D..T,
+#   без объектов ячеек; типы приводятся так же, как в pd.read_excel
+# - calamine: pd.read_excel(engine='calamine'), нужен пакет python-calamine
+READER_ENGINES = ('openpyxl', 'openpyxl_stream', 'calamine')
+DEFAULT_ENGINE = 'openpyxl'
+
+
+def engine_available(engine):
+    """Можно ли использовать движок (calamine - только если установлен)"""
+    if engine == 'calamine':
+        return importlib.util.find_spec('python_calamine') is not None
+    return engine in READER_ENGINES
+
+
+def resolve_engine(engine):
+    """
+    Проверяет движок из настроек
+
+    Returns:
+        имя движка или DEFAULT_ENGINE (с предупреждением), если он
+        неизвестен или не установлен
+    """
+    engine = (engine or DEFAULT_ENGINE).strip().lower()
+    if engine not in READER_ENGINES:
+        print(f"[WARN] Неизвестный движок чтения Excel '{engine}', используем {DEFAULT_ENGINE}")
+        return DEFAULT_ENGINE
+    if not engine_available(engine):
+        print(f"[WARN] Движок '{engine}' не установлен (pip install python-calamine), используем {DEFAULT_ENGINE}")
+        return DEFAULT_ENGINE
+    return engine
+
+
+def _read_full_pandas(excel_file, engine):
+    df = pd.read_excel(excel_file, sheet_name=SHEET_NAME, skiprows=[0, 1],
+                       usecols=USE_COLS, engine=engine)
+    df.columns = COLUMNS
+    # ВАЖНО: удаляем полностью пустые строки (где все ячейки пусты)
+    return df.dropna(how='all')
+
+
+def _convert_value(value):
+    """То же, что _convert_cell, но для значения (iter_rows(values_only=True))"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        val = int(value)
+        if val == value:
+            return val
+        return float(value)
+    if isinstance(value, str) and value in ERROR_CODES:
+        return np.nan
+    return value
+
+
+def _read_full_stream(excel_file):
+    wb = openpyxl.load_workbook(excel_file, read_only=True, data_only=True,
+                                keep_links=False)
+    try:
+        ws = wb[SHEET_NAME]
+        ws.reset_dimensions()
+
+        offsets = [c - USE_COLS[0] for c in USE_COLS]
+        rows = []
+        for values in ws.iter_rows(min_row=FIRST_DATA_ROW, min_col=USE_COLS[0] + 1,
+                                   max_col=USE_COLS[-1] + 1, values_only=True):
+            rows.append([_convert_value(values[i]) if i < len(values) else '' for i in offsets])
+    finally:
+        wb.close()
+
+    df = _rows_to_frame(rows, 0)
+    if df is None:
+        return pd.DataFrame(columns=COLUMNS)
+    return df.dropna(how='all')
+
+
+def read_full(excel_file, engine=None):
+    """
+    Полное чтение листа 'Подвесы'
+
+    Индекс DataFrame = номер строки данных (Excel строка - FIRST_DATA_ROW)
+
+    Args:
+        excel_file: путь к Excel файлу
+        engine: движок из READER_ENGINES (None - DEFAULT_ENGINE)
+
+    Returns:
+        DataFrame с колонками COLUMNS (без полностью пустых строк)
+    """
+    engine = engine or DEFAULT_ENGINE
+    if engine == 'openpyxl_stream':
+        return _read_full_stream(excel_file)
+    return _read_full_pandas(excel_file, engine)
+
+
+# ==========================================
+# CSV рядом с .xlsm (выгружает макрос при сохранении)
+# ==========================================
+# Формат (archive/excel/AutoSave_Macro.vba, ExportPodvesyCsv):
+# UTF-8, первая строка - заголовок CSV_COLUMNS, row - номер строки Excel;
+# даты 'yyyy-mm-dd hh:mm:ss', время 'hh:mm:ss', числа с точкой,
+# текст в кавычках, ошибки и пустые ячейки - пусто.
+
+CSV_COLUMNS = ['row'] + COLUMNS
+
+_CSV_DATETIME_RE = r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$'
+_CSV_TIME_RE = r'^\d{2}:\d{2}:\d{2}$'
+
+
+def csv_sidecar_path(excel_file):
+    """CSV, который макрос пишет рядом с книгой: 'Учет КПЗ 2025.xlsm' → 'Учет КПЗ 2025.csv'"""
+    return Path(excel_file).with_suffix('.csv')
+
+
+def csv_sidecar_is_fresh(excel_file):
+    """
+    Есть ли CSV, выгруженный после последнего сохранения книги
+
+    Returns:
+        Path к CSV или None (CSV нет или он старше .xlsm)
+    """
+    csv_file = csv_sidecar_path(excel_file)
+    try:
+        if os.stat(csv_file).st_mtime >= os.stat(excel_file).st_mtime:
+            return csv_file
+    except OSError:
+        pass
+    return None
+
+
+def _decode_csv_column(values):
+    """
+    Восстанавливает типы ячеек колонки CSV (как у pd.read_excel)
+
+    Все числа - int64/float64, все даты - datetime64, иначе object колонка
+    с int/float/datetime/time/str и NaN для пустых ячеек. Векторно: по маскам,
+    без обхода ячеек в Python.
+    """
+    empty = (values == '').to_numpy()
+    numbers = pd.to_numeric(values.where(~empty), errors='coerce')
+    is_number = numbers.notna().to_numpy()
+    rest = ~empty & ~is_number
+
+    if not rest.any():
+        if not empty.any() and (numbers % 1 == 0).all():
+            return numbers.astype(np.int64)
+        return numbers.astype(np.float64)
+
+    is_datetime = rest & values.str.match(_CSV_DATETIME_RE).to_numpy()
+    if not (rest & ~is_datetime).any() and not is_number.any():
+        return pd.to_datetime(values.where(is_datetime), format='%Y-%m-%d %H:%M:%S')
+
+    result = values.to_numpy(dtype=object, copy=True)
+    result[empty] = np.nan
+    if is_number.any():
+        found = numbers.to_numpy()[is_number]
+        integral = found % 1 == 0
+        idx = np.flatnonzero(is_number)
+        # astype(object) у int64/float64 массивов дает обычные int/float Python
+        result[idx[integral]] = found[integral].astype(np.int64).astype(object)
+        result[idx[~integral]] = found[~integral].astype(object)
+    if is_datetime.any():
+        result[is_datetime] = pd.to_datetime(values[is_datetime], format='%Y-%m-%d %H:%M:%S').dt.to_pydatetime()
+    is_time = rest & values.str.match(_CSV_TIME_RE).to_numpy()
+    if is_time.any():
+        result[is_time] = pd.to_datetime(values[is_time], format='%H:%M:%S').dt.time.to_numpy()
+    return pd.Series(result, index=values.index)
+
+
+def read_csv_sidecar(csv_file):
+    """
+    Читает лист 'Подвесы' из CSV, выгруженного макросом
+
+    Быстрее разбора .xlsm на порядок: CSV читается C-парсером pandas,
+    типы восстанавливаются векторно (_decode_csv_column).
+
+    Returns:
+        DataFrame как у read_full() (индекс - по номеру строки Excel)
+    """
+    raw = pd.read_csv(csv_file, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    if list(raw.columns) != CSV_COLUMNS:
+        raise ValueError(f"неожиданные колонки CSV: {list(raw.columns)}")
+
+    index = pd.Index(raw['row'].astype(np.int64).to_numpy() - FIRST_DATA_ROW)
+    df = pd.DataFrame({column: _decode_csv_column(raw[column]) for column in COLUMNS})
+    df.index = index
+    return df.dropna(how='all')
+
+
+def _sheet_member(zf):
+    """Находит путь к XML листа 'Подвесы' внутри архива .xlsm"""
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    rel_id = None
+    for sheet in workbook.iter(f'{_NS_MAIN}sheet'):
+        if sheet.get('name') == SHEET_NAME:
+            rel_id = sheet.get(f'{_NS_REL}id')
+            break
+    if rel_id is None:
+        return None
+
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    for rel in rels.iter(f'{_NS_PKG_REL}Relationship'):
+        if rel.get('Id') == rel_id:
+            target = rel.get('Target')
+            # Target бывает абсолютным (/xl/worksheets/...) или относительным от xl/
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join('xl', target))
+    return None
+
+
+def sheet_fingerprint(excel_file):
+    """
+    Отпечаток содержимого листа 'Подвесы' без распаковки данных
+
+    Берет CRC и размер XML листа (и таблицы общих строк) из центрального
+    каталога zip-архива .xlsm.
+
+    Returns:
+        str или None (если файл не читается как .xlsm)
+    """
+    try:
+        with zipfile.ZipFile(excel_file) as zf:
+            member = _sheet_member(zf)
+            if member is None:
+                return None
+            parts = [zf.getinfo(member)]
+            if 'xl/sharedStrings.xml' in zf.NameToInfo:
+                parts.append(zf.getinfo('xl/sharedStrings.xml'))
+            return '-'.join(f'{info.CRC:08x}:{info.file_size}' for info in parts)
+    except (OSError, KeyError, zipfile.BadZipFile, ET.ParseError):
+        return None
+
+
+class UnstableFileError(OSError):
+    """Файл менялся во время копирования (Excel еще сохраняет его)"""
+
+
+def staging_path(staging_dir, excel_file):
+    """Путь к локальной копии Excel файла (расширение сохраняем - его проверяет openpyxl)"""
+    excel_file = Path(excel_file)
+    return Path(staging_dir) / f"{excel_file.stem}.staging{excel_file.suffix}"
+
+
+def stage_local_copy(excel_file, staging_dir, attempts=3, settle_delay=0.5):
+    """
+    Копирует Excel файл с сетевой папки на локальный диск
+
+    Файл читается с сетевой папки одним последовательным чтением, после
+    чего разбор идет по локальной копии (не держит файл на шаре открытым
+    и не читает его по кускам, пока Excel его сохраняет).
+
+    Копия принимается, только если размер и mtime исходного файла не
+    изменились за время копирования и копия открывается как zip-архив.
+    Иначе - повтор через settle_delay секунд. Предыдущая удачная копия
+    заменяется атомарно (os.replace) и при неудаче остается на месте.
+
+    Returns:
+        Path к локальной копии (mtime как у исходного файла)
+
+    Raises:
+        UnstableFileError: файл так и не "успокоился" за attempts попыток
+    """
+    target = staging_path(staging_dir, excel_file)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(target.name + '.tmp')
+
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(settle_delay)
+        before = os.stat(excel_file)
+        shutil.copyfile(excel_file, tmp_path)
+        after = os.stat(excel_file)
+
+        stable = (before.st_size == after.st_size
+                  and before.st_mtime_ns == after.st_mtime_ns
+                  and os.path.getsize(tmp_path) == after.st_size
+                  and zipfile.is_zipfile(tmp_path))
+        if stable:
+            # mtime копии = mtime оригинала: ключ снимка считается по копии
+            os.utime(tmp_path, ns=(after.st_atime_ns, after.st_mtime_ns))
+            os.replace(tmp_path, target)
+            return target
+
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
+    raise UnstableFileError(f"файл изменяется во время копирования: {Path(excel_file).name}")
+
+
+def excel_row_number(index):
+    """Переводит индекс DataFrame в номер строки Excel"""
+    return int(index) + FIRST_DATA_ROW
+
+
+def _convert_cell(cell):
+    """Конвертирует ячейку WorkSheetParser так же, как это делает pd.read_excel"""
+    value = cell['value']
+    if value is None:
+        return ''
+    if cell['data_type'] == TYPE_ERROR:
+        return np.nan
+    if cell['data_type'] == TYPE_NUMERIC:
+        val = int(value)
+        if val == value:
+            return val
+        return float(value)
+    return value
+
+
+def _cell_key(value):
+    """Каноническое строковое представление значения ячейки для отпечатка"""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        # "NA", "null"... pandas при чтении превращает в NaN
+        return '' if value in STR_NA_VALUES else value
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return '' if pd.isna(value) else pd.Timestamp(value).isoformat()
+    if isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return ''
+        if float(value).is_integer():
+            return str(int(value))
+    return str(value)
+
+
+def row_fingerprint(values):
+    """
+    Отпечаток строки данных (не зависит от того, как pandas вывел тип колонки:
+    12, 12.0 и '12' дают одинаковый отпечаток)
+    """
+    raw = '\x1f'.join(_cell_key(v) for v in values)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def column_keys(series):
+    """_cell_key для всех ячеек колонки (вычисляется по уникальным значениям)"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    keys = np.array([_cell_key(value) for value in uniques] + [''], dtype=object)
+    return keys[codes]
+
+
+# Разметка XML листа для чтения хвоста (ячейки используемых колонок с адресом r)
+_ROW_RE = re.compile(rb'<row\b[^>]*?\br="(\d+)"')
+_CELL_RE = re.compile(
+    rb'<c\b[^>]*?\br="(?:'
+    + '|'.join(get_column_letter(c + 1) for c in USE_COLS).encode()
+    + rb')\d+"[^>]*?(?:/>|>.*?</c>)',
+    re.S,
+)
+_CELL_WITHOUT_REF_RE = re.compile(rb'<c(?=[\s/>])(?![^>]*\br=)')
+_SHARED_STRING_RE = re.compile(rb'(\bt="s"[^>]*>)\s*<v>(\d+)</v>')
+
+
+def _load_sheet_xml(excel_file):
+    """
+    Открывает книгу (openpyxl read-only) и читает XML листа целиком, без разбора
+
+    Returns:
+        (книга, XML листа) - книгу закрывает вызывающий
+    """
+    wb = openpyxl.load_workbook(excel_file, read_only=True, data_only=True,
+                                keep_links=False)
+    try:
+        ws = wb[SHEET_NAME]
+        return wb, wb._archive.read(ws._worksheet_path)
+    except Exception:
+        wb.close()
+        raise
+
+
+def _split_rows(xml, first_row):
+    """
+    Делит строки листа на строки выше first_row (номер строки Excel) и остальные
+
+    Граница ищется с конца sheetData - хвост короткий, а строки идут по порядку.
+
+    Returns:
+        (XML до строк, строки выше, строки от first_row, XML после строк)
+        или None (лист пустой или у строк нет номеров r)
+    """
+    start = xml.find(b'<sheetData>')
+    end = xml.rfind(b'</sheetData>')
+    if start < 0 or end < 0:
+        return None
+    start += len(b'<sheetData>')
+
+    split = end
+    while True:
+        row_pos = xml.rfind(b'<row', start, split)
+        if row_pos < 0:
+            break
+        match = _ROW_RE.match(xml, row_pos)
+        if match is None:
+            return None
+        if int(match.group(1)) < first_row:
+            break
+        split = row_pos
+    return xml[:start], xml[start:split], xml[split:end], xml[end:]
+
+
+def _rows_digest(rows_xml, shared_strings):
+    """
+    Отпечаток строк листа по байтам XML ячеек используемых колонок
+
+    Ячейки других колонок не учитываются (в них формулы и пометки,
+    которые не попадают в данные).
+
+    Returns:
+        str или None (есть ячейки без адреса r - колонку по байтам не определить)
+    """
+    if _CELL_WITHOUT_REF_RE.search(rows_xml):
+        return None
+    cells = b''.join(_CELL_RE.findall(rows_xml))
+    # Индексы общих строк Excel может перенумеровать при сохранении - в отпечаток
+    # идут ячейки без индексов и тексты строк по порядку ячеек
+    hasher = hashlib.blake2b(_SHARED_STRING_RE.sub(rb'\1', cells), digest_size=16)
+    for _, index in _SHARED_STRING_RE.findall(cells):
+        hasher.update(str(shared_strings[int(index)]).encode('utf-8') + b'\x1f')
+    return hasher.hexdigest()
+
+
+def _parse_rows(wb, head, rows_xml, tail, first_row):
+    """
+    Разбирает только переданные строки листа (WorkSheetParser openpyxl)
+
+    Returns:
+        строки ячеек используемых колонок начиная с first_row
+    """
+    parser = WorkSheetParser(io.BytesIO(head + rows_xml + tail), wb.shared_strings,
+                             data_only=True, epoch=wb.epoch,
+                             date_formats=wb._date_formats,
+                             timedelta_formats=wb._timedelta_formats)
+    offsets = {c + 1: i for i, c in enumerate(USE_COLS)}
+    rows = []
+    for row_number, cells in parser.parse():
+        if row_number < first_row:
+            continue
+        # Пустые строки в XML не записываются
+        while first_row + len(rows) < row_number:
+            rows.append([''] * len(USE_COLS))
+        values = [''] * len(USE_COLS)
+        for cell in cells:
+            i = offsets.get(cell['column'])
+            if i is not None:
+                values[i] = _convert_cell(cell)
+        rows.append(values)
+    return rows
+
+
+def prefix_fingerprint(excel_file, first_row):
+    """
+    Отпечаток строк листа выше first_row (номер строки Excel) по XML
+
+    Returns:
+        str или None, если по XML отпечаток не посчитать
+    """
+    wb, xml = _load_sheet_xml(excel_file)
+    try:
+        parts = _split_rows(xml, first_row)
+        return _rows_digest(parts[1], wb.shared_strings) if parts else None
+    finally:
+        wb.close()
+
+
+def make_tail_state(df, window, excel_file=None, in_process=False):
+    """
+    Запоминает положение "хвоста" после загрузки данных
+
+    Якорь - первая строка окна из последних `window` строк. При следующем
+    инкрементальном чтении перечитывается окно от якоря, а строки выше
+    сверяются по отпечатку XML (prefix_fingerprint): правка старой строки
+    приводит к полному чтению.
+
+    Args:
+        excel_file: .xlsm, которому соответствует df; без него (CSV, снимок
+            без файла) отпечатка нет и следующее чтение будет полным
+        in_process: считать отпечаток в отдельном процессе (как разбор листа)
+
+    Returns:
+        dict {'anchor_index', 'anchor_fp', 'prefix_fp', 'last_index'} или None (пустой лист)
+    """
+    if df is None or df.empty:
+        return None
+
+    window_df = df[COLUMNS].tail(max(1, window))
+    anchor_index = window_df.index[0]
+    prefix_fp = None
+    if excel_file:
+        try:
+            fingerprint = prefix_fingerprint_in_process if in_process else prefix_fingerprint
+            prefix_fp = fingerprint(excel_file, excel_row_number(anchor_index))
+        except Exception as e:
+            print(f"[EXCEL] Отпечаток строк выше хвоста не посчитан: {e}")
+    return {
+        'anchor_index': int(anchor_index),
+        'anchor_fp': row_fingerprint(window_df.loc[anchor_index].tolist()),
+        'prefix_fp': prefix_fp,
+        'last_index': int(df.index[-1]),
+    }
+
+
+def _rows_to_frame(rows, first_index):
+    """
+    Собирает DataFrame из строк ячеек (уже приведенных _convert_cell/_convert_value)
+
+    Returns:
+        DataFrame с индексом от first_index или None, если строк нет
+    """
+    # Убираем пустые строки в конце (как pd.read_excel)
+    while rows and all(v == '' for v in rows[-1]):
+        rows.pop()
+    if not rows:
+        return None
+
+    # Прогоняем через тот же парсер, что и pd.read_excel (NaN, числа в строках)
+    df = TextParser(rows, names=COLUMNS, header=None,
+                    skip_blank_lines=False).read()
+    df.index = pd.RangeIndex(first_index, first_index + len(df))
+    return df
+
+
+def read_tail(excel_file, tail_state):
+    """
+    Инкрементальное чтение: перечитывает только окно от якоря до конца листа
+
+    Строки окна могут меняться (например, оператор проставил время выгрузки),
+    они заменяются целиком. Строки выше якоря не разбираются вообще,
+    только сверяются по байтам XML с отпечатком prefix_fp.
+
+    Args:
+        excel_file: путь к Excel файлу
+        tail_state: состояние из make_tail_state()
+
+    Returns:
+        DataFrame строк начиная с якоря (индекс как у read_full)
+        или None, если якорь или строки выше него изменились и нужно полное чтение
+    """
+    if not tail_state:
+        return None
+
+    if not tail_state.get('prefix_fp'):
+        return None
+
+    anchor_index = tail_state['anchor_index']
+    first_row = excel_row_number(anchor_index)
+    wb, xml = _load_sheet_xml(excel_file)
+    try:
+        parts = _split_rows(xml, first_row)
+        if parts is None:
+            return None
+        head, prefix, rows_xml, tail = parts
+        # Правка строки выше окна (в том числе удаление/вставка строк)
+        if _rows_digest(prefix, wb.shared_strings) != tail_state['prefix_fp']:
+            return None
+        rows = _parse_rows(wb, head, rows_xml, tail, first_row)
+    finally:
+        wb.close()
+
+    tail_df = _rows_to_frame(rows, anchor_index)
+    if tail_df is None:
+        return None
+
+    if row_fingerprint(tail_df.iloc[0].tolist()) != tail_state['anchor_fp']:
+        return None
+
+    return tail_df.dropna(how='all')
+
+
+def merge_tail(df, tail_df):
+    """Заменяет строки от якоря до конца в df на свежепрочитанные строки хвоста"""
+    head = df.loc[df.index < tail_df.index[0], COLUMNS]
+    if head.empty:
+        return tail_df
+    merged = pd.concat([head, tail_df])
+    # Выравниваем типы колонок после склейки (как при полном чтении)
+    return merged.infer_objects()
+
+
+# ==========================================
+# Разбор Excel в отдельном процессе
+# ==========================================
+# openpyxl - чистый Python и держит GIL секундами. В отдельном процессе
+# разбор не мешает веб-серверу; обратно передаются готовые колонки
+# в бинарном виде (excel_snapshot.frame_to_bytes), а не pickle объектов.
+
+_process_pool = None
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        # spawn - одинаково на Windows и Linux (fork с потоками небезопасен)
+        _process_pool = ProcessPoolExecutor(max_workers=1,
+                                            mp_context=multiprocessing.get_context('spawn'))
+    return _process_pool
+
+
+def _run_in_process(func, *args):
+    global _process_pool
+    try:
+        return _get_process_pool().submit(func, *args).result()
+    except BrokenProcessPool:
+        # Процесс упал - следующий вызов создаст новый
+        _process_pool = None
+        raise
+
+
+def _read_full_encoded(excel_file, engine):
+    return excel_snapshot.frame_to_bytes(read_full(excel_file, engine))
+
+
+def _read_tail_encoded(excel_file, tail_state):
+    tail_df = read_tail(excel_file, tail_state)
+    if tail_df is None:
+        return None
+    return excel_snapshot.frame_to_bytes(tail_df)
+
+
+def read_full_in_process(excel_file, engine=None):
+    """То же, что read_full(), но разбор выполняется в отдельном процессе"""
+    return excel_snapshot.frame_from_bytes(_run_in_process(_read_full_encoded, str(excel_file), engine))
+
+
+def read_tail_in_process(excel_file, tail_state):
+    """То же, что read_tail(), но разбор выполняется в отдельном процессе"""
+    data = _run_in_process(_read_tail_encoded, str(excel_file), tail_state)
+    if data is None:
+        return None
+    return excel_snapshot.frame_from_bytes(data)
+
+
+def prefix_fingerprint_in_process(excel_file, first_row):
+    """prefix_fingerprint в отдельном процессе (результат - короткая строка)"""
+    return _run_in_process(prefix_fingerprint, str(excel_file), first_row)
+
+
+def shutdown_process_pool():
+    """Останавливает процесс разбора (при выходе из приложения)"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Зеркало листа 'Подвесы' в SQLite (отдельная база рядом с profiles.db)
+
+На каждое поколение данных строки листа переносятся в таблицу hangers:
+ключ - индекс строки (номер строки Excel - FIRST_DATA_ROW), хеш
+содержимого (excel_delta.row_hashes) и уже готовые к выдаче колонки
+(*_display, date_str, time_str...) из excel_normalize.
+
+Обновление инкрементальное: хеши строк сравниваются с теми, что уже
+лежат в базе, переписываются только добавленные и измененные строки,
+удаленные - удаляются. После перезапуска app.py зеркало не строится
+заново, если лист не менялся.
+
+Запросы к сайту идут в SQLite вместо фильтрации DataFrame:
+- поиск дубликатов и профили листа - GROUP BY по индексу profile, строки
+  совпадений - одним запросом по первичному ключу (rows)
+- последние записи (окно RECENT_WINDOW строк, window_rows) - окно берется
+  по первичному ключу row_idx, фильтры проверяются на строках окна; индексы
+  по колонкам здесь не нужны - окно маленькое
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import excel_delta
+
+# Колонки для ответа API (в формате process_dataframe)
+DISPLAY_COLUMNS = ['number_display', 'date_str', 'date_full_str', 'time_str', 'client_display',
+                   'profile_display', 'color_display', 'lamels_display', 'kpz_number_display',
+                   'material_type_display']
+
+# Служебные колонки для фильтров
+# date_ns - дата (наносекунды, как datetime64), profile - название без пробелов по краям
+FILTER_COLUMNS = ['row_hash', 'date_ns', 'has_date', 'has_number', 'number_key',
+                  'profile', 'has_profile', 'has_time']
+
+COLUMNS = ['row_idx'] + FILTER_COLUMNS + DISPLAY_COLUMNS
+
+
+def _sql_value(value):
+    """Значение ячейки в тип, который SQLite хранит без потерь (int/float/str/None)"""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return int(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, str):
+        return value
+    # Дата / время в текстовой колонке - как текст
+    return str(value)
+
+
+def _column_values(series):
+    """Колонка DataFrame → список значений для SQLite (конвертация по уникальным)"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    converted = np.empty(len(uniques) + 1, dtype=object)
+    for i, value in enumerate(uniques):
+        converted[i] = _sql_value(value)
+    converted[-1] = None
+    return converted[codes].tolist()
+
+
+def _profile_keys(profile):
+    """Название профиля без пробелов по краям или None (пустая ячейка / пустая строка)"""
+    def key(value):
+        text = str(value).strip()
+        return text or None
+    codes, uniques = pd.factorize(profile, use_na_sentinel=True)
+    keys = np.array([key(value) for value in uniques] + [None], dtype=object)
+    return keys[codes].tolist()
+
+
+def build_records(df, hashes):
+    """
+    Строки таблицы hangers для строк df (нормализованный DataFrame)
+
+    Returns:
+        список кортежей в порядке COLUMNS
+    """
+    date_ns = df['date_dt'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    date_ns = np.where(df['date_dt'].isna().to_numpy(), None, date_ns.astype(object))
+
+    columns = [
+        df.index.to_numpy(dtype=np.int64).tolist(),
+        # uint64 → int64 (SQLite INTEGER знаковый)
+        hashes.loc[df.index].to_numpy(dtype=np.uint64).view(np.int64).tolist(),
+        date_ns.tolist(),
+        df['date'].notna().to_numpy().astype(int).tolist(),
+        df['number'].notna().to_numpy().astype(int).tolist(),
+        _column_values(df['number_key']),
+        _profile_keys(df['profile']),
+        df['profile'].notna().to_numpy().astype(int).tolist(),
+        df['has_time'].to_numpy().astype(int).tolist(),
+    ]
+    columns += [_column_values(df[column]) for column in DISPLAY_COLUMNS]
+    return list(zip(*columns))
+
+
+class ProductionMirror:
+    """SQLite зеркало текущей книги учета"""
+
+    def __init__(self, db_file):
+        self.db_file = Path(db_file)
+        # Синхронизация только из потока перезагрузки, но на всякий случай - по одной
+        self._sync_lock = threading.Lock()
+        self._initialized = False
+
+    def connect(self):
+        """Подключение к базе зеркала (как db.get_db_connection: Row, timeout)"""
+        conn = sqlite3.connect(self.db_file, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init(self):
+        """Создает таблицы и индексы, если их нет"""
+        if self._initialized:
+            return
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        conn = self.connect()
+        try:
+            # WAL: запросы сайта читают, пока поток перезагрузки пишет
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS hangers (
+                    row_idx INTEGER PRIMARY KEY,
+                    row_hash INTEGER NOT NULL,
+                    date_ns INTEGER,
+                    has_date INTEGER NOT NULL,
+                    has_number INTEGER NOT NULL,
+                    number_key TEXT,
+                    profile TEXT,
+                    has_profile INTEGER NOT NULL,
+                    has_time INTEGER NOT NULL,
+                    {', '.join(DISPLAY_COLUMNS)}
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_hangers_date ON hangers(date_ns)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_hangers_number ON hangers(number_key)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_hangers_profile ON hangers(profile)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_hangers_has_time ON hangers(has_time, row_idx)')
+            conn.commit()
+        finally:
+            conn.close()
+        self._initialized = True
+
+    def sync(self, df, hashes):
+        """
+        Приводит таблицу к содержимому df (только изменившиеся строки)
+
+        Args:
+            df: нормализованный DataFrame поколения
+            hashes: excel_delta.row_hashes(df)
+
+        Returns:
+            dict {'added': N, 'changed': N, 'removed': N}
+        """
+        with self._sync_lock:
+            self.init()
+            conn = self.connect()
+            try:
+                # Что уже лежит в базе (после перезапуска - прошлое поколение)
+                rows = conn.execute('SELECT row_idx, row_hash FROM hangers').fetchall()
+                stored = pd.Series(
+                    np.array([row['row_hash'] for row in rows], dtype=np.int64).view(np.uint64),
+                    index=pd.Index([row['row_idx'] for row in rows], dtype=np.int64),
+                )
+
+                delta = excel_delta.diff_generations(stored, hashes)
+                if delta['removed']:
+                    conn.executemany('DELETE FROM hangers WHERE row_idx = ?',
+                                     [(idx,) for idx in delta['removed']])
+                upsert = delta['added'] + delta['changed']
+                if upsert:
+                    placeholders = ', '.join('?' * len(COLUMNS))
+                    conn.executemany(f"INSERT OR REPLACE INTO hangers ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                                     build_records(df.loc[upsert], hashes))
+                conn.commit()
+            finally:
+                conn.close()
+        return {name: len(rows) for name, rows in delta.items()}
+
+    def query(self, sql, params=()):
+        """Выполняет SELECT и возвращает список sqlite3.Row"""
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def window_rows(self, window, where='1', params=(), order='ASC', limit=None):
+        """
+        Строки среди последних window строк листа (как get_dataframe() без full_dataset)
+
+        Окно выбирается по первичному ключу, условие where проверяется только
+        на его строках (индексы колонок не используются - строк не больше window).
+
+        Args:
+            where: условие SQL по колонкам hangers
+            order: 'ASC' - первые строки окна, 'DESC' - последние (новые первыми)
+            limit: сколько строк вернуть (None - все)
+        """
+        sql = (f'SELECT * FROM (SELECT * FROM hangers ORDER BY row_idx DESC LIMIT ?) '
+               f'WHERE {where} ORDER BY row_idx {order}')
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params = (*params, limit)
+        return self.query(sql, (window, *params))
+
+    def window_size(self, window):
+        """Сколько строк в окне последних window строк"""
+        return self.query('SELECT COUNT(*) AS n FROM (SELECT row_idx FROM hangers ORDER BY row_idx DESC LIMIT ?)',
+                          (window,))[0]['n']
+
+    def profile_stats(self, window=None):
+        """
+        Для каждого названия профиля: сколько строк и самая свежая строка
+
+        Args:
+            window: только последние window строк (None - весь лист)
+
+        Returns:
+            список sqlite3.Row (profile, count, last_idx) в порядке первого появления
+        """
+        source = 'hangers' if window is None else \
+            '(SELECT * FROM hangers ORDER BY row_idx DESC LIMIT ?)'
+        params = () if window is None else (window,)
+        return self.query(f'SELECT profile, COUNT(*) AS count, MIN(row_idx) AS first_idx, '
+                          f'MAX(row_idx) AS last_idx FROM {source} WHERE profile IS NOT NULL '
+                          f'GROUP BY profile ORDER BY first_idx', params)
+
+    def rows(self, row_indexes):
+        """Строки по индексам: {row_idx: sqlite3.Row}"""
+        if not row_indexes:
+            return {}
+        result = {}
+        # Ограничение SQLite на число параметров - запрашиваем пачками
+        row_indexes = list(row_indexes)
+        for start in range(0, len(row_indexes), 500):
+            chunk = row_indexes[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            for row in self.query(f'SELECT * FROM hangers WHERE row_idx IN ({placeholders})', chunk):
+                result[row['row_idx']] = row
+        return result
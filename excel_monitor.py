@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Фоновая проверка Excel файла на сетевой папке
+
+Все обращения к файловой системе (есть ли папка, какой файл, mtime,
+размер, временные файлы ~$) делает один фоновый поток с фиксированным
+интервалом и по событиям watchdog. Результат публикуется как готовый
+словарь статуса: обработчики запросов читают его, не обращаясь к шаре.
+
+На сетевых дисках (SMB/NFS) события watchdog приходят с опозданием или
+не приходят совсем - там монитор сам опрашивает файл с адаптивным
+интервалом: часто сразу после изменения, реже когда файл не меняется.
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+# Типы файловых систем, на которых нативные события ненадежны
+REMOTE_FS_TYPES = {'cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', 'fuse.sshfs', '9p', 'afs', 'ncpfs'}
+
+# GetDriveTypeW: сетевой диск
+_DRIVE_REMOTE = 4
+
+
+def is_remote_path(path):
+    """
+    Лежит ли путь на сетевой файловой системе
+
+    - UNC путь (\\\\SERVER\\Share) - сетевой
+    - Windows: тип диска буквы (Z: - подключенный сетевой диск)
+    - Linux: тип файловой системы точки монтирования из /proc/mounts
+      (cifs, nfs и т.п. - например, шара, смонтированная в Docker)
+    """
+    path = str(path)
+    if path.startswith('\\\\') or path.startswith('//'):
+        return True
+
+    if sys.platform == 'win32':
+        drive = os.path.splitdrive(os.path.abspath(path))[0]
+        if not drive:
+            return False
+        try:
+            import ctypes
+            return ctypes.windll.kernel32.GetDriveTypeW(drive + '\\') == _DRIVE_REMOTE
+        except (AttributeError, OSError):
+            return False
+
+    try:
+        with open('/proc/mounts', encoding='utf-8', errors='replace') as f:
+            mounts = [line.split()[1:3] for line in f if len(line.split()) >= 3]
+    except OSError:
+        return False
+
+    # Самая длинная точка монтирования, в которую входит путь
+    path = os.path.abspath(path)
+    best_point, best_type = '', ''
+    for point, fs_type in mounts:
+        point = point.replace('\\040', ' ')  # пробелы в /proc/mounts экранированы
+        inside = path == point or path.startswith(point.rstrip('/') + '/')
+        if inside and len(point) > len(best_point):
+            best_point, best_type = point, fs_type
+    return best_type in REMOTE_FS_TYPES
+
+
+class FreshnessMonitor:
+    """
+    Периодически проверяет Excel файл и хранит последний статус
+
+    Статус (dict, заменяется целиком - читатели не видят его наполовину):
+    - status: 'ok' | 'network_error' | 'not_found'
+    - message: текст ошибки (для status != 'ok')
+    - excel_file: Path к файлу или None
+    - mtime: время изменения с учетом '~$<имя файла>' (для перечитывания)
+    - file_mtime, size: mtime и размер самого файла
+    - is_open: есть ли в папке временные файлы ~$ (Excel открыт)
+    - temp_mtime: mtime первого временного файла ~$ или None
+    - checked_at: когда выполнена проверка (time.time())
+    - detect_latency: через сколько секунд после изменения файла (по его
+      mtime) оно было замечено - для последнего изменения, иначе None
+    - workbooks: {имя: (mtime, размер)} всех .xlsm в папке (книги прошлых лет)
+    - sidecar_mtime: mtime файла рядом с книгой (CSV макроса) или None
+    """
+
+    def __init__(self, excel_dir, excel_filename=None, interval=2.0, on_change=None,
+                 sidecar_suffix=None):
+        """
+        Args:
+            excel_dir: папка с Excel файлом
+            excel_filename: имя файла (None - первый .xlsm в папке)
+            interval: секунд между проверками
+            on_change: вызывается (в потоке монитора), когда файл или файл
+                       рядом с ним изменился или файл снова стал доступен
+            sidecar_suffix: расширение файла рядом с книгой, за которым тоже
+                            следить ('.csv' - 'Учет КПЗ 2025.csv'), None - не следить
+        """
+        self.excel_dir = Path(excel_dir)
+        self.excel_filename = excel_filename
+        self.interval = interval
+        self.on_change = on_change
+        self.sidecar_suffix = sidecar_suffix
+        # Адаптивный опрос (set_polling): текущий интервал между min и max
+        self.min_interval = interval
+        self.max_interval = interval
+        self.backoff = 2.0
+        self._status = None
+        self._wakeup = threading.Event()
+        self._probe_lock = threading.Lock()
+        self._thread = None
+
+    def _find_file(self, entries):
+        """Выбирает Excel файл из списка файлов папки (как раньше через os.listdir)"""
+        if self.excel_filename:
+            return entries.get(self.excel_filename)
+        for name, entry in entries.items():
+            if name.endswith('.xlsm') and not name.startswith('~$'):
+                return entry
+        return None
+
+    def probe(self):
+        """
+        Проверяет файл прямо сейчас и публикует новый статус
+
+        Папка читается одним os.scandir (на Windows stat файлов приходит
+        вместе со списком - без отдельного запроса к шаре на каждый файл).
+
+        Returns:
+            dict нового статуса
+        """
+        with self._probe_lock:
+            status = {'status': 'ok', 'message': None, 'excel_file': None, 'mtime': None,
+                      'file_mtime': None, 'size': None, 'is_open': False,
+                      'temp_mtime': None, 'checked_at': time.time(), 'detect_latency': None,
+                      'workbooks': {}, 'sidecar_mtime': None}
+            try:
+                with os.scandir(self.excel_dir) as it:
+                    entries = {entry.name: entry for entry in it}
+            except OSError:
+                status['status'] = 'network_error'
+                status['message'] = 'Сетевая директория недоступна'
+                return self._publish(status)
+
+            for name, item in entries.items():
+                if name.endswith('.xlsm') and not name.startswith('~$'):
+                    try:
+                        item_stat = item.stat()
+                        status['workbooks'][name] = (item_stat.st_mtime, item_stat.st_size)
+                    except OSError:
+                        pass
+
+            entry = self._find_file(entries)
+            if entry is None:
+                status['status'] = 'not_found'
+                status['message'] = (f'Файл не найден: {self.excel_filename}'
+                                     if self.excel_filename else 'Excel файл не найден')
+                return self._publish(status)
+
+            try:
+                stat = entry.stat()
+                temp_files = [e for name, e in entries.items() if name.startswith('~$')]
+                temp_entry = entries.get(f'~${entry.name}')
+                status['excel_file'] = self.excel_dir / entry.name
+                status['file_mtime'] = stat.st_mtime
+                status['size'] = stat.st_size
+                status['is_open'] = bool(temp_files)
+                status['temp_mtime'] = temp_files[0].stat().st_mtime if temp_files else None
+                # Как _get_file_mtime: учитываем временный файл именно этой книги
+                status['mtime'] = max(stat.st_mtime, temp_entry.stat().st_mtime) if temp_entry else stat.st_mtime
+            except OSError:
+                # Файл удален/переименован между scandir и stat
+                status['status'] = 'not_found'
+                status['message'] = f'Файл не найден: {entry.name}'
+                status['excel_file'] = None
+                return self._publish(status)
+
+            sidecar_entry = (entries.get(Path(entry.name).with_suffix(self.sidecar_suffix).name)
+                             if self.sidecar_suffix else None)
+            if sidecar_entry is not None:
+                try:
+                    status['sidecar_mtime'] = sidecar_entry.stat().st_mtime
+                except OSError:
+                    pass  # CSV удален между scandir и stat - как будто его нет
+            return self._publish(status)
+
+    def _publish(self, status):
+        previous = self._status
+        changed = status['status'] == 'ok' and (
+            previous is None or previous['status'] != 'ok'
+            or previous['excel_file'] != status['excel_file']
+            or previous['mtime'] != status['mtime']
+            or previous['sidecar_mtime'] != status['sidecar_mtime'])
+        modified = (changed and previous is not None and previous['status'] == 'ok'
+                    and previous['mtime'] != status['mtime'])
+
+        if modified:
+            # Часы файлового сервера могут расходиться с нашими - не меньше 0
+            status['detect_latency'] = max(0.0, status['checked_at'] - status['mtime'])
+        elif previous is not None and status['status'] == 'ok':
+            status['detect_latency'] = previous['detect_latency']
+
+        self._status = status
+        self._log_transition(previous, status)
+        self._adapt_interval(modified)
+
+        if modified:
+            timestamp = datetime.now().strftime('%H:%M:%S')
+            print(f"[WATCH] [{timestamp}] Изменение {status['excel_file'].name} замечено "
+                  f"через {status['detect_latency']:.1f} сек")
+
+        if changed and previous is not None and self.on_change:
+            try:
+                self.on_change(status)
+            except Exception as e:
+                print(f"[ERROR] Ошибка обработчика изменения файла: {e}")
+        return status
+
+    def _log_transition(self, previous, status):
+        """Пишет в лог только смену состояния (а не каждую проверку)"""
+        if previous is not None and previous['status'] == status['status']:
+            return
+        timestamp = datetime.now().strftime('%H:%M:%S')
+        if status['status'] == 'ok':
+            if previous is not None:
+                print(f"[MONITOR] [{timestamp}] Excel файл снова доступен: {status['excel_file'].name}")
+        elif status['status'] == 'network_error':
+            print(f"[ERROR] [{timestamp}] Ошибка: директория недоступна: {self.excel_dir}")
+            print("   Проверьте сетевое подключение и путь в .env файле")
+        else:
+            print(f"[ERROR] [{timestamp}] {status['message']} ({self.excel_dir})")
+
+    def set_polling(self, min_interval, max_interval, backoff=2.0):
+        """
+        Адаптивный интервал опроса (для сетевых дисков без событий watchdog)
+
+        После изменения файла опрос идет каждые min_interval секунд,
+        пока файл не меняется - интервал растет в backoff раз до max_interval.
+        """
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = backoff
+        self.interval = self.min_interval
+        self._wakeup.set()  # применяем новый интервал сразу
+
+    def _adapt_interval(self, modified):
+        if self.min_interval == self.max_interval:
+            return
+        if modified:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+    def current(self):
+        """Последний статус (первая проверка - синхронно, дальше без обращений к диску)"""
+        status = self._status
+        if status is None:
+            status = self.probe()
+        return status
+
+    def refresh(self):
+        """Просит поток монитора проверить файл вне очереди (событие watchdog)"""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.probe()
+            except Exception as e:
+                print(f"[ERROR] Ошибка проверки Excel файла: {e}")
+
+    def start(self):
+        """Запускает фоновый поток проверки (повторный вызов ничего не делает)"""
+        if self._thread is None:
+            self.current()
+            self._thread = threading.Thread(target=self._run, name='excel-monitor', daemon=True)
+            self._thread.start()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Нормализация листа 'Подвесы' после чтения из Excel
+
+Выполняется один раз на каждое поколение данных (после чтения файла),
+добавляет к сырым колонкам готовые к выдаче производные колонки.
+Обработчики запросов после этого только фильтруют и сериализуют строки.
+
+Производные колонки:
+- date_dt: дата (datetime64, NaT если не распознана)
+- date_str / date_full_str: дата '%d.%m.%y' / '%d.%m.%Y' или '—'
+- time_str: время 'ЧЧ:ММ' или '—'; has_time: заполнено ли время
+- lamels_total: сумма ламелей ("30+30" → 60), <NA> если не распознано
+- lamels_display: как показывать ламели в таблице (число или исходная строка)
+- number_key: нормализованный номер подвеса (12, 12.0, ' 12' → '12')
+- *_display: значение колонки или '—' если ячейка пустая
+
+После этого колонки ужимаются (compact_frame): повторяющиеся строки -
+category, целые числа - минимальный целый тип, в смешанных колонках
+одинаковые строки - один объект (sys.intern).
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from excel_loader import COLUMNS
+
+EMPTY_DISPLAY = '—'
+
+# Колонки, для которых готовим вариант "значение или '—'"
+DISPLAY_COLUMNS = ['number', 'client', 'profile', 'color', 'kpz_number', 'material_type']
+
+
+def _map_unique(series, func, na_value):
+    """
+    Применяет func к каждому уникальному значению колонки (а не к каждой строке)
+
+    Returns:
+        np.ndarray (object) той же длины, что и series
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    mapped = np.empty(len(uniques) + 1, dtype=object)
+    for i, value in enumerate(uniques):
+        mapped[i] = func(value)
+    mapped[-1] = na_value  # код -1 = пустая ячейка
+    return mapped[codes]
+
+
+def format_time(value):
+    """Время без секунд: time/datetime → 'ЧЧ:ММ', строка '08:30:00' → '08:30'"""
+    if hasattr(value, 'strftime'):
+        return value.strftime('%H:%M')
+    time_val = str(value)
+    if ':' in time_val:
+        parts = time_val.split(':')
+        return f"{parts[0]}:{parts[1]}"
+    return time_val
+
+
+def parse_lamels(value):
+    """
+    Разбирает количество ламелей
+
+    Returns:
+        (total, display): total - int или None (не распознано),
+                          display - что показывать в таблице
+    """
+    try:
+        # Если число - конвертим в int
+        number = int(float(value))
+        return number, number
+    except (TypeError, ValueError, OverflowError):
+        # OverflowError: "inf", "1e400" - не количество, показываем как есть
+        pass
+
+    # Строка типа "30+30" - показываем как есть, сумму считаем
+    text = str(value)
+    parts = [p.strip() for p in text.split('+')]
+    if parts and all(p.isdigit() for p in parts):
+        return sum(int(p) for p in parts), text
+    return None, text
+
+
+def normalize_hanger_number(value):
+    """Ключ номера подвеса: 12, 12.0, '12', ' 12 ', '12.0' → '12'"""
+    if value is None:
+        return ''
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        if np.isnan(value):
+            return ''
+        return str(int(value)) if float(value).is_integer() else str(value)
+
+    text = str(value).strip()
+    try:
+        number = float(text.replace(',', '.'))
+        if number.is_integer():
+            return str(int(number))
+    except ValueError:
+        pass
+    return text
+
+
+def normalize_frame(df):
+    """
+    Добавляет производные колонки к сырому DataFrame листа
+
+    Args:
+        df: DataFrame с колонками excel_loader.COLUMNS (лишние колонки
+            отбрасываются и считаются заново)
+
+    Returns:
+        новый DataFrame: сырые колонки + производные
+    """
+    df = df[COLUMNS]
+    derived = {}
+
+    date_dt = pd.to_datetime(df['date'], errors='coerce')
+    derived['date_dt'] = date_dt
+    # Форматируем по уникальным дням, а не по каждой строке
+    day = date_dt.dt.normalize()
+    derived['date_str'] = _map_unique(day, lambda d: d.strftime('%d.%m.%y'), EMPTY_DISPLAY)
+    derived['date_full_str'] = _map_unique(day, lambda d: d.strftime('%d.%m.%Y'), EMPTY_DISPLAY)
+
+    derived['time_str'] = _map_unique(df['time'], format_time, EMPTY_DISPLAY)
+    derived['has_time'] = df['time'].notna().to_numpy()
+
+    lamels = _map_unique(df['lamels_qty'], parse_lamels, (0, 0))
+    derived['lamels_total'] = pd.array([item[0] for item in lamels], dtype='Int64')
+    derived['lamels_display'] = np.array([item[1] for item in lamels], dtype=object)
+
+    derived['number_key'] = _map_unique(df['number'], normalize_hanger_number, '')
+
+    for column in DISPLAY_COLUMNS:
+        derived[f'{column}_display'] = _map_unique(df[column], lambda v: v, EMPTY_DISPLAY)
+
+    return compact_frame(pd.concat([df, pd.DataFrame(derived, index=df.index)], axis=1))
+
+
+def _intern_strings(series):
+    """Object колонка, в которой одинаковые строки - один и тот же объект"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    shared = np.empty(len(uniques) + 1, dtype=object)
+    for i, value in enumerate(uniques):
+        shared[i] = sys.intern(value) if isinstance(value, str) else value
+    shared[-1] = np.nan
+    # Пустые ячейки оставляем как были (None / NaN / NaT)
+    values = series.to_numpy(dtype=object, copy=True)
+    filled = codes >= 0
+    values[filled] = shared[codes[filled]]
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def compact_frame(df):
+    """
+    Ужимает колонки DataFrame по памяти, не меняя значений
+
+    - object колонки только из строк (клиент, цвет, профиль, *_display...) →
+      category: коды int8/int16 + одна копия каждой строки
+    - целые колонки (int64 и Int64 с пропусками) → минимальный целый тип
+    - смешанные object колонки (номер, ламели, время) → строки через sys.intern
+
+    Значения ячеек при этом те же (category отдает те же str), хеши строк
+    (excel_delta.row_hashes) тоже не меняются.
+    """
+    compact = {}
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == object:
+            if pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty'):
+                compact[column] = series.astype('category')
+            else:
+                compact[column] = _intern_strings(series)
+        elif pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            compact[column] = pd.to_numeric(series, downcast='integer')
+        else:
+            compact[column] = series
+    return pd.DataFrame(compact, index=df.index)
+
+
+def memory_usage(df):
+    """
+    Сколько памяти занимает DataFrame (deep: с учетом Python объектов в ячейках)
+
+    Returns:
+        dict {'total': байты, 'columns': {колонка: байты}}
+    """
+    usage = df.memory_usage(deep=True)
+    return {
+        'total': int(usage.sum()),
+        'columns': {column: int(usage[column]) for column in df.columns},
+    }
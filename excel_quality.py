@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Проверка качества данных листа 'Подвесы' (один раз на поколение)
+
+Ошибки ввода раньше было видно только по странностям в таблице сайта.
+Здесь они находятся сразу после чтения файла - масками pandas/NumPy по
+всему листу, без цикла по строкам (разбор текста - только по уникальным
+значениям ячеек).
+
+Проверки:
+- duplicate_numbers: один номер подвеса дважды за один день
+- missing_dates: строка без даты (или дата не распознана)
+- bad_lamels: количество ламелей не разбирается ("30+3O", "тридцать")
+- empty_profiles: ячейка профиля заполнена, но названия в ней нет
+  (split_profiles ничего не находит, например "+", "1")
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from excel_loader import excel_row_number
+
+# Заглушки "профиля нет" - это не ошибка ввода
+EMPTY_PROFILE_MARKS = ('-', '—', '--')
+
+CHECKS = {
+    'duplicate_numbers': 'Номер подвеса повторяется в один день',
+    'missing_dates': 'Нет даты или дата не распознана',
+    'bad_lamels': 'Количество ламелей не распознано',
+    'empty_profiles': 'В ячейке профиля нет названия профиля',
+}
+
+
+def _unique_mask(series, predicate):
+    """Маска строк, для значения которых predicate(value) истинно (проверка по уникальным)"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    flags = np.zeros(len(uniques) + 1, dtype=bool)
+    for i, value in enumerate(uniques):
+        flags[i] = predicate(value)
+    return flags[codes]
+
+
+def check_frame(df, split_profiles):
+    """
+    Проверяет нормализованный DataFrame (excel_normalize.normalize_frame)
+
+    Args:
+        df: DataFrame поколения
+        split_profiles: функция разбора ячейки профиля (app.split_profiles)
+
+    Returns:
+        dict {'rows': N, 'duration_ms': ..., 'issues': {проверка: np.ndarray индексов строк}}
+    """
+    start = time.perf_counter()
+    issues = {}
+
+    has_date = df['date_dt'].notna().to_numpy()
+    day = df['date_dt'].dt.normalize()
+    number_key = df['number_key'].astype(object)
+
+    # Один номер подвеса - несколько строк в один день
+    has_number = (number_key != '').to_numpy()
+    keyed = pd.DataFrame({'day': day, 'number': number_key})[has_date & has_number]
+    duplicated = keyed.duplicated(keep=False).to_numpy()
+    issues['duplicate_numbers'] = keyed.index.to_numpy()[duplicated]
+
+    issues['missing_dates'] = df.index.to_numpy()[~has_date]
+
+    # Ламели указаны, но не разобрались ни как число, ни как сумма "30+30"
+    bad_lamels = df['lamels_qty'].notna().to_numpy() & df['lamels_total'].isna().to_numpy()
+    issues['bad_lamels'] = df.index.to_numpy()[bad_lamels]
+
+    def empty_profile(value):
+        text = str(value).strip()
+        return bool(text) and text not in EMPTY_PROFILE_MARKS and not split_profiles(text)
+    empty_profiles = _unique_mask(df['profile'], empty_profile)
+    issues['empty_profiles'] = df.index.to_numpy()[empty_profiles]
+
+    return {
+        'rows': len(df),
+        'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+        'issues': issues,
+    }
+
+
+def summary(report):
+    """Одна строка для лога: сколько строк с каждой проблемой"""
+    parts = [f"{name}={len(rows)}" for name, rows in report['issues'].items() if len(rows)]
+    return ', '.join(parts) if parts else 'ошибок нет'
+
+
+def to_json(report, limit=None):
+    """
+    Ответ API: по каждой проверке - описание, число строк и номера строк Excel
+
+    Args:
+        limit: сколько номеров строк отдавать на проверку (None - все)
+    """
+    issues = {}
+    for name, rows in report['issues'].items():
+        shown = rows if limit is None else rows[:limit]
+        issues[name] = {
+            'title': CHECKS[name],
+            'count': int(len(rows)),
+            'rows': [excel_row_number(idx) for idx in shown],
+        }
+    return {
+        'rows': report['rows'],
+        'duration_ms': report['duration_ms'],
+        'issues': issues,
+    }
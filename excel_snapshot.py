@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Колоночный снимок листа 'Подвесы' на диске (NumPy .npz)
+
+Позволяет после перезапуска app.py не парсить .xlsm заново: снимок
+привязан к mtime, размеру файла и отпечатку листа. Если сетевая папка
+недоступна - можно отдать последний удачный снимок.
+
+Формат: каждая колонка хранится отдельными массивами без pickle.
+- datetime64/int64/float64/bool колонки - как есть
+- object колонки (смесь строк, чисел, времени) кодируются:
+  kind (тип ячейки) + int64 значения + float64 значения + коды строк
+"""
+
+import io
+import json
+import os
+from datetime import time as dt_time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_VERSION = 1
+
+# Отметка в папке кэша: снимок какой книги - текущий (остальные - архив прошлых лет)
+CURRENT_FILE = 'current.json'
+
+# Типы ячеек в object колонках
+_KIND_NULL = 0
+_KIND_TEXT = 1
+_KIND_INT = 2
+_KIND_FLOAT = 3
+_KIND_DATETIME = 4
+_KIND_TIME = 5
+_KIND_BOOL = 6
+
+
+def snapshot_path(cache_dir, excel_file):
+    """Путь к файлу снимка для конкретного Excel файла"""
+    return Path(cache_dir) / f"{Path(excel_file).stem}.snapshot.npz"
+
+
+def make_key(excel_file, sheet_fp):
+    """Ключ снимка: mtime, размер и отпечаток листа"""
+    stat = os.stat(excel_file)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size, 'sheet_fp': sheet_fp}
+
+
+def key_matches(stored_key, key):
+    """
+    Подходит ли снимок к текущему файлу
+
+    Совпадение отпечатка листа достаточно: автосохранение без изменений
+    меняет mtime, но не содержимое листа.
+    """
+    if stored_key == key:
+        return True
+    return bool(key.get('sheet_fp')) and stored_key.get('sheet_fp') == key.get('sheet_fp')
+
+
+def _time_to_us(value):
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000 + value.microsecond
+
+
+def _us_to_time(us):
+    us = int(us)
+    seconds, micro = divmod(us, 1_000_000)
+    minutes, sec = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return dt_time(hour, minute, sec, micro)
+
+
+def _encode_object(values):
+    """Кодирует object колонку в набор числовых массивов"""
+    n = len(values)
+    kinds = np.zeros(n, dtype=np.int8)
+    ints = np.zeros(n, dtype=np.int64)
+    floats = np.zeros(n, dtype=np.float64)
+    codes = np.full(n, -1, dtype=np.int32)
+    strings = {}
+
+    for i, value in enumerate(values):
+        if value is None or (isinstance(value, float) and value != value) or value is pd.NaT:
+            continue
+        if isinstance(value, str):
+            kinds[i] = _KIND_TEXT
+            codes[i] = strings.setdefault(value, len(strings))
+        elif isinstance(value, (bool, np.bool_)):
+            kinds[i] = _KIND_BOOL
+            ints[i] = int(value)
+        elif isinstance(value, (int, np.integer)):
+            kinds[i] = _KIND_INT
+            ints[i] = int(value)
+        elif isinstance(value, (float, np.floating)):
+            kinds[i] = _KIND_FLOAT
+            floats[i] = float(value)
+        elif isinstance(value, dt_time):
+            kinds[i] = _KIND_TIME
+            ints[i] = _time_to_us(value)
+        elif hasattr(value, 'year'):
+            kinds[i] = _KIND_DATETIME
+            ints[i] = pd.Timestamp(value).value
+        else:
+            kinds[i] = _KIND_TEXT
+            codes[i] = strings.setdefault(str(value), len(strings))
+
+    # Уникальные строки храним одним массивом фиксированной ширины
+    text = np.array(list(strings), dtype=np.str_) if strings else np.array([], dtype='<U1')
+    return {'kind': kinds, 'int': ints, 'float': floats, 'code': codes, 'text': text}
+
+
+def _decode_object(arrays):
+    """Собирает object колонку обратно из массивов _encode_object"""
+    kinds = arrays['kind']
+    result = np.full(len(kinds), np.nan, dtype=object)
+
+    mask = kinds == _KIND_TEXT
+    if mask.any():
+        text = arrays['text'].astype(object)
+        result[mask] = text[arrays['code'][mask]]
+    mask = kinds == _KIND_INT
+    if mask.any():
+        result[mask] = arrays['int'][mask].tolist()
+    mask = kinds == _KIND_FLOAT
+    if mask.any():
+        result[mask] = arrays['float'][mask].tolist()
+    mask = kinds == _KIND_BOOL
+    if mask.any():
+        result[mask] = arrays['int'][mask].astype(bool).tolist()
+    mask = kinds == _KIND_DATETIME
+    if mask.any():
+        result[mask] = list(pd.to_datetime(arrays['int'][mask]))
+    mask = kinds == _KIND_TIME
+    if mask.any():
+        result[mask] = [_us_to_time(us) for us in arrays['int'][mask]]
+    return result
+
+
+def encode_frame(df):
+    """
+    Кодирует DataFrame в словарь NumPy массивов (без object dtype)
+
+    Returns:
+        dict {имя массива: np.ndarray}, включая '__meta__' (JSON)
+    """
+    arrays = {'__index__': df.index.to_numpy(dtype=np.int64)}
+    dtypes = {}
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        # category / Int8 и т.п. (сжатые колонки) храним как object
+        if series.dtype == object or not isinstance(series.dtype, np.dtype):
+            dtypes[column] = 'object'
+            for part, values in _encode_object(series.to_numpy(dtype=object)).items():
+                arrays[f'c{i}.{part}'] = values
+        else:
+            dtypes[column] = str(series.dtype)
+            arrays[f'c{i}'] = series.to_numpy()
+
+    meta = {'version': SNAPSHOT_VERSION, 'columns': list(df.columns), 'dtypes': dtypes}
+    arrays['__meta__'] = np.array(json.dumps(meta, ensure_ascii=False))
+    return arrays
+
+
+def decode_frame(arrays):
+    """Собирает DataFrame из словаря массивов encode_frame()"""
+    meta = json.loads(str(arrays['__meta__']))
+    if meta.get('version') != SNAPSHOT_VERSION:
+        return None
+
+    data = {}
+    for i, column in enumerate(meta['columns']):
+        if meta['dtypes'][column] == 'object':
+            parts = {part: arrays[f'c{i}.{part}'] for part in ('kind', 'int', 'float', 'code', 'text')}
+            data[column] = _decode_object(parts)
+        else:
+            data[column] = arrays[f'c{i}']
+    return pd.DataFrame(data, index=pd.Index(arrays['__index__']), columns=meta['columns'])
+
+
+def frame_to_bytes(df):
+    """Сериализует DataFrame в компактный бинарный вид (.npz в памяти, без pickle)"""
+    buffer = io.BytesIO()
+    np.savez(buffer, **encode_frame(df))
+    return buffer.getvalue()
+
+
+def frame_from_bytes(data):
+    """Обратное преобразование для frame_to_bytes()"""
+    with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+        return decode_frame({name: npz[name] for name in npz.files})
+
+
+def save_snapshot(path, df, key):
+    """
+    Атомарно записывает снимок на диск (через временный файл)
+
+    Args:
+        path: путь к .npz файлу
+        df: DataFrame листа 'Подвесы'
+        key: dict из make_key()
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    arrays = encode_frame(df)
+    arrays['__key__'] = np.array(json.dumps(key))
+
+    tmp_path = path.with_name(path.name + '.tmp')
+    # Без сжатия: чтение снимка = последовательное чтение массивов
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def save_current(cache_dir, excel_file):
+    """Запоминает, что excel_file - текущая книга (для current_snapshot_path)"""
+    path = Path(cache_dir) / CURRENT_FILE
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'workbook': Path(excel_file).name}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def current_snapshot_path(cache_dir):
+    """
+    Снимок текущей книги по отметке save_current
+
+    Returns:
+        Path или None (отметки нет или снимок удален)
+    """
+    try:
+        with open(Path(cache_dir) / CURRENT_FILE, encoding='utf-8') as f:
+            name = json.load(f)['workbook']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    path = snapshot_path(cache_dir, name)
+    return path if path.exists() else None
+
+
+def load_snapshot(path, key=None):
+    """
+    Читает снимок с диска
+
+    Args:
+        path: путь к .npz файлу
+        key: ожидаемый ключ (None - принять любой снимок, например если
+             сетевая папка недоступна)
+
+    Returns:
+        (DataFrame, key) или (None, None) если снимка нет или он устарел
+    """
+    path = Path(path)
+    if not path.exists():
+        return None, None
+
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            stored_key = json.loads(str(npz['__key__']))
+            if key is not None and not key_matches(stored_key, key):
+                return None, None
+            df = decode_frame({name: npz[name] for name in npz.files})
+    except Exception as e:
+        print(f"[WARN] Не удалось прочитать снимок {path.name}: {e}")
+        return None, None
+
+    if df is None:
+        return None, None
+    return df, stored_key
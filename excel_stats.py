@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Статистика пропускной способности линии по листу 'Подвесы'
+
+Считается groupby по уже разобранной колонке lamels_total
+(excel_normalize: "30+30" → 60), без преобразований по строкам.
+"""
+
+import pandas as pd
+
+# Группировки: имя параметра ?by= → колонка DataFrame
+GROUPINGS = {
+    'day': 'date_dt',
+    'client': 'client_display',
+    'color': 'color_display',
+    'material': 'material_type_display',
+    'profile': 'profile_display',
+}
+
+
+def throughput(df, by='day', date_from=None, date_to=None):
+    """
+    Подвесы и ламели по дням / клиентам / цветам
+
+    Args:
+        df: нормализованный DataFrame
+        by: ключ из GROUPINGS
+        date_from, date_to: период (pd.Timestamp, date_to - включительно)
+
+    Returns:
+        pd.DataFrame с индексом-группой и колонками
+        hangers (строк), lamels (сумма ламелей), invalid (ламели не распознаны)
+    """
+    dates = df['date_dt']
+    # Строки без даты не попадают только в разбивку по дням и в период;
+    # по клиентам / цветам без фильтра по дате считаются все строки
+    if by == 'day' or date_from is not None or date_to is not None:
+        mask = dates.notna()
+        if date_from is not None:
+            mask &= dates >= date_from
+        if date_to is not None:
+            mask &= dates < date_to + pd.Timedelta(days=1)
+        part = df[mask]
+    else:
+        part = df
+
+    if by == 'day':
+        key = part['date_dt'].dt.normalize()
+    else:
+        key = part[GROUPINGS[by]]
+
+    lamels = part['lamels_total'].astype('Int64')
+    frame = pd.DataFrame({
+        'key': key,
+        'lamels': lamels,
+        'invalid': (lamels.isna() & part['lamels_qty'].notna()).astype('int64'),
+    })
+    # Сортируем только даты: в текстовых колонках бывают и числа
+    return frame.groupby('key', observed=True, sort=by == 'day').agg(
+        hangers=('lamels', 'size'),
+        lamels=('lamels', 'sum'),
+        invalid=('invalid', 'sum'),
+    )
+
+
+def combine(results, by='day'):
+    """Складывает результаты throughput() нескольких книг (один ключ - одна строка)"""
+    results = [result for result in results if not result.empty]
+    if not results:
+        return pd.DataFrame({'hangers': [], 'lamels': [], 'invalid': []})
+    if len(results) == 1:
+        return results[0]
+    return pd.concat(results).groupby(level=0, observed=True, sort=by == 'day').sum()
+
+
+def to_json(result, by):
+    """Строки для ответа API; по дням - по порядку дат, остальное - по убыванию ламелей"""
+    if by != 'day':
+        result = result.sort_values('lamels', ascending=False, kind='stable')
+    rows = []
+    for key, hangers, lamels, invalid in result.itertuples():
+        rows.append({
+            'key': key.strftime('%d.%m.%Y') if by == 'day' else key,
+            'hangers': int(hangers),
+            'lamels': int(lamels),
+            'invalid': int(invalid),
+        })
+    return rows
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Индекс фото профилей в PROFILES_DIR
+
+Раньше папка сканировалась целиком (glob + stat каждого файла) при каждом
+запросе каталога и после каждой загрузки / удаления / переименования фото.
+Теперь она сканируется один раз при старте (os.scandir), дальше индекс
+обновляется по отдельным файлам - по событиям watchdog (накопленные за
+паузу события - одним новым индексом) и из обработчиков загрузки/удаления.
+
+PhotoIndex не изменяется после создания: обновление возвращает новый
+индекс, app.py подменяет его одним присваиванием. Запросы, которые уже
+взяли старый индекс, дочитывают его без блокировок.
+
+Имена файлов: "<профиль>.jpg" - полное фото, "<профиль>-thumb.jpg" - превью.
+"""
+
+import os
+
+import text_normalize
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+THUMB_SUFFIX = '-thumb'
+URL_PREFIX = '/static/images/'
+
+
+def parse_filename(filename):
+    """
+    Имя файла → (ключ профиля в нижнем регистре, имя профиля, превью ли)
+    или None, если это не фото
+    """
+    stem, ext = os.path.splitext(filename)
+    if ext.lower() not in PHOTO_EXTENSIONS:
+        return None
+    is_thumb = stem.endswith(THUMB_SUFFIX)
+    profile_name = stem[:-len(THUMB_SUFFIX)] if is_thumb else stem
+    return profile_name.lower(), profile_name, is_thumb
+
+
+class PhotoIndex:
+    """
+    Фото профилей и индексы для поиска (get_profile_photo в app.py)
+
+    photos: имя профиля в нижнем регистре → {'thumb', 'full', 'original_name'}
+    Индексы хранят ключи photos в порядке добавления:
+    _normalized: text_normalize.search_key(имя) → ключи
+    _digits: цифры из имени → ключи (совпадение однозначно, только если ключ один)
+    """
+
+    def __init__(self, photos=None, normalized=None, digits=None):
+        self.photos = photos or {}
+        self._normalized = normalized or {}
+        self._digits = digits or {}
+
+    @classmethod
+    def scan(cls, directory):
+        """Полное сканирование папки (один проход os.scandir, без stat на файл)"""
+        photos = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                parsed = parse_filename(entry.name)
+                if parsed is None or not entry.is_file():
+                    continue
+                _set_file(photos, entry.name, parsed)
+        return cls().updated(photos)
+
+    def updated(self, changed=None, removed=()):
+        """
+        Новый индекс с примененными изменениями (self, если ничего не изменилось)
+
+        Args:
+            changed: {ключ: запись} - добавленные / измененные профили
+            removed: ключи профилей, у которых не осталось файлов
+        """
+        changed = {key: info for key, info in (changed or {}).items() if self.photos.get(key) != info}
+        removed = [key for key in removed if key in self.photos and key not in changed]
+        if not changed and not removed:
+            return self
+
+        photos = dict(self.photos)
+        normalized = dict(self._normalized)
+        digits = dict(self._digits)
+        for key in removed:
+            del photos[key]
+            _discard(normalized, text_normalize.search_key(key), key)
+            _discard(digits, text_normalize.digit_signature(key), key)
+        for key, info in changed.items():
+            if key not in photos:
+                _append(normalized, text_normalize.search_key(key), key)
+                _append(digits, text_normalize.digit_signature(key), key)
+            photos[key] = info
+        return PhotoIndex(photos, normalized, digits)
+
+    def with_files(self, present=(), missing=()):
+        """
+        Новый индекс после изменения отдельных файлов
+
+        Args:
+            present: имена файлов, которые появились или изменились
+            missing: имена файлов, которых больше нет
+        """
+        photos = {}
+        for filename in missing:
+            parsed = parse_filename(filename)
+            if parsed is not None:
+                key = parsed[0]
+                info = photos.get(key, self.photos.get(key))
+                url = URL_PREFIX + filename
+                if info is not None and url in (info['thumb'], info['full']):
+                    info = {**info, 'thumb' if parsed[2] else 'full': None}
+                    # Имя профиля - по оставшемуся файлу ("ЮП-1625.jpg" удален, есть "юп-1625-thumb.jpg")
+                    remaining = info['thumb'] or info['full']
+                    if remaining:
+                        info['original_name'] = parse_filename(remaining[len(URL_PREFIX):])[1]
+                    photos[key] = info
+        for filename in present:
+            parsed = parse_filename(filename)
+            if parsed is not None:
+                if parsed[0] not in photos and parsed[0] in self.photos:
+                    photos[parsed[0]] = self.photos[parsed[0]]
+                _set_file(photos, filename, parsed)
+
+        removed = [key for key, info in photos.items() if not info['thumb'] and not info['full']]
+        changed = {key: info for key, info in photos.items() if info['thumb'] or info['full']}
+        return self.updated(changed, removed)
+
+    def get(self, profile_key):
+        """Фото по имени профиля в нижнем регистре (точное совпадение)"""
+        return self.photos.get(profile_key)
+
+    def find_normalized(self, key):
+        """Фото по search_key (первое добавленное, если таких несколько)"""
+        keys = self._normalized.get(key)
+        return self.photos[keys[0]] if keys else None
+
+    def find_digits(self, digits):
+        """Фото по цифрам из имени, только если с такими цифрами один профиль"""
+        keys = self._digits.get(digits)
+        return self.photos[keys[0]] if keys and len(keys) == 1 else None
+
+    def counts(self):
+        """(профилей, превью, полных фото)"""
+        thumbs = sum(1 for info in self.photos.values() if info['thumb'])
+        fulls = sum(1 for info in self.photos.values() if info['full'])
+        return len(self.photos), thumbs, fulls
+
+    def __len__(self):
+        return len(self.photos)
+
+
+def _set_file(photos, filename, parsed):
+    """Записывает файл в запись профиля (новая запись - не изменяет старую)"""
+    key, profile_name, is_thumb = parsed
+    info = photos.get(key) or {'thumb': None, 'full': None, 'original_name': profile_name}
+    photos[key] = {**info, 'thumb' if is_thumb else 'full': URL_PREFIX + filename}
+
+
+def _append(index, index_key, key):
+    """Добавляет ключ профиля в список индекса (кортежи - не изменяются)"""
+    if index_key:
+        index[index_key] = index.get(index_key, ()) + (key,)
+
+
+def _discard(index, index_key, key):
+    """Убирает ключ профиля из списка индекса"""
+    keys = tuple(k for k in index.get(index_key, ()) if k != key)
+    if keys:
+        index[index_key] = keys
+    else:
+        index.pop(index_key, None)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Разбор ячейки профиля из листа 'Подвесы'
+
+Ячейка может содержать несколько профилей с дополнительными обработками:
+"юп-1625 окно + юп-3233 греб + юп-1875". Обработки (окно, греб, сверло...)
+задаются настройкой PROFILE_PROCESSING_KEYWORDS (.env) и собираются в одно
+заранее скомпилированное регулярное выражение - строка просматривается
+один раз, а не отдельным поиском и заменой на каждую обработку.
+"""
+
+import re
+
+# Обработки по умолчанию: слово в ячейке → как показываем ("гребенка" → "греб")
+DEFAULT_KEYWORDS = 'окно,греб,гребенка:греб,сверло'
+
+# Разделители профилей в ячейке: +, запятая, точка с запятой, 2+ пробела
+SEPARATOR_RE = re.compile(r'\s*[+,;|]\s*|\s{2,}')
+
+# Короче - не название профиля ("+", "1")
+MIN_NAME_LENGTH = 2
+
+
+def parse_keywords(spec):
+    """
+    Настройка обработок → {слово в нижнем регистре: название обработки}
+
+    Формат: слова через запятую, "слово:название" - если в ответе
+    обработка называется иначе ("гребенка:греб"). Порядок слов -
+    порядок обработок в ответе.
+    """
+    keywords = {}
+    for item in (spec or '').split(','):
+        keyword, _, label = item.partition(':')
+        keyword = keyword.strip().lower()
+        if keyword:
+            keywords[keyword] = label.strip().lower() or keyword
+    return keywords
+
+
+class ProfileTokenizer:
+    """Разбор названий профилей и обработок по заданному списку обработок"""
+
+    def __init__(self, keywords):
+        """
+        Args:
+            keywords: {слово: название обработки} (parse_keywords)
+        """
+        self.keywords = dict(keywords)
+        if self.keywords:
+            # Длинные слова первыми ("гребенка" раньше "греб")
+            words = sorted(self.keywords, key=len, reverse=True)
+            self._keyword_re = re.compile(r'\b(?:' + '|'.join(map(re.escape, words)) + r')\b',
+                                          re.IGNORECASE)
+        else:
+            self._keyword_re = None
+
+    def parse(self, text):
+        """
+        Название профиля и обработки из одной части ячейки
+
+        "ЮП-1625 окно" → {"name": "ЮП-1625", "processing": ["окно"]}
+        "корпус" → {"name": "корпус", "processing": []}
+        """
+        text = str(text).strip()
+        name = text
+        processing = []
+
+        if self._keyword_re is not None:
+            found = set()
+
+            def take(match):
+                found.add(match.group(0).lower())
+                return ''
+
+            name = self._keyword_re.sub(take, text)
+            if found:
+                # Каждое слово - один раз, в порядке настройки
+                processing = [label for keyword, label in self.keywords.items() if keyword in found]
+
+        # Лишние пробелы (в том числе на месте удаленных обработок)
+        name = ' '.join(name.split())
+        name = name.rstrip('+,;').strip()
+        return {"name": name, "processing": processing}
+
+    def split(self, profile_string):
+        """
+        Ячейка с несколькими профилями → список {"name", "processing"}
+
+        "юп-1625 окно + юп-3233 греб" →
+            [{"name": "юп-1625", "processing": ["окно"]},
+             {"name": "юп-3233", "processing": ["греб"]}]
+        """
+        profiles = []
+        for part in SEPARATOR_RE.split(str(profile_string).strip()):
+            part = part.strip()
+            if not part:
+                continue
+            parsed = self.parse(part)
+            if len(parsed["name"]) >= MIN_NAME_LENGTH:
+                profiles.append(parsed)
+        return profiles
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+CSV sidecar vs .xlsm parsing benchmark
+
+Description:
+- Writes a synthetic workbook and the CSV sidecar the autosave macro
+  exports next to it (same rows, see bench_data.write_csv_sidecar)
+- Times excel_loader.read_full (openpyxl) against excel_loader.read_csv_sidecar
+- Checks that both paths produce the same DataFrame
+
+Usage:
+    python scripts/bench_csv_sidecar.py [rows ...]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from bench_data import write_csv_sidecar, write_workbook
+
+import excel_loader
+
+ROW_COUNTS = [int(arg) for arg in sys.argv[1:]] or [10000, 50000]
+REPEAT = 3
+
+
+def best_of(func):
+    """Best wall time of REPEAT runs, seconds"""
+    timings = []
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    tmp_dir = Path(tempfile.mkdtemp(prefix='ekranchik-csv-'))
+    print(f"{'rows':>8} {'xlsm MiB':>9} {'csv MiB':>8} {'openpyxl s':>11} {'csv s':>8} {'speedup':>8}  same")
+    for rows in ROW_COUNTS:
+        workbook = write_workbook(tmp_dir / f'bench_{rows}.xlsm', rows)
+        csv_file = write_csv_sidecar(excel_loader.csv_sidecar_path(workbook), rows)
+
+        xlsm_time, from_xlsm = best_of(lambda: excel_loader.read_full(workbook))
+        csv_time, from_csv = best_of(lambda: excel_loader.read_csv_sidecar(csv_file))
+
+        try:
+            pd.testing.assert_frame_equal(from_xlsm, from_csv)
+            same = 'yes'
+        except AssertionError as e:
+            same = f'NO: {str(e).splitlines()[0]}'
+
+        print(f"{rows:>8} {workbook.stat().st_size / 2**20:>9.1f} {csv_file.stat().st_size / 2**20:>8.1f} "
+              f"{xlsm_time:>11.2f} {csv_time:>8.3f} {xlsm_time / csv_time:>7.1f}x  {same}")
+
+
+if __name__ == '__main__':
+    main()
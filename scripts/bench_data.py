@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic production data for benchmarks
+
+Description:
+- Builds DataFrames shaped like the 'Подвесы' sheet after excel_loader.read_full
+- Writes synthetic .xlsm workbooks with the real sheet layout
+  (2 instruction rows, header row, data in columns D..T)
+- Writes the CSV sidecar the autosave macro exports next to the workbook
+
+Used by the bench_*.py scripts, not by the application itself.
+"""
+
+import csv
+import random
+import sys
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Make app modules (excel_loader, db, ...) importable from scripts/
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import excel_loader
+
+
+PROFILES = [
+    'ЮП-1625 окно + ЮП-3233 греб', 'юп-1625 окно', 'АЛС-345', 'ALS-345',
+    'юп-1875', 'корпус сверло', 'СП-102 гребенка', 'ЮП-3233  юп-1875',
+    'КП-4520, КП-4521', 'ал-12 окно + сверло', '-', '',
+]
+CLIENTS = ['Алюмтех', 'Профиль-Строй', 'ИП Иванов', 'Окна Плюс', 'Фасад']
+COLORS = ['серебро', 'бронза', 'черный', 'золото', 'шампань']
+MATERIALS = ['ал', 'ст']
+LAMELS = [30, 45, '30+30', '20+20+10', 60.0, '30+3O', None]
+
+
+def make_rows(n_rows, seed=1):
+    """Generates n_rows of raw cell values in COLUMNS order"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, 7, 0)
+    rows = []
+    for i in range(n_rows):
+        has_time = i < n_rows - 10 and rng.random() > 0.05
+        rows.append([
+            start + timedelta(minutes=15 * i) if rng.random() > 0.01 else None,
+            rng.randint(1, 60),
+            time(rng.randint(6, 22), rng.randint(0, 59)) if has_time else None,
+            rng.choice(MATERIALS),
+            f'КПЗ-{i // 4}',
+            rng.choice(CLIENTS),
+            rng.choice(PROFILES) or None,
+            rng.choice(COLORS),
+            rng.choice(LAMELS),
+        ])
+    return rows
+
+
+def make_frame(n_rows, seed=1):
+    """DataFrame with the same columns/dtypes as excel_loader.read_full()"""
+    df = pd.DataFrame(make_rows(n_rows, seed), columns=excel_loader.COLUMNS)
+    df['date'] = pd.to_datetime(df['date'])
+    df['number'] = df['number'].astype(np.int64)
+    return df
+
+
+def write_workbook(path, n_rows, seed=1):
+    """
+    Writes a synthetic workbook with a 'Подвесы' sheet in the real layout
+
+    Other columns (A..T outside USE_COLS) are filled too, so openpyxl has
+    the same amount of XML to skip as on the production file.
+    """
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(excel_loader.SHEET_NAME)
+    ws.append(['Инструкция: заполняйте строки по порядку'])
+    ws.append(['Время выгрузки ставится после выхода подвеса'])
+    ws.append([f'Колонка {i + 1}' for i in range(20)])
+
+    for values in make_rows(n_rows, seed):
+        row = [f'x{i}' for i in range(20)]
+        for col, value in zip(excel_loader.USE_COLS, values):
+            row[col] = value
+        ws.append(row)
+
+    wb.create_sheet('Справочник').append(['служебный лист'])
+    wb.save(path)
+    return Path(path)
+
+
+def _csv_cell(value):
+    """Formats a cell the way ExportPodvesyCsv in AutoSave_Macro.vba does"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, time):
+        return value.strftime('%H:%M:%S')
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # VBA Str(60#) = "60"
+    return str(value)
+
+
+def write_csv_sidecar(path, n_rows, seed=1):
+    """Writes the CSV sidecar for write_workbook(path, n_rows, seed)"""
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(excel_loader.CSV_COLUMNS)
+        for i, values in enumerate(make_rows(n_rows, seed)):
+            writer.writerow([excel_loader.FIRST_DATA_ROW + i] + [_csv_cell(v) for v in values])
+    return Path(path)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Cached frame memory benchmark (excel_normalize.compact_frame)
+
+Description:
+- Writes synthetic workbooks (bench_data.write_workbook) of several sizes
+- Normalizes them as app.py does and reports deep memory usage of the
+  compacted frame against the same frame with plain dtypes
+  (object instead of category, int64/Int64 instead of small ints)
+- Prints the largest columns of the compacted frame
+
+Usage:
+    python scripts/bench_frame_memory.py [rows ...]     (default: 10000 50000)
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from bench_data import write_workbook
+
+import excel_loader
+import excel_normalize
+
+ROW_COUNTS = [int(arg) for arg in sys.argv[1:]] or [10000, 50000]
+TOP_COLUMNS = 5
+
+
+def plain_dtypes(df):
+    """The frame as it was cached before compaction"""
+    plain = {}
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            plain[column] = series.astype(object)
+        elif pd.api.types.is_extension_array_dtype(series.dtype) and pd.api.types.is_integer_dtype(series.dtype):
+            plain[column] = series.astype('Int64')
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            plain[column] = series.astype('int64')
+        else:
+            plain[column] = series
+    return pd.DataFrame(plain, index=df.index)
+
+
+def main():
+    tmp_dir = Path(tempfile.mkdtemp(prefix='ekranchik-memory-'))
+    print(f"{'rows':>8} {'plain MiB':>10} {'compact MiB':>12} {'ratio':>7} {'normalize s':>12}")
+    for rows in ROW_COUNTS:
+        workbook = write_workbook(tmp_dir / f'bench_{rows}.xlsm', rows)
+        raw = excel_loader.read_full(workbook)
+
+        start = time.perf_counter()
+        compact = excel_normalize.normalize_frame(raw)
+        seconds = time.perf_counter() - start
+
+        plain_usage = excel_normalize.memory_usage(plain_dtypes(compact))
+        compact_usage = excel_normalize.memory_usage(compact)
+        print(f"{rows:>8} {plain_usage['total'] / 2**20:>10.1f} {compact_usage['total'] / 2**20:>12.1f} "
+              f"{plain_usage['total'] / compact_usage['total']:>6.1f}x {seconds:>12.3f}")
+
+        largest = sorted(compact_usage['columns'].items(), key=lambda item: item[1], reverse=True)
+        for column, size in largest[:TOP_COLUMNS]:
+            print(f"{'':>8}   {column:<24} {str(compact[column].dtype):<10} "
+                  f"{size / 2**20:>6.2f} MiB (was {plain_usage['columns'][column] / 2**20:.2f})")
+        workbook.unlink()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Profile photo index benchmark (photo_index)
+
+Description:
+- Creates a synthetic PROFILES_DIR with N empty photo files
+  (full photo + "-thumb" preview per profile, some non-photo files)
+- Times the full scan as app.scan_profile_photos did it on every catalog
+  request and after every upload (Path.glob + is_file per file, then the
+  lookup indexes) against photo_index.PhotoIndex.scan (one os.scandir pass)
+- Times applying a single added / removed file to the index
+  (PhotoIndex.with_files, what an upload costs now)
+- Times a burst of BURST new files (copying a folder of photos) applied
+  one event at a time against one batch (what app.py does with queued
+  watchdog events: every new index copies the lookup dicts once)
+- Checks that lookups by exact name, search key and digits give the same
+  photos in both indexes
+
+Usage:
+    python scripts/bench_photo_index.py [files]     (default: 50000)
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_data import PROFILES
+
+import photo_index
+import text_normalize
+
+FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+REPEAT = 3
+BURST = 200
+PREFIXES = ['ЮП', 'АЛС', 'ALS', 'СП', 'КП', 'АТ', 'ал']
+
+
+def old_scan(directory):
+    """app.scan_profile_photos before photo_index: glob + is_file, then the two lookup indexes"""
+    photos = {}
+    for file_path in directory.glob('*'):
+        if not file_path.is_file():
+            continue
+        if file_path.suffix.lower() not in ['.jpg', '.jpeg', '.png', '.webp', '.gif']:
+            continue
+        filename = file_path.stem
+        is_thumb = filename.endswith('-thumb')
+        profile_name = filename[:-6] if is_thumb else filename
+        profile_key = profile_name.lower()
+        if profile_key not in photos:
+            photos[profile_key] = {'thumb': None, 'full': None, 'original_name': profile_name}
+        photos[profile_key]['thumb' if is_thumb else 'full'] = f"/static/images/{file_path.name}"
+
+    by_normalized = {}
+    by_digits = {}
+    for profile_key, photo_info in photos.items():
+        by_normalized.setdefault(text_normalize.search_key(profile_key), photo_info)
+        digits = text_normalize.digit_signature(profile_key)
+        if digits:
+            by_digits[digits] = None if digits in by_digits else photo_info
+    return photos, by_normalized, by_digits
+
+
+def make_directory(directory, n_files):
+    """n_files photo files (2 per profile) plus a few non-photo files"""
+    for i in range(n_files // 2):
+        name = f'{PREFIXES[i % len(PREFIXES)]}-{i}'
+        (directory / f'{name}.jpg').touch()
+        (directory / f'{name}-thumb.jpg').touch()
+    for i in range(10):
+        (directory / f'readme-{i}.txt').touch()
+
+
+def best_of(func):
+    """Best wall time of REPEAT runs, seconds"""
+    timings = []
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    directory = Path(tempfile.mkdtemp(prefix='ekranchik-photos-'))
+    try:
+        make_directory(directory, FILES)
+
+        old_time, (photos, by_normalized, by_digits) = best_of(lambda: old_scan(directory))
+        new_time, index = best_of(lambda: photo_index.PhotoIndex.scan(directory))
+
+        # One file: a new photo, then the same photo removed
+        add_time, added = best_of(lambda: index.with_files(present=['НОВЫЙ-1.jpg']))
+        remove_time, _ = best_of(lambda: added.with_files(missing=['НОВЫЙ-1.jpg']))
+
+        # Burst: one new index per event vs one per batch
+        burst = [f'ПАЧКА-{i}.jpg' for i in range(BURST)]
+
+        def per_event():
+            result = index
+            for filename in burst:
+                result = result.with_files(present=[filename])
+            return result
+
+        per_event_time, by_event = best_of(per_event)
+        batch_time, by_batch = best_of(lambda: index.with_files(present=burst))
+
+        queries = [name for value in PROFILES for name in value.split('+')] + \
+                  [f'{prefix} {i}' for prefix in PREFIXES for i in range(0, FILES // 2, 997)] + \
+                  [str(i) for i in range(0, FILES // 2, 991)]
+        same = True
+        for query in queries:
+            key = query.strip().lower()
+            old = photos.get(key) or by_normalized.get(text_normalize.search_key(key)) or \
+                (by_digits.get(text_normalize.digit_signature(key)) if text_normalize.digit_signature(key) else None)
+            new = index.get(key) or index.find_normalized(text_normalize.search_key(key)) or \
+                index.find_digits(text_normalize.digit_signature(key))
+            same = same and old == new
+
+        print(f"{FILES} files, {len(index)} profiles")
+        print(f"full scan, glob + is_file:     {old_time * 1000:>9.1f} ms")
+        print(f"full scan, os.scandir:         {new_time * 1000:>9.1f} ms   {old_time / new_time:.1f}x")
+        print(f"one added file (upload):       {add_time * 1000:>9.1f} ms   {old_time / add_time:.0f}x vs rescan")
+        print(f"one removed file (upload):     {remove_time * 1000:>9.1f} ms")
+        print(f"{BURST} files, one per event:    {per_event_time * 1000:>9.1f} ms")
+        print(f"{BURST} files, one batch:        {batch_time * 1000:>9.1f} ms   {per_event_time / batch_time:.0f}x"
+              f"   same: {'yes' if by_event.photos == by_batch.photos else 'NO'}")
+        print(f"same lookups ({len(queries)} queries): {'yes' if same else 'NO'}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
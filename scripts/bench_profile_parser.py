@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Profile cell parser benchmark (profile_parser)
+
+Description:
+- Builds a corpus of profile cells from real profile names
+  (archive/manual_import/profiles_anod.csv) and the synthetic sheet values
+  (bench_data.PROFILES), combined the way operators fill the sheet:
+  several profiles per cell, processing keywords, "+", ",", double spaces
+- Times split_profiles as it was (four keyword regexes per part, separator
+  regex compiled per call) against profile_parser.ProfileTokenizer
+- Checks that both give the same result for every cell
+
+Usage:
+    python scripts/bench_profile_parser.py [cells]     (default: 20000)
+"""
+
+import csv
+import random
+import re
+import sys
+import time
+
+from bench_data import PROFILES, ROOT_DIR
+
+import profile_parser
+
+CELLS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+REPEAT = 3
+KEYWORDS = ['окно', 'греб', 'гребенка', 'сверло', 'Окно', 'ГРЕБ']
+SEPARATORS = [' + ', '+', ', ', '; ', '  ']
+
+
+def old_parse_profile_with_processing(text):
+    """app.parse_profile_with_processing before profile_parser"""
+    text = str(text).strip()
+    processing_keywords = ['окно', 'греб', 'гребенка', 'сверло']
+    found_processing = []
+    name = text
+    for keyword in processing_keywords:
+        pattern = r'\b' + re.escape(keyword) + r'\b'
+        if re.search(pattern, text, re.IGNORECASE):
+            found_processing.append('греб' if keyword == 'гребенка' else keyword)
+            name = re.sub(pattern, '', name, flags=re.IGNORECASE)
+    name = re.sub(r'\s+', ' ', name).strip()
+    name = name.rstrip('+,;').strip()
+    return {"name": name, "processing": found_processing}
+
+
+def old_split_profiles(profile_string):
+    """app.split_profiles before profile_parser"""
+    profile_str = str(profile_string).strip()
+    profile_str = re.sub(r'\s*[+,;]\s*|\s{2,}', '|', profile_str)
+    parts = [p.strip() for p in profile_str.split('|') if p.strip()]
+    profiles = []
+    for part in parts:
+        parsed = old_parse_profile_with_processing(part)
+        if len(parsed["name"]) >= 2:
+            profiles.append(parsed)
+    return profiles
+
+
+def load_names():
+    """Real profile names from the manual import file"""
+    path = ROOT_DIR / 'archive' / 'manual_import' / 'profiles_anod.csv'
+    with open(path, encoding='utf-8') as f:
+        return [row['Название'].strip() for row in csv.DictReader(f) if row['Название'].strip()]
+
+
+def make_corpus(names, n_cells, seed=1):
+    """Cells with 1-3 profiles, some with processing keywords"""
+    rng = random.Random(seed)
+    corpus = [value for value in PROFILES if value]
+    while len(corpus) < n_cells:
+        parts = []
+        for _ in range(rng.choice([1, 1, 1, 2, 3])):
+            part = rng.choice(names)
+            if rng.random() < 0.3:
+                part += ' ' + rng.choice(KEYWORDS)
+            parts.append(part)
+        corpus.append(rng.choice(SEPARATORS).join(parts))
+    return corpus
+
+
+def best_of(func, corpus):
+    """Best wall time of REPEAT runs over the corpus, seconds"""
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for cell in corpus:
+            func(cell)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    names = load_names()
+    corpus = make_corpus(names, CELLS)
+    tokenizer = profile_parser.ProfileTokenizer(profile_parser.parse_keywords(profile_parser.DEFAULT_KEYWORDS))
+
+    mismatches = [cell for cell in corpus if old_split_profiles(cell) != tokenizer.split(cell)]
+    old_time = best_of(old_split_profiles, corpus)
+    new_time = best_of(tokenizer.split, corpus)
+
+    print(f"{len(corpus)} cells from {len(names)} real profile names")
+    print(f"{'':>12} {'us/cell':>8}")
+    print(f"{'old':>12} {old_time / len(corpus) * 1e6:>8.2f}")
+    print(f"{'tokenizer':>12} {new_time / len(corpus) * 1e6:>8.2f}   {old_time / new_time:.1f}x")
+    print(f"same result: {'yes' if not mismatches else 'NO ' + repr(mismatches[:5])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Workbook reader engines benchmark
+
+Description:
+- Writes synthetic workbooks (bench_data.write_workbook) of several sizes
+- Times excel_loader.read_full with every engine from READER_ENGINES
+  that is installed (calamine needs: pip install python-calamine)
+- Checks that each engine returns exactly the same DataFrame as the
+  reference 'openpyxl' engine (values, dtypes and Python types of cells)
+
+Usage:
+    python scripts/bench_reader_engines.py [rows ...]     (default: 10000 50000 200000)
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from bench_data import write_workbook
+
+import excel_loader
+
+ROW_COUNTS = [int(arg) for arg in sys.argv[1:]] or [10000, 50000, 200000]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def compare(reference, df):
+    """'yes' if frames are identical, otherwise the first difference"""
+    try:
+        pd.testing.assert_frame_equal(reference, df)
+    except AssertionError as e:
+        return f"NO: {str(e).splitlines()[0]}"
+    # assert_frame_equal treats 12 and 12.0 in object columns as equal
+    for column in reference.columns:
+        if reference[column].dtype == object:
+            left = reference[column].map(type)
+            right = df[column].map(type)
+            if not left.equals(right):
+                return f"NO: cell types differ in '{column}'"
+    return 'yes'
+
+
+def main():
+    engines = [engine for engine in excel_loader.READER_ENGINES if excel_loader.engine_available(engine)]
+    skipped = [engine for engine in excel_loader.READER_ENGINES if engine not in engines]
+    if skipped:
+        print(f"Not installed: {', '.join(skipped)}")
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix='ekranchik-engines-'))
+    print(f"{'rows':>8} {'engine':>16} {'seconds':>9} {'rows/s':>10} {'vs openpyxl':>12}  same")
+    for rows in ROW_COUNTS:
+        workbook = write_workbook(tmp_dir / f'bench_{rows}.xlsm', rows)
+        reference_time, reference = timed(lambda: excel_loader.read_full(workbook, 'openpyxl'))
+
+        for engine in engines:
+            if engine == 'openpyxl':
+                seconds, same = reference_time, 'reference'
+            else:
+                seconds, df = timed(lambda: excel_loader.read_full(workbook, engine))
+                same = compare(reference, df)
+            print(f"{rows:>8} {engine:>16} {seconds:>9.2f} {rows / seconds:>10.0f} "
+                  f"{reference_time / seconds:>11.1f}x  {same}")
+        workbook.unlink()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Per-request memory benchmark for the cached production DataFrame
+
+Description:
+- Puts a synthetic frame into app._cache (no Excel file needed)
+- Measures allocations (tracemalloc peak) of the hot request paths:
+  get_dataframe(), get_dataframe(full_dataset=True), /api/products, /api/signal
+- "before" replays the old behaviour: _cache['df'].copy() on every call,
+  astype(str) over 'number' and pd.to_datetime over 'date' per request
+
+Usage:
+    python scripts/bench_request_memory.py [rows]
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from bench_data import make_frame
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+REPEAT = 20
+
+# Isolated environment: no workbook -> app serves the in-memory cache
+_tmp = Path(tempfile.mkdtemp(prefix='ekranchik-bench-'))
+os.environ['EXCEL_FILE_PATH'] = str(_tmp / 'missing' / 'workbook.xlsm')
+os.environ['DB_PATH'] = str(_tmp / 'profiles.db')
+os.environ['PROFILES_DIR'] = str(_tmp / 'images')
+os.environ['CACHE_DIR'] = str(_tmp / 'cache')
+
+import app  # noqa: E402
+import excel_normalize  # noqa: E402
+
+
+def measure(label, func):
+    """Average peak allocation per call in KiB"""
+    func()  # warm-up
+    peaks = []
+    for _ in range(REPEAT):
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+    avg_kib = sum(peaks) / len(peaks) / 1024
+    print(f"{label:45s} {avg_kib:12.1f} KiB")
+    return avg_kib
+
+
+def old_get_dataframe(full_dataset=False):
+    df = app._cache['df'].copy()
+    if not full_dataset and len(df) > 100:
+        return df.tail(100)
+    return df
+
+
+def old_signal_lookup():
+    df = old_get_dataframe()
+    df['number'] = df['number'].astype(str)
+    return df[df['number'] == '12']
+
+
+def old_products_date_filter():
+    df = old_get_dataframe(full_dataset=True)
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    return df
+
+
+def new_signal_lookup():
+    df = app.get_dataframe()
+    return df[df['number_key'] == '12']
+
+
+def new_products_date_filter():
+    df = app.get_dataframe(full_dataset=True)
+    return df['date_dt']
+
+
+def main():
+    df = excel_normalize.normalize_frame(make_frame(ROWS))
+    app._cache['df'] = df
+    print(f"Rows: {ROWS}, frame deep size: {df.memory_usage(deep=True).sum() / 1024 / 1024:.1f} MiB")
+    print()
+
+    client = app.app.test_client()
+    results = [
+        ('get_dataframe()', lambda: old_get_dataframe(), lambda: app.get_dataframe()),
+        ('get_dataframe(full_dataset=True)', lambda: old_get_dataframe(True), lambda: app.get_dataframe(True)),
+        ('signal lookup (number as str)', old_signal_lookup, new_signal_lookup),
+        ('products date coercion', old_products_date_filter, new_products_date_filter),
+    ]
+
+    print("BEFORE (copy per request)")
+    before = [measure(label, old) for label, old, _ in results]
+    print()
+    print("AFTER (copy-on-write views)")
+    after = [measure(label, new) for label, _, new in results]
+    print()
+    print("End-to-end requests (current code)")
+    measure('GET /api/products', lambda: client.get('/api/products?no_time_filter=false&limit=100'))
+    measure('POST /api/signal', lambda: client.post('/api/signal', json={'hanger_number': '12'}))
+    print()
+    for (label, _, _), b, a in zip(results, before, after):
+        ratio = b / a if a else float('inf')
+        print(f"{label:45s} x{ratio:8.1f} less allocated")
+
+
+if __name__ == '__main__':
+    main()
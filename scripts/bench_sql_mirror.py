@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite production mirror benchmark (excel_mirror)
+
+Description:
+- Writes a synthetic workbook (bench_data.write_workbook), normalizes it
+  as app.py does and mirrors it into a temporary SQLite database
+- Times the initial sync, a re-sync without changes and a re-sync after
+  editing a few rows (incremental update)
+- Times the per-profile statistics used by duplicate search (pandas
+  groupby over the frame vs GROUP BY over the indexed table) and checks
+  that both give the same result
+
+Usage:
+    python scripts/bench_sql_mirror.py [rows ...]     (default: 10000 50000)
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from bench_data import write_workbook
+
+import excel_delta
+import excel_loader
+import excel_mirror
+import excel_normalize
+
+ROW_COUNTS = [int(arg) for arg in sys.argv[1:]] or [10000, 50000]
+EDITED_ROWS = 10
+REPEAT = 5
+
+
+def best_of(func):
+    """Best wall time of REPEAT runs, seconds"""
+    timings = []
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def pandas_profile_stats(df):
+    """(profile, count, last_idx) as app.api_search_duplicates computes them from the frame"""
+    names = df['profile'][pd.notna(df['profile'])].astype(str).str.strip()
+    names = names[names != '']
+    grouped = pd.Series(names.index, index=names.index).groupby(names.to_numpy(), sort=False)
+    stats = pd.DataFrame({'count': grouped.size(), 'last_idx': grouped.max()})
+    return [(name, int(count), int(last_idx)) for name, count, last_idx in stats.itertuples()]
+
+
+def main():
+    tmp_dir = Path(tempfile.mkdtemp(prefix='ekranchik-mirror-'))
+    print(f"{'rows':>8} {'full sync s':>12} {'no-op s':>8} {'edit s':>8} "
+          f"{'pandas stats ms':>16} {'sql stats ms':>13}  same")
+    for rows in ROW_COUNTS:
+        workbook = write_workbook(tmp_dir / f'bench_{rows}.xlsm', rows)
+        raw = excel_loader.read_full(workbook)
+        df = excel_normalize.normalize_frame(raw)
+        hashes = excel_delta.row_hashes(df)
+        mirror = excel_mirror.ProductionMirror(tmp_dir / f'bench_{rows}.db')
+
+        start = time.perf_counter()
+        mirror.sync(df, hashes)
+        full_sync = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mirror.sync(df, hashes)
+        noop_sync = time.perf_counter() - start
+
+        # A few edited rows at the end of the sheet (what an operator does)
+        edited = raw.copy()
+        edited.loc[edited.index[-EDITED_ROWS:], 'profile'] = 'EDITED'
+        edited = excel_normalize.normalize_frame(edited)
+        start = time.perf_counter()
+        mirror.sync(edited, excel_delta.row_hashes(edited))
+        edit_sync = time.perf_counter() - start
+
+        pandas_time, from_pandas = best_of(lambda: pandas_profile_stats(edited))
+        sql_time, from_sql = best_of(lambda: [(row['profile'], row['count'], row['last_idx'])
+                                              for row in mirror.profile_stats()])
+        same = 'yes' if from_pandas == from_sql else 'NO'
+
+        print(f"{rows:>8} {full_sync:>12.2f} {noop_sync:>8.3f} {edit_sync:>8.3f} "
+              f"{pandas_time * 1000:>16.1f} {sql_time * 1000:>13.1f}  {same}")
+        workbook.unlink()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Text normalization benchmark (text_normalize)
+
+Description:
+- Builds a catalog-like corpus: real profile names
+  (archive/manual_import/profiles_anod.csv) in Latin/Cyrillic spellings,
+  notes, quantities and lengths - the fields db.search_profiles normalizes
+  for every row on every query
+- Times the per-character dict implementation db.py had against
+  text_normalize.search_key, with an empty memo (first query) and a warm
+  memo (next queries)
+- Checks that the results are the same
+
+Usage:
+    python scripts/bench_text_normalize.py [rows]     (default: 20000)
+"""
+
+import csv
+import random
+import sys
+import time
+
+from bench_data import ROOT_DIR
+
+import text_normalize
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+REPEAT = 5
+NOTES = ['', 'окно', 'греб, сверло', 'для фасада', 'Алюмтех', 'не анодировать торцы']
+
+OLD_MAP = {
+    'А': 'а', 'В': 'в', 'Е': 'е', 'К': 'к', 'М': 'м', 'Н': 'н',
+    'О': 'о', 'П': 'п', 'Р': 'р', 'С': 'с', 'Т': 'т', 'У': 'у',
+    'Х': 'х', 'Д': 'д', 'З': 'з', 'Л': 'л',
+    'а': 'а', 'в': 'в', 'е': 'е', 'к': 'к', 'м': 'м', 'н': 'н',
+    'о': 'о', 'п': 'п', 'р': 'р', 'с': 'с', 'т': 'т', 'у': 'у',
+    'х': 'х', 'д': 'д', 'з': 'з', 'л': 'л',
+    'A': 'а', 'B': 'в', 'C': 'с', 'D': 'д', 'E': 'е', 'H': 'н',
+    'K': 'к', 'M': 'м', 'O': 'о', 'P': 'р', 'T': 'т', 'X': 'х',
+    'Y': 'у', 'Z': 'з', 'L': 'л',
+    'a': 'а', 'b': 'в', 'c': 'с', 'd': 'д', 'e': 'е', 'h': 'н',
+    'k': 'к', 'm': 'м', 'o': 'о', 'p': 'р', 't': 'т', 'x': 'х',
+    'y': 'у', 'z': 'з', 'l': 'л',
+}
+
+
+def old_normalize_text(text):
+    """db.normalize_text before text_normalize"""
+    if not text:
+        return ''
+    result = []
+    for char in str(text):
+        if char in ('-', ' ', '.', '_', '/', '\\'):
+            continue
+        result.append(OLD_MAP.get(char, char.lower()))
+    return ''.join(result)
+
+
+def make_corpus(rows, seed=1):
+    """Field values of a catalog with `rows` profiles (4 fields per row)"""
+    path = ROOT_DIR / 'archive' / 'manual_import' / 'profiles_anod.csv'
+    with open(path, encoding='utf-8') as f:
+        names = [row['Название'].strip() for row in csv.DictReader(f) if row['Название'].strip()]
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(rows):
+        name = rng.choice(names)
+        if rng.random() < 0.3:
+            name = name.replace('-', rng.choice([' ', '', '.']))
+        corpus += [f'{name}/{i}', rng.choice(NOTES), str(rng.randint(10, 120)), str(rng.choice([2500, 2750, 6000]))]
+    return corpus
+
+
+def best_of(func, corpus, before=None):
+    """Best wall time of REPEAT passes over the corpus, seconds"""
+    timings = []
+    for _ in range(REPEAT):
+        if before:
+            before()
+        start = time.perf_counter()
+        for value in corpus:
+            func(value)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    corpus = make_corpus(ROWS)
+    print(f"{len(corpus)} field values ({ROWS} catalog rows)")
+    print(f"{'':>14} {'old ms':>8} {'cold ms':>8} {'warm ms':>8} {'cold':>6} {'warm':>6}  same")
+    variants = [
+        ('search_key', old_normalize_text, text_normalize.search_key),
+    ]
+    for label, old, new in variants:
+        same = all(old(value) == new(value) for value in corpus)
+        old_time = best_of(old, corpus)
+        cold_time = best_of(new, corpus, before=new.cache_clear)
+        warm_time = best_of(new, corpus)
+        print(f"{label:>14} {old_time * 1000:>8.1f} {cold_time * 1000:>8.1f} {warm_time * 1000:>8.1f} "
+              f"{old_time / cold_time:>5.1f}x {old_time / warm_time:>5.1f}x  {'yes' if same else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Нормализация текста для поиска профилей (общая для db.py и app.py)
+
+Названия профилей набирают то кириллицей, то латиницей ("АЛС-345" и
+"ALS-345", "СП" и "CP"), с дефисом или через пробел. Похожие буквы обеих
+раскладок приводятся к строчной кириллице одной таблицей str.translate,
+результат запоминается (LRU) - одни и те же названия нормализуются при
+каждом поиске по каталогу и при каждом поиске фото.
+
+Варианты:
+- search_key: нижний регистр + кириллица, без дефисов, пробелов, точек и
+  слешей ("ALS-345" → "алс345") - поиск по каталогу, поиск фото, индекс профилей
+- digit_signature: только цифры ("ЮП-1625/2" → "16252")
+"""
+
+import re
+from functools import lru_cache
+
+# Похожие латинские буквы → строчная кириллица (после перевода в нижний регистр)
+CONFUSABLES = {
+    'a': 'а', 'b': 'в', 'c': 'с', 'd': 'д', 'e': 'е', 'h': 'н',
+    'k': 'к', 'm': 'м', 'o': 'о', 'p': 'р', 't': 'т', 'x': 'х',
+    'y': 'у', 'z': 'з', 'l': 'л',
+}
+
+# Не учитываются в search_key: "ALS-345", "als 345" и "АЛС.345" - один профиль
+SEARCH_IGNORED = '- ._/\\'
+
+# Сколько последних значений помнить (на каждый вариант)
+MEMO_SIZE = 65536
+
+_SEARCH_TABLE = str.maketrans({**CONFUSABLES, **dict.fromkeys(SEARCH_IGNORED)})
+_NOT_DIGITS_RE = re.compile(r'\D')
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def search_key(text):
+    """
+    Ключ для поиска: нижний регистр, латинские двойники → кириллица,
+    без дефисов, пробелов, точек, подчеркиваний и слешей
+
+    'ALS-345' → 'алс345', 'als 345' → 'алс345', 'CP' → 'ср'
+    """
+    if not text:
+        return ''
+    return str(text).lower().translate(_SEARCH_TABLE)
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def digit_signature(text):
+    """Все цифры подряд ('ЮП-1625/2' → '16252'), для поиска фото по номеру профиля"""
+    if not text:
+        return ''
+    return _NOT_DIGITS_RE.sub('', str(text))